@@ -1,12 +1,11 @@
 import os
 import threading
 import webbrowser
-from src.app import create_app, get_server_port
 
-app = create_app()
+APP_MODES = ("api", "web", "desktop")
 
 
-def run_server(port: int):
+def run_server(app, port: int):
     """Run the Flask server in a background thread."""
     app.run(host="127.0.0.1", port=port, debug=False, use_reloader=False)
 
@@ -14,6 +13,13 @@ def run_server(port: int):
 def main():
     """Main entry point for the application."""
     mode = os.environ.get("APP_MODE", "desktop")  # default is now desktop
+    if mode not in APP_MODES:
+        print(f"Unknown APP_MODE={mode}")
+        return
+    
+    # Flask and the app modules are imported only once a mode that serves is chosen
+    from src.app import create_app, get_server_port
+    app = create_app()
     port = get_server_port()
 
     if mode == "api":
@@ -50,7 +56,7 @@ def main():
         signal.signal(signal.SIGTERM, signal_handler)
 
         print("Launching EC2 Session Gate in desktop window (PyWebView)...")
-        threading.Thread(target=run_server, args=(port,), daemon=True).start()
+        threading.Thread(target=run_server, args=(app, port), daemon=True).start()
         webview.create_window("EC2 Session Gate", f"http://127.0.0.1:{port}", width=1280, height=800)
         
         try:
@@ -59,8 +65,5 @@ def main():
             # Cleanup after webview window closes
             cleanup_on_exit()
 
-    else:
-        print(f"Unknown APP_MODE={mode}")
-
 if __name__ == "__main__":
     main()
@@ -1 +1,6 @@
-from .app import create_app  # convenience import
+def __getattr__(name):
+    # Convenience access to create_app without importing Flask with the package
+    if name == "create_app":
+        from .app import create_app
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
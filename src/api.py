@@ -1,10 +1,10 @@
+import json
 import logging
+import threading
 from functools import wraps
-from flask import Blueprint, jsonify, request
-from botocore.exceptions import ClientError
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
-from .preferences_handler import Preferences
-from .aws_manager import AWSManager
+from .preferences_handler import Preferences, DEFAULTS
 from .utils import (
     create_success_response, 
     create_error_response,
@@ -12,15 +12,62 @@ from .utils import (
     validate_connection_id,
     validate_port,
     validate_port_range,
-    validate_remote_host
+    validate_remote_host,
+    validate_region,
+    validate_role_arn
 )
 from .health import check_health
+from .inventory import InstanceList, to_json_value
+from .constants import (
+    INVENTORY_REFRESH_MODES,
+    INVENTORY_SORT_KEYS,
+    INVENTORY_MAX_PAGE_SIZE,
+    INVENTORY_SEARCH_LIMIT,
+    INVENTORY_SEARCH_MAX_QUERY,
+    INVENTORY_EVENT_RETRY_MS,
+    INSTANCE_DETAILS_BATCH_MAX,
+    CACHE_NAMES,
+    VALID_INSTANCE_STATES
+)
 
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint("api", __name__)
-prefs = Preferences.load()
-aws_manager = AWSManager(prefs)
+
+
+class _LazyManager:
+    """
+    Stand-in for the AWSManager singleton that builds it on first use.
+    
+    Building the manager imports the AWS SDK, loads the preferences and cleans
+    up orphaned session processes; deferring it keeps that off app startup.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, "_instance", self._factory())
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+
+def _create_manager():
+    from .aws_manager import AWSManager
+    return AWSManager(Preferences.load())
+
+
+aws_manager = _LazyManager(_create_manager)
 
 # Request logging middleware
 @api_bp.before_request
@@ -65,12 +112,7 @@ def get_regions():
     """Return enabled AWS regions for the selected profile."""
     try:
         profile = request.args.get("profile", "default")
-        session = aws_manager.session(profile=profile)
-        #  Always specify a fallback region (for profiles without a region)
-        ec2 = session.client("ec2", region_name="us-east-1")
-
-        resp = ec2.describe_regions(AllRegions=False)
-        regions = sorted([r["RegionName"] for r in resp["Regions"]])
+        regions = aws_manager.describe_regions(profile=profile)
         return jsonify({"ok": True, "data": regions})
 
     except Exception as e:
@@ -78,6 +120,8 @@ def get_regions():
 
 @api_bp.post("/connect")
 def connect_to_aws():
+    from botocore.exceptions import ClientError
+    
     data = request.get_json() or {}
     profile = data.get("profile")
     region = data.get("region")
@@ -120,20 +164,278 @@ def connect_to_aws():
         
         return create_error_response(error_msg), 400
 
+def _inventory_query_error():
+    """Validate the filter_state and refresh query parameters shared by inventory endpoints."""
+    filter_state = request.args.get("filter_state", None)
+    if filter_state and filter_state not in VALID_INSTANCE_STATES:
+        return f"Invalid filter_state. Must be one of: {', '.join(VALID_INSTANCE_STATES)}"
+    refresh = request.args.get("refresh", "swr")
+    if refresh not in INVENTORY_REFRESH_MODES:
+        return f"Invalid refresh. Must be one of: {', '.join(INVENTORY_REFRESH_MODES)}"
+    return None
+
+def _json_response(value):
+    """JSON response for inventory data; instance records are turned into dicts only here."""
+    return Response(json.dumps(value, default=to_json_value), mimetype="application/json")
+
+def _ndjson_response(records):
+    """Stream an iterable of dicts as newline-delimited JSON."""
+    def generate():
+        try:
+            for record in records:
+                yield json.dumps(record, default=to_json_value) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"Streaming response failed: {e}", exc_info=True)
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def _inventory_list_response(instances):
+    """JSON array response reporting snapshot freshness in headers, leaving the body unchanged."""
+    # Serialized straight from the snapshot's tuple (or page), without copying it
+    response = _json_response(instances.items if isinstance(instances, InstanceList) else instances)
+    meta = getattr(instances, "meta", None) or {}
+    if "age" in meta:
+        response.headers["X-Inventory-Age"] = f"{meta['age']:.1f}"
+        response.headers["X-Inventory-Stale"] = "true" if meta.get("stale") else "false"
+        response.headers["X-Inventory-Refreshing"] = "true" if meta.get("refreshing") else "false"
+    if meta.get("generation") is not None:
+        response.headers["X-Inventory-Generation"] = str(meta["generation"])
+    if meta.get("offline"):
+        response.headers["X-Inventory-Offline"] = "true"
+    if "total" in meta:
+        response.headers["X-Total-Count"] = str(meta["total"])
+    if meta.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = meta["next_cursor"]
+    return response
+
 @api_bp.get("/instances")
 def get_instances():
     try:
+        error_msg = _inventory_query_error()
+        if error_msg:
+            return create_error_response(error_msg), 400
         # Get optional filter_state from query parameter
-        filter_state = request.args.get("filter_state", None)
-        # Validate filter_state if provided
-        if filter_state:
-            valid_states = ["pending", "running", "shutting-down", "terminated", "stopping", "stopped"]
-            if filter_state not in valid_states:
-                return create_error_response(f"Invalid filter_state. Must be one of: {', '.join(valid_states)}"), 400
-        return jsonify(aws_manager.list_instances(filter_state=filter_state))
+        filter_state = request.args.get("filter_state") or None
+        # Cache mode: swr (default), blocking or force
+        refresh = request.args.get("refresh", "swr")
+        # Delta mode: only the changes since a generation the client already has
+        since = request.args.get("since")
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return create_error_response("since must be an integer generation"), 400
+            return _json_response(aws_manager.instance_changes(since, filter_state=filter_state, refresh=refresh))
+        # Paged mode: one sorted page at a time, continued with the returned cursor
+        sort = request.args.get("sort")
+        limit = request.args.get("limit")
+        cursor = request.args.get("cursor")
+        if sort or limit or cursor:
+            if sort and sort.lstrip("-") not in INVENTORY_SORT_KEYS:
+                return create_error_response(f"Invalid sort. Must be one of: {', '.join(INVENTORY_SORT_KEYS)} (prefix with - for descending)"), 400
+            if limit is not None:
+                try:
+                    limit = int(limit)
+                except ValueError:
+                    return create_error_response("limit must be an integer"), 400
+                if not 1 <= limit <= INVENTORY_MAX_PAGE_SIZE:
+                    return create_error_response(f"limit must be between 1 and {INVENTORY_MAX_PAGE_SIZE}"), 400
+            try:
+                instances = aws_manager.page_instances(filter_state=filter_state, refresh=refresh, sort=sort or "name", limit=limit, cursor=cursor)
+            except ValueError as e:
+                return create_error_response(str(e)), 400
+            return _inventory_list_response(instances)
+        instances = aws_manager.list_instances(filter_state=filter_state, refresh=refresh)
+        return _inventory_list_response(instances)
     except Exception as e:
         return create_error_response(str(e)), 500
 
+@api_bp.get("/instances/stream")
+def stream_instances():
+    """Stream the current region's instances as NDJSON while DescribeInstances pages arrive."""
+    error_msg = _inventory_query_error()
+    if error_msg:
+        return create_error_response(error_msg), 400
+    return _ndjson_response(aws_manager.iter_instance_stream(
+        filter_state=request.args.get("filter_state") or None,
+        refresh=request.args.get("refresh", "swr"),
+    ))
+
+@api_bp.get("/events")
+def inventory_events():
+    """
+    Server-Sent Events stream of inventory changes for the current profile and region.
+    
+    Resumes after the Last-Event-ID header (or last_event_id query parameter) when given.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return create_error_response("Last-Event-ID must be an integer generation"), 400
+    
+    def generate():
+        yield f"retry: {INVENTORY_EVENT_RETRY_MS}\n\n"
+        for event in aws_manager.inventory_events(last_event_id=last_event_id):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            data = json.dumps(event["data"], default=to_json_value)
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@api_bp.get("/instances/search")
+def search_instances():
+    """Fuzzy-search the current region's instances by name, ID, private IP and selected tags."""
+    error_msg = _inventory_query_error()
+    if error_msg:
+        return create_error_response(error_msg), 400
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return create_error_response("q is required"), 400
+    if len(query) > INVENTORY_SEARCH_MAX_QUERY:
+        return create_error_response(f"q must be at most {INVENTORY_SEARCH_MAX_QUERY} characters"), 400
+    limit = request.args.get("limit", INVENTORY_SEARCH_LIMIT)
+    try:
+        limit = int(limit)
+    except ValueError:
+        return create_error_response("limit must be an integer"), 400
+    if not 1 <= limit <= INVENTORY_MAX_PAGE_SIZE:
+        return create_error_response(f"limit must be between 1 and {INVENTORY_MAX_PAGE_SIZE}"), 400
+    
+    try:
+        instances = aws_manager.search_instances(
+            query,
+            filter_state=request.args.get("filter_state") or None,
+            limit=limit,
+            refresh=request.args.get("refresh", "swr"),
+        )
+        return _inventory_list_response(instances)
+    except Exception as e:
+        logger.error(f"Instance search failed: {e}", exc_info=True)
+        return create_error_response(str(e)), 500
+
+@api_bp.get("/instances/query")
+def query_instances():
+    """Filter the current region's instances with the query language (tag:env=prod type:m5.* state:running ssm:yes)."""
+    error_msg = _inventory_query_error()
+    if error_msg:
+        return create_error_response(error_msg), 400
+    query = (request.args.get("q") or "").strip()
+    if len(query) > INVENTORY_SEARCH_MAX_QUERY:
+        return create_error_response(f"q must be at most {INVENTORY_SEARCH_MAX_QUERY} characters"), 400
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return create_error_response("limit must be an integer"), 400
+        if not 1 <= limit <= INVENTORY_MAX_PAGE_SIZE:
+            return create_error_response(f"limit must be between 1 and {INVENTORY_MAX_PAGE_SIZE}"), 400
+    
+    try:
+        instances = aws_manager.query_instances(query, limit=limit, refresh=request.args.get("refresh", "swr"))
+    except ValueError as e:
+        return create_error_response(str(e)), 400
+    except Exception as e:
+        logger.error(f"Instance query failed: {e}", exc_info=True)
+        return create_error_response(str(e)), 500
+    return _inventory_list_response(instances)
+
+@api_bp.get("/instances/facets")
+def get_instance_facets():
+    """Instance counts per state, type, OS, SSM status and tag value, from the cached snapshot."""
+    error_msg = _inventory_query_error()
+    if error_msg:
+        return create_error_response(error_msg), 400
+    try:
+        return jsonify(aws_manager.instance_facets(refresh=request.args.get("refresh", "swr")))
+    except Exception as e:
+        logger.error(f"Failed to compute instance facets: {e}", exc_info=True)
+        return create_error_response(str(e)), 500
+
+@api_bp.get("/instances/offline")
+def get_offline_instances():
+    """Return the last known instance list for a profile/region without contacting AWS."""
+    error_msg = _inventory_query_error()
+    if error_msg:
+        return create_error_response(error_msg), 400
+    profile = request.args.get("profile") or "default"
+    region = request.args.get("region") or None
+    if region and not validate_region(region):
+        return create_error_response(f"Invalid region: {region}"), 400
+    
+    instances = aws_manager.offline_instances(profile, region, filter_state=request.args.get("filter_state") or None)
+    if instances is None:
+        return create_error_response(f"No stored inventory for profile {profile} in {region or 'the default region'}"), 404
+    return _inventory_list_response(instances)
+
+@api_bp.get("/instances/regions")
+def get_instances_all_regions():
+    """Stream the inventory of several regions as NDJSON, one record per region as it finishes."""
+    error_msg = _inventory_query_error()
+    if error_msg:
+        return create_error_response(error_msg), 400
+    
+    regions = [r.strip() for r in request.args.get("regions", "").split(",") if r.strip()]
+    invalid = [r for r in regions if not validate_region(r)]
+    if invalid:
+        return create_error_response(f"Invalid region(s): {', '.join(invalid)}"), 400
+    
+    return _ndjson_response(aws_manager.iter_region_inventories(
+        regions=regions or None,
+        filter_state=request.args.get("filter_state") or None,
+        refresh=request.args.get("refresh", "swr"),
+    ))
+
+@api_bp.post("/instances/accounts")
+def get_instances_all_accounts():
+    """
+    Stream an aggregated inventory across profiles (and optional assume-role targets) as NDJSON.
+    
+    Body: {"targets": [{"profile": "dev"}, {"profile": "ops", "role_arn": "arn:aws:iam::...:role/x"}],
+           "regions": ["us-east-1"], "filter_state": "running", "refresh": "swr"}
+    """
+    data = request.get_json() or {}
+    targets = data.get("targets") or []
+    if not isinstance(targets, list) or not targets:
+        return create_error_response("targets must be a non-empty list"), 400
+    
+    known_profiles = set(aws_manager.list_profiles())
+    for target in targets:
+        if not isinstance(target, dict):
+            return create_error_response("Each target must be an object with a profile"), 400
+        profile = target.get("profile") or "default"
+        if profile not in known_profiles:
+            return create_error_response(f"Unknown profile: {profile}"), 400
+        role_arn = target.get("role_arn")
+        if role_arn and not validate_role_arn(role_arn):
+            return create_error_response(f"Invalid role_arn: {role_arn}"), 400
+    
+    regions = data.get("regions") or []
+    if not isinstance(regions, list) or not all(validate_region(r) for r in regions):
+        return create_error_response("regions must be a list of region names"), 400
+    
+    filter_state = data.get("filter_state") or None
+    if filter_state and filter_state not in VALID_INSTANCE_STATES:
+        return create_error_response(f"Invalid filter_state. Must be one of: {', '.join(VALID_INSTANCE_STATES)}"), 400
+    refresh = data.get("refresh", "swr")
+    if refresh not in INVENTORY_REFRESH_MODES:
+        return create_error_response(f"Invalid refresh. Must be one of: {', '.join(INVENTORY_REFRESH_MODES)}"), 400
+    
+    return _ndjson_response(aws_manager.iter_account_inventories(
+        targets,
+        regions=regions or None,
+        filter_state=filter_state,
+        refresh=refresh,
+    ))
+
 @api_bp.post("/ssh/<instance_id>")
 @validate_instance_id_param
 def start_ssh_session(instance_id):
@@ -273,10 +575,21 @@ def set_preferences():
             p.last_profile = existing_prefs.last_profile
             p.last_region = existing_prefs.last_region
         
+        # Preserve performance tuning not in the request (the preferences dialog doesn't edit it)
+        performance = data.get("performance") or {}
+        for name in DEFAULTS["performance"]:
+            if name not in performance:
+                setattr(p, name, getattr(existing_prefs, name))
+        
         p.save()
         
         # Reload preferences in aws_manager to use updated values
         aws_manager.preferences = Preferences.load()
+        # Pooled clients keep the connection pool size they were built with
+        if p.max_pool_connections != existing_prefs.max_pool_connections:
+            aws_manager.reset_clients()
+        # Cache limits may have been lowered
+        aws_manager.apply_cache_limits()
         
         logger.info(f"Saved preferences: port_range={p.port_range_start}-{p.port_range_end}, logging_level={p.logging_level}, ssh_options={p.ssh_options}")
         return create_success_response(p.to_dict())
@@ -303,8 +616,11 @@ def get_last_aws_connection():
 @api_bp.get("/instance-details/<instance_id>")
 @validate_instance_id_param
 def get_instance_details(instance_id):
+    from botocore.exceptions import ClientError
+    
     try:
-        details = aws_manager.instance_details(instance_id)
+        # refresh=force bypasses the details cache filled from instance listings
+        details = aws_manager.instance_details(instance_id, refresh=request.args.get("refresh") == "force")
         return jsonify(details)
     except ClientError as e:
         error_code = e.response.get("Error", {}).get("Code", "")
@@ -317,6 +633,108 @@ def get_instance_details(instance_id):
         logger.error(f"Error retrieving instance details for {instance_id}: {e}", exc_info=True)
         return create_error_response(str(e)), 400
 
+@api_bp.post("/instance-details")
+def get_instance_details_batch():
+    """
+    Get the details of many instances in one request.
+    
+    Body: {"instance_ids": ["i-...", ...], "refresh": false}
+    Returns per-ID ``instances`` and ``errors``; invalid IDs are reported as errors.
+    """
+    from botocore.exceptions import ClientError
+    
+    data = request.get_json(silent=True) or {}
+    instance_ids = data.get("instance_ids")
+    if not isinstance(instance_ids, list) or not instance_ids:
+        return create_error_response("instance_ids must be a non-empty list"), 400
+    if len(instance_ids) > INSTANCE_DETAILS_BATCH_MAX:
+        return create_error_response(f"At most {INSTANCE_DETAILS_BATCH_MAX} instance_ids per request"), 400
+    
+    valid_ids = []
+    invalid = {}
+    for instance_id in instance_ids:
+        is_valid, error_msg = validate_instance_id(instance_id)
+        if is_valid:
+            valid_ids.append(instance_id)
+        else:
+            invalid[str(instance_id)] = error_msg
+    
+    try:
+        result = aws_manager.instance_details_batch(valid_ids, refresh=bool(data.get("refresh"))) if valid_ids else {"instances": {}, "errors": {}}
+    except ClientError as e:
+        error_code = e.response.get("Error", {}).get("Code", "")
+        logger.error(f"Error retrieving details for {len(valid_ids)} instances: {e}", exc_info=True)
+        return create_error_response(f"AWS Error: {error_code}"), 400
+    except Exception as e:
+        logger.error(f"Error retrieving details for {len(valid_ids)} instances: {e}", exc_info=True)
+        return create_error_response(str(e)), 400
+    result["errors"].update(invalid)
+    return jsonify(result)
+
+@api_bp.get("/cache")
+def get_cache_stats():
+    """Hit/miss/eviction counters, entry counts, sizes and ages of the in-memory caches."""
+    try:
+        return jsonify(aws_manager.cache_stats())
+    except Exception as e:
+        logger.error(f"Error collecting cache statistics: {e}", exc_info=True)
+        return create_error_response(str(e)), 500
+
+@api_bp.post("/cache")
+def control_cache():
+    """
+    Invalidate or warm cache entries.
+    
+    Body: {"action": "invalidate", "profile": "dev", "region": "us-east-1", "caches": ["inventory"]}
+          {"action": "warm", "profile": "dev", "region": "us-east-1"}
+    Invalidation without profile/region applies to every profile/region.
+    """
+    data = request.get_json(silent=True) or {}
+    action = data.get("action")
+    profile = data.get("profile") or None
+    region = data.get("region") or None
+    if action not in ("invalidate", "warm"):
+        return create_error_response("action must be 'invalidate' or 'warm'"), 400
+    if region is not None and not validate_region(region):
+        return create_error_response(f"Invalid region: {region}"), 400
+    if region is not None and profile is None:
+        return create_error_response("region requires a profile"), 400
+    
+    try:
+        if profile is not None and profile not in aws_manager.list_profiles():
+            return create_error_response(f"Unknown profile: {profile}"), 400
+        if action == "warm":
+            if profile is None or region is None:
+                return create_error_response("warm requires a profile and a region"), 400
+            return jsonify(aws_manager.warm_cache(profile, region)), 202
+        
+        caches = data.get("caches") or None
+        if caches is not None and (not isinstance(caches, list) or any(name not in CACHE_NAMES for name in caches)):
+            return create_error_response(f"caches must be a list of: {', '.join(CACHE_NAMES)}"), 400
+        dropped = aws_manager.invalidate_cache(profile=profile, region=region, caches=caches)
+        return jsonify(create_success_response({"invalidated": dropped}))
+    except Exception as e:
+        logger.error(f"Cache {action} failed: {e}", exc_info=True)
+        return create_error_response(str(e)), 500
+
+@api_bp.get("/prefetch")
+def get_prefetch_status():
+    """Progress of the background warm-ups started on connect and at startup."""
+    try:
+        return jsonify(aws_manager.prefetch_status())
+    except Exception as e:
+        logger.error(f"Error collecting prefetch status: {e}", exc_info=True)
+        return create_error_response(str(e)), 500
+
+@api_bp.get("/scheduler")
+def get_scheduler_stats():
+    """AWS calls, throttled responses and queueing per (account, region, API)."""
+    try:
+        return jsonify(aws_manager.scheduler_stats())
+    except Exception as e:
+        logger.error(f"Error collecting AWS call statistics: {e}", exc_info=True)
+        return create_error_response(str(e)), 500
+
 @api_bp.get("/health")
 def get_health_status():
     try:
@@ -2,8 +2,8 @@ import os
 import socket
 import signal
 import logging
+import threading
 import logging.config
-import yaml
 from flask import Flask, request
 from pathlib import Path
 
@@ -45,6 +45,13 @@ def get_server_port() -> int:
     return free_port
 
 
+def _prefetch_last_context(aws_manager):
+    """Warm the last used profile/region so the first listing joins a fetch already under way."""
+    prefs = aws_manager.preferences
+    if prefs.prefetch and prefs.last_profile and prefs.last_region:
+        aws_manager.prefetch(prefs.last_profile, prefs.last_region)
+
+
 def create_app():
     base_dir = Path(__file__).resolve().parent
     app = Flask(__name__, static_folder=str(base_dir / "static"), template_folder=str(base_dir / "static" / "templates"))
@@ -69,6 +76,7 @@ def create_app():
     else:
         cfg = base_dir / "logging.yaml"
         if cfg.exists():
+            import yaml
             with open(cfg, "r") as f:
                 cfg_dict = yaml.safe_load(f)
             # Ensure log file lives under ~/.config/ec2-session-gate/logs
@@ -121,7 +129,6 @@ def create_app():
 
     # Register signal handlers for graceful shutdown
     # Only register if we're in the main thread (not in a daemon thread)
-    import threading
     if threading.current_thread() is threading.main_thread():
         try:
             signal.signal(signal.SIGINT, cleanup_connections)
@@ -131,6 +138,19 @@ def create_app():
             # Signal handlers might not work on all platforms/contexts
             app.logger.warning(f"Could not register signal handlers: {e}")
     
+    # The AWS manager is built on first use. Warming the last used profile/region
+    # builds it, so that waits for the first request (the UI page load) rather than
+    # running while the server starts
+    app.config.setdefault("PREFETCH_ON_FIRST_REQUEST", not is_testing)
+    warm_up_started = threading.Event()
+
+    @app.before_request
+    def start_warm_up():
+        if not app.config["PREFETCH_ON_FIRST_REQUEST"] or warm_up_started.is_set():
+            return
+        warm_up_started.set()
+        threading.Thread(target=_prefetch_last_context, args=(aws_manager,), name="startup-prefetch", daemon=True).start()
+    
     # Register Flask teardown handler for when app context closes
     @app.teardown_appcontext
     def close_connections(error):
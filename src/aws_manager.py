@@ -1,4 +1,6 @@
 import os
+import re
+import hashlib
 import sys
 import uuid
 import socket
@@ -10,8 +12,10 @@ import base64
 import tempfile
 import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterator, List, Optional, Tuple
 
 from .constants import (
     DEFAULT_SSH_PORT,
@@ -22,24 +26,50 @@ from .constants import (
     AWS_IAM_READ_TIMEOUT,
     AWS_MAX_RETRIES,
     AWS_IAM_MAX_RETRIES,
+    AWS_RETRY_MODE,
+    AWS_MAX_POOL_CONNECTIONS,
+    AWS_CLIENT_CACHE_SIZE,
+    REGIONS_CACHE_TTL,
+    IDENTITY_CACHE_TTL,
+    IDENTITY_ALIAS_GRACE,
+    INVENTORY_CACHE_TTL,
+    INVENTORY_CACHE_MAX_SNAPSHOTS,
+    INVENTORY_CACHE_MAX_MEMORY_MB,
+    CACHE_NAMES,
+    INVENTORY_ACTIVE_REFRESH_INTERVAL,
+    INVENTORY_INACTIVE_REFRESH_INTERVAL,
+    INVENTORY_INACTIVE_KEEPALIVE,
+    INVENTORY_MAX_STALENESS,
+    INVENTORY_REFRESHER_TICK,
+    INVENTORY_HISTORY_SIZE,
+    INVENTORY_REGION_WORKERS,
+    INVENTORY_ACCOUNT_WORKERS,
+    INVENTORY_SORT_KEYS,
+    INVENTORY_SEARCH_LIMIT,
+    INVENTORY_STREAM_CHUNK,
+    INVENTORY_EVENT_KEEPALIVE,
+    INSTANCE_DETAILS_TTL,
+    INSTANCE_DETAILS_CACHE_SIZE,
+    INSTANCE_DETAILS_BATCH_CHUNK,
+    INSTANCE_DETAILS_BATCH_WORKERS,
+    ASSUME_ROLE_SESSION_NAME,
     PROCESS_STARTUP_CHECK_DELAY,
     PROCESS_TERMINATION_TIMEOUT,
-    PORT_CHECK_RETRIES,
-    PORT_RANGE_MAX_ATTEMPTS
+    PORT_CHECK_RETRIES
 )
 
-import boto3
-from botocore.config import Config
-from botocore.exceptions import BotoCoreError, ClientError
+from .inventory import InventorySnapshot, InstanceList, InstanceRecord, diff_instances
+from .inventory_store import InventoryStore
+from .inventory_search import TrigramIndex
+from .inventory_events import InventoryEventLog, describe_changes
+from .cache_stats import CacheStats, approx_size, age_summary
+from .aws_scheduler import AWSCallScheduler
+from .port_allocator import PortAllocator
 
-try:
-    from cryptography.hazmat.primitives import hashes
-    from cryptography.hazmat.primitives.asymmetric import padding
-    from cryptography.hazmat.primitives.serialization import load_pem_private_key
-    from cryptography.hazmat.backends import default_backend
-    CRYPTO_AVAILABLE = True
-except ImportError:
-    CRYPTO_AVAILABLE = False
+# boto3, botocore and cryptography take a few hundred milliseconds to import,
+# so they are imported where first needed rather than at startup
+if TYPE_CHECKING:
+    from botocore.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -72,28 +102,13 @@ def _is_port_free(port: int, retries: int = PORT_CHECK_RETRIES) -> bool:
     return False
 
 
-def _in_range_free_port(start: int, end: int, max_attempts: int = PORT_RANGE_MAX_ATTEMPTS) -> int:
-    """
-    Find a free TCP port between start and end with retry logic.
-    
-    Args:
-        start: Start of port range
-        end: End of port range
-        max_attempts: Maximum attempts to find a free port
-        
-    Returns:
-        Free port number
-        
-    Raises:
-        RuntimeError: If no free port is found
-    """
-    for attempt in range(max_attempts):
-        for port in range(start, end + 1):
-            if _is_port_free(port):
-                return port
-        if attempt < max_attempts - 1:
-            time.sleep(0.2)  # Brief delay before retrying entire range
-    raise RuntimeError(f"No free port available in configured range ({start}-{end}) after {max_attempts} attempts")
+def _file_signature(path: str) -> Optional[tuple]:
+    """(mtime, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 
 def _require(cmd: str, friendly: str):
@@ -115,6 +130,420 @@ class Connection:
     command: str  # Command string for manual execution
     meta: Dict[str, Any]
 
+# -------------------------------------------------------------------
+# Shared botocore sessions
+# -------------------------------------------------------------------
+
+class _SharedSession:
+    """
+    The botocore session of one profile or assume-role context.
+    
+    It resolves its credentials once (running credential_process, reading the
+    SSO cache, ...) and keeps them; refreshable credentials renew themselves
+    before they expire. botocore sessions aren't thread-safe, so client
+    creation is serialized.
+    """
+    __slots__ = ("fingerprint", "core", "_lock")
+
+    def __init__(self, fingerprint: tuple, core):
+        self.fingerprint = fingerprint
+        self.core = core
+        self._lock = threading.Lock()
+
+    def client(self, service: str, region: Optional[str], config=None):
+        with self._lock:
+            return self.core.create_client(service, region_name=region, config=config)
+
+    def get_credentials(self):
+        with self._lock:
+            return self.core.get_credentials()
+
+
+class _RegionSession:
+    """A _SharedSession bound to a region, with the parts of the boto3 Session API the manager uses."""
+    __slots__ = ("shared", "region_name")
+
+    def __init__(self, shared: _SharedSession, region_name: Optional[str]):
+        self.shared = shared
+        self.region_name = region_name
+
+    def client(self, service: str, config=None):
+        return self.shared.client(service, self.region_name, config)
+
+    def get_credentials(self):
+        return self.shared.get_credentials()
+
+
+class _SessionRegistry:
+    """
+    botocore sessions per profile or assume-role context, sharing one data loader.
+    
+    A fresh boto3 Session builds its own loader, so every new profile or region
+    parsed the service models and endpoint data again. Sessions here share a
+    single loader and are kept per context, so a new (profile, region) costs only
+    the client itself. A session is rebuilt when its credential fingerprint changes.
+    """
+
+    def __init__(self):
+        self._loader = None
+        self._sessions: Dict[str, _SharedSession] = {}
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, name: str, fingerprint: tuple, build: Callable[[], Any]) -> _SharedSession:
+        """
+        Return the session of name, creating it with build() (a new botocore
+        session) when missing or built for another fingerprint.
+        """
+        with self._lock:
+            shared = self._sessions.get(name)
+            if shared is not None and shared.fingerprint == fingerprint:
+                self.stats.record("hits")
+                return shared
+            self.stats.record("misses" if shared is None else "expired")
+        
+        core = build()
+        core.register_component("data_loader", self.loader())
+        with self._lock:
+            current = self._sessions.get(name)
+            if current is not None and current.fingerprint == fingerprint:
+                # Built concurrently by another thread
+                return current
+            shared = self._sessions[name] = _SharedSession(fingerprint, core)
+        logger.debug(f"Created botocore session for {name}")
+        return shared
+
+    def loader(self):
+        """The botocore data loader shared by all sessions."""
+        with self._lock:
+            if self._loader is None:
+                from botocore.loaders import create_loader
+                self._loader = create_loader()
+            return self._loader
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        """Drop the session of name (all sessions if None); returns how many were dropped."""
+        with self._lock:
+            names = [key for key in self._sessions if name is None or key == name]
+            for key in names:
+                del self._sessions[key]
+        self.stats.record("invalidations", len(names))
+        return len(names)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+# -------------------------------------------------------------------
+# AWS client registry
+# -------------------------------------------------------------------
+
+class _ClientRegistry:
+    """
+    Thread-safe LRU registry of long-lived boto3 clients.
+
+    Building a client loads the botocore service model and opens a new
+    connection pool, which costs hundreds of milliseconds. Clients are
+    thread-safe once created, so one instance per
+    (profile, region, service, config) is shared by all callers.
+    """
+
+    def __init__(self, factory: Callable[[Optional[str], Optional[str], str, str], Any], max_size: int = AWS_CLIENT_CACHE_SIZE):
+        self._factory = factory
+        self._max_size = max_size
+        # key -> (credential fingerprint, client)
+        self._clients: "OrderedDict[tuple, Tuple[Optional[tuple], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-key locks so concurrent callers build a given client only once
+        self._build_locks: Dict[tuple, threading.Lock] = {}
+        self.stats = CacheStats()
+
+    def get(self, profile: Optional[str], region: Optional[str], service: str, config_name: str = "default", fingerprint: Optional[tuple] = None):
+        """
+        Return the cached client for the key, building it on first use.
+        
+        A client built for another credential fingerprint (rotated keys,
+        re-login) is replaced, since it keeps signing with the old credentials.
+        """
+        key = (profile or "default", region, service, config_name)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._clients.move_to_end(key)
+                self.stats.record("hits")
+                return entry[1]
+            self.stats.record("misses" if entry is None else "expired")
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        
+        with build_lock:
+            # Another thread may have built it while we waited
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is not None and entry[0] == fingerprint:
+                    self._clients.move_to_end(key)
+                    return entry[1]
+            
+            try:
+                client = self._factory(key[0], region, service, config_name)
+            finally:
+                with self._lock:
+                    self._build_locks.pop(key, None)
+            
+            with self._lock:
+                self._clients[key] = (fingerprint, client)
+                self._clients.move_to_end(key)
+                while len(self._clients) > self._max_size:
+                    evicted_key, _ = self._clients.popitem(last=False)
+                    self.stats.record("evictions")
+                    logger.debug(f"Evicted AWS client {evicted_key}")
+            logger.debug(f"Created AWS client {key}")
+            return client
+
+    def resize(self, max_size: int):
+        """Change the maximum number of clients, evicting the least recently used beyond it."""
+        with self._lock:
+            self._max_size = max_size
+            while len(self._clients) > self._max_size:
+                self._clients.popitem(last=False)
+                self.stats.record("evictions")
+
+    def clear(self):
+        """Drop all cached clients (e.g. after client settings change)."""
+        with self._lock:
+            self.stats.record("invalidations", len(self._clients))
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+# -------------------------------------------------------------------
+# Request coalescing
+# -------------------------------------------------------------------
+
+class _FlightCall:
+    __slots__ = ("done", "result", "error", "priority")
+
+    def __init__(self, priority=None):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Scheduler priority of the leader's AWS calls
+        self.priority = priority
+
+
+class _SingleFlight:
+    """
+    Coalesce concurrent calls by key: while a call for a key is running, other
+    callers with the same key wait for it and share its result (or exception)
+    instead of starting their own.
+    
+    With a scheduler, a call led at background priority is raised to
+    interactive as soon as an interactive caller joins it.
+    """
+
+    def __init__(self, scheduler: Optional[AWSCallScheduler] = None):
+        self._scheduler = scheduler
+        self._calls: Dict[tuple, _FlightCall] = {}
+        self._lock = threading.Lock()
+        # Number of callers that joined a call already in flight
+        self.coalesced = 0
+
+    def do(self, key: tuple, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._new_call()
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            if self._scheduler is not None and not self._scheduler.is_background():
+                self._scheduler.promote(call.priority)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+    def _new_call(self) -> _FlightCall:
+        return _FlightCall(self._scheduler.current() if self._scheduler else None)
+
+    def lead(self, key: tuple) -> Optional[_FlightCall]:
+        """
+        Start a call for key and return it, or None if one is already running.
+        
+        For leaders that can't run as a single function (e.g. a generator
+        streaming its results); the call must be completed with finish().
+        """
+        with self._lock:
+            if key in self._calls:
+                return None
+            call = self._calls[key] = self._new_call()
+            return call
+
+    def finish(self, key: tuple, call: _FlightCall, result: Any = None, error: Optional[BaseException] = None):
+        """Complete a call started with lead(), releasing its waiters."""
+        call.result, call.error = result, error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    def in_flight(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._calls
+
+# -------------------------------------------------------------------
+# Instance details cache
+# -------------------------------------------------------------------
+
+def _instance_details(i: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the instance_details() dict from a DescribeInstances instance."""
+    instance_id = i["InstanceId"]
+    
+    # Extract IAM Role
+    iam_role = ""
+    iam_profile = i.get("IamInstanceProfile")
+    if iam_profile:
+        arn = iam_profile.get("Arn", "")
+        if arn:
+            # Extract role name from ARN: arn:aws:iam::123456789012:instance-profile/role-name
+            # or arn:aws:iam::123456789012:role/role-name
+            parts = arn.split("/")
+            if len(parts) > 1:
+                iam_role = parts[-1]
+            else:
+                iam_role = arn
+    
+    # Extract Security Groups
+    security_groups = []
+    for sg in i.get("SecurityGroups", []):
+        sg_id = sg.get("GroupId", "")
+        sg_name = sg.get("GroupName", "")
+        if sg_name:
+            security_groups.append(f"{sg_name} ({sg_id})")
+        else:
+            security_groups.append(sg_id)
+    security_groups_str = ", ".join(security_groups) if security_groups else ""
+    
+    return {
+        "id": instance_id,
+        "name": next((t["Value"] for t in i.get("Tags", []) if t["Key"] == "Name"), instance_id),
+        "type": i.get("InstanceType", ""),
+        "state": i.get("State", {}).get("Name", ""),
+        "platform": i.get("PlatformDetails", ""),
+        "private_ip": i.get("PrivateIpAddress", "") or "N/A",
+        "public_ip": i.get("PublicIpAddress", "") or "N/A",
+        "vpc_id": i.get("VpcId", "") or "N/A",
+        "subnet_id": i.get("SubnetId", "") or "N/A",
+        "iam_role": iam_role or "N/A",
+        "ami_id": i.get("ImageId", "") or "N/A",
+        "key_name": i.get("KeyName", "") or "N/A",
+        "security_groups": security_groups_str or "N/A",
+    }
+
+
+class _DetailsCache:
+    """
+    Thread-safe LRU cache of instance details per (profile, region, instance ID).
+
+    Filled from every DescribeInstances listing, so opening details, starting a
+    session or listing connections rarely needs an API call of its own.
+    """
+
+    def __init__(self, ttl: float = INSTANCE_DETAILS_TTL, max_size: int = INSTANCE_DETAILS_CACHE_SIZE):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (stored_at, details)
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, profile: str, region: Optional[str], instance_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached details, or None if missing or expired."""
+        key = (profile, region, instance_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.record("misses")
+                return None
+            if time.time() - entry[0] >= self._ttl:
+                del self._entries[key]
+                self.stats.record("expired")
+                return None
+            self._entries.move_to_end(key)
+            self.stats.record("hits")
+            return dict(entry[1])
+
+    def put_many(self, profile: str, region: Optional[str], details: List[Dict[str, Any]]):
+        now = time.time()
+        with self._lock:
+            for item in details:
+                key = (profile, region, item["id"])
+                self._entries[key] = (now, item)
+                self._entries.move_to_end(key)
+            self._evict()
+
+    def resize(self, max_size: int):
+        with self._lock:
+            self._max_size = max_size
+            self._evict()
+
+    def _evict(self):
+        """Drop the least recently used entries beyond the maximum size (caller holds the lock)."""
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.stats.record("evictions")
+
+    def invalidate(self, profile: str, region: Optional[str], instance_ids=None) -> int:
+        """Drop the given instances, or every instance of (profile, region) when instance_ids is None; returns how many were cached."""
+        with self._lock:
+            if instance_ids is not None:
+                keys = [(profile, region, iid) for iid in instance_ids if (profile, region, iid) in self._entries]
+            else:
+                keys = [k for k in self._entries if k[0] == profile and k[1] == region]
+            for key in keys:
+                del self._entries[key]
+            self.stats.record("invalidations", len(keys))
+        return len(keys)
+
+    def invalidate_profile(self, profile: str) -> int:
+        """Drop every instance of profile, in all regions; returns how many were cached."""
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == profile]
+            for key in keys:
+                del self._entries[key]
+            self.stats.record("invalidations", len(keys))
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.stats.record("invalidations", len(self._entries))
+            self._entries.clear()
+
+    def usage(self) -> Dict[str, Any]:
+        """Entry count, approximate size and age distribution."""
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "entries": len(entries),
+            "bytes": approx_size([details for _, details in entries]),
+            "age": age_summary(now - stored_at for stored_at, _ in entries),
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
 # -------------------------------------------------------------------
 # AWS Manager
 # -------------------------------------------------------------------
@@ -128,10 +557,67 @@ class AWSManager:
         self._connections: Dict[str, Connection] = {}
         # Thread lock for thread-safe access to connections dictionary
         self._connections_lock = threading.Lock()
-        # Instance cache: (profile, region) -> (instances_list, timestamp)
-        self._instance_cache: Dict[tuple, tuple] = {}
+        # Instance cache: (profile, region) -> InventorySnapshot
+        self._instance_cache: Dict[tuple, InventorySnapshot] = {}
         self._instance_cache_lock = threading.Lock()
-        self._instance_cache_ttl = 300  # 5 minutes
+        self._instance_cache_ttl = INVENTORY_CACHE_TTL
+        # Generation counter shared by all snapshots, and per-key history of
+        # (generation, id -> instance) used to answer ?since= delta queries
+        self._generation = 0
+        self._snapshot_history: Dict[tuple, deque] = {}
+        # Last snapshot per key persisted on disk for warm starts and offline
+        # browsing; the generation counter resumes above what it holds
+        self._store = InventoryStore()
+        self._generation_seeded = False
+        # Error of the last failed refresh per key, cleared by the next success
+        self._refresh_errors: Dict[tuple, str] = {}
+        # Search index per key with the generation it reflects; built on first
+        # search, then kept current from the diff of each refresh
+        self._search_indexes: Dict[tuple, Tuple[int, TrigramIndex]] = {}
+        # Instance details from DescribeInstances listings, per (profile, region, ID)
+        self._details_cache = _DetailsCache(max_size=getattr(preferences, "cache_max_details", INSTANCE_DETAILS_CACHE_SIZE))
+        # Change events published by refreshes, for /api/events subscribers
+        self._events = InventoryEventLog()
+        # Last read time per cache key, so idle snapshots stop being refreshed
+        self._instance_cache_access: Dict[tuple, float] = {}
+        # Reads per cache key, for the LFU eviction policy
+        self._instance_cache_uses: Dict[tuple, int] = {}
+        # Rate limits AWS calls per (account, region, API), interactive calls first
+        self._scheduler = AWSCallScheduler()
+        # Concurrent inventory fetches for the same (profile, region[, filter]) share one
+        # call, which runs at interactive priority once a request waits on it
+        self._inflight = _SingleFlight(self._scheduler)
+        # Keys with a background revalidation in flight
+        self._refreshing: set = set()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_stop = threading.Event()
+        # Long-lived boto3 clients keyed by (profile, region, service, config)
+        self._clients = _ClientRegistry(self._create_client, max_size=getattr(preferences, "cache_max_clients", AWS_CLIENT_CACHE_SIZE))
+        # Assume-role contexts: context name -> (source profile, role ARN), and
+        # their refreshable temporary credentials
+        self._assumed_roles: Dict[str, tuple] = {}
+        # botocore sessions (credentials, parsed service models) per profile/context
+        self._sessions = _SessionRegistry()
+        # Local ports reserved for port forwarding sessions
+        self._ports = PortAllocator(probe=lambda port: _is_port_free(port, retries=1))
+        # Account identity per profile/context, as (credential fingerprint, resolved_at,
+        # {"account_id", "account_alias"}); reused while the credentials are unchanged
+        self._identity_cache: Dict[str, Tuple[tuple, float, Dict[str, Any]]] = {}
+        self._identity_lock = threading.Lock()
+        # Discovery caches: profile names with the (mtime, size) of the files they
+        # were read from, and enabled regions per profile as (fetched_at, regions)
+        self._profiles_cache: Optional[Tuple[tuple, List[str]]] = None
+        self._regions_cache: Dict[str, Tuple[float, List[str]]] = {}
+        # Regions botocore's endpoint data lists for EC2, read once
+        self._known_regions: Optional[List[str]] = None
+        self._discovery_lock = threading.Lock()
+        # SSH key name -> key file path in the configured key folders, with the
+        # folders' (mtime, size) it was scanned at
+        self._key_paths: Optional[Tuple[tuple, Dict[str, str]]] = None
+        # Progress of the background warm-ups started on connect and at startup, per key
+        self._prefetches: Dict[tuple, Dict[str, Any]] = {}
+        # Counters of the caches without their own (the client and details caches keep theirs)
+        self._cache_stats = {name: CacheStats() for name in ("inventory", "regions", "profiles", "identity")}
         # Cleanup any orphaned processes on startup
         self._cleanup_orphaned_processes()
     
@@ -171,181 +657,1206 @@ class AWSManager:
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                     continue
             
-            if orphaned_count > 0:
-                logger.info(f"Cleaned up {orphaned_count} orphaned SSM processes on startup")
-        except ImportError:
-            # psutil not available, skip orphan cleanup
-            logger.debug("psutil not available, skipping orphan process cleanup")
-        except Exception as e:
-            logger.warning(f"Error during orphan process cleanup: {e}", exc_info=True)
+            if orphaned_count > 0:
+                logger.info(f"Cleaned up {orphaned_count} orphaned SSM processes on startup")
+        except ImportError:
+            # psutil not available, skip orphan cleanup
+            logger.debug("psutil not available, skipping orphan process cleanup")
+        except Exception as e:
+            logger.warning(f"Error during orphan process cleanup: {e}", exc_info=True)
+
+    # ------------- AWS Sessions & Helpers -------------
+
+    def session(self, profile: Optional[str] = None, region: Optional[str] = None) -> _RegionSession:
+        """
+        Return a session for (profile or assume-role context, region).
+        
+        Sessions of a context share their credentials and, across contexts, the
+        parsed service models, so this is cheap after the first call per context.
+        """
+        profile = profile or self._profile or "default"
+        region = region or self._region
+        fingerprint = self._credential_fingerprint(profile)
+        if profile in self._assumed_roles:
+            build = lambda: self._assumed_role_core(profile)
+        else:
+            build = lambda: self._profile_core(profile)
+        return _RegionSession(self._sessions.get(profile, fingerprint, build), region)
+
+    def _profile_core(self, profile: str):
+        import botocore.session
+        # Always the named profile: an explicit profile takes precedence over
+        # AWS_PROFILE and credential environment variables, as with boto3.Session(profile_name=...)
+        return botocore.session.Session(profile=profile)
+
+    def assume_role_context(self, profile: str, role_arn: str) -> str:
+        """
+        Register an assume-role target and return its context name.
+        
+        The context name can be used anywhere a profile name is accepted
+        (clients, snapshots, identity); credentials are obtained from the
+        source profile via STS AssumeRole and refreshed before they expire.
+        """
+        context = f"{profile or 'default'}>{role_arn}"
+        with self._identity_lock:
+            self._assumed_roles[context] = (profile or "default", role_arn)
+        return context
+
+    def _assumed_role_core(self, context: str):
+        import botocore.session
+        from botocore.credentials import CredentialProvider, RefreshableCredentials
+        
+        source_profile, role_arn = self._assumed_roles[context]
+        
+        def refresh() -> Dict[str, str]:
+            sts = self.client("sts", profile=source_profile)
+            resp = sts.assume_role(RoleArn=role_arn, RoleSessionName=ASSUME_ROLE_SESSION_NAME)
+            creds = resp["Credentials"]
+            return {
+                "access_key": creds["AccessKeyId"],
+                "secret_key": creds["SecretAccessKey"],
+                "token": creds["SessionToken"],
+                "expiry_time": creds["Expiration"].isoformat(),
+            }
+        
+        class AssumeRoleProvider(CredentialProvider):
+            METHOD = "sts-assume-role"
+            
+            def load(self):
+                return RefreshableCredentials.create_from_metadata(
+                    metadata=refresh(),
+                    refresh_using=refresh,
+                    method=self.METHOD
+                )
+        
+        core = botocore.session.Session()
+        # First in the credential chain; clients built from this session share the
+        # refreshable credentials, so pooled clients keep working after the role session expires
+        core.get_component("credential_provider").insert_before("env", AssumeRoleProvider())
+        return core
+
+    def _credential_fingerprint(self, profile: str) -> tuple:
+        """
+        Cheap, local fingerprint of the credentials behind a profile or assume-role context.
+        
+        Built from the AWS config files' (mtime, size) and the credential environment
+        variables (hashed), so rotated keys or a re-login invalidate cached identities
+        without resolving any credentials.
+        """
+        if profile in self._assumed_roles:
+            source_profile, role_arn = self._assumed_roles[profile]
+            return ("role", role_arn, self._credential_fingerprint(source_profile))
+        aws_dir = os.path.expanduser("~/.aws")
+        files = tuple(_file_signature(os.path.join(aws_dir, fname)) for fname in ("credentials", "config"))
+        env = hashlib.sha256("\0".join(
+            os.environ.get(name, "") for name in ("AWS_ACCESS_KEY_ID", "AWS_SESSION_TOKEN", "AWS_PROFILE")
+        ).encode("utf-8")).hexdigest()
+        return ("profile", profile, files, env)
+
+    def _account_identity(self, profile: str) -> Dict[str, Any]:
+        """
+        Return (and cache) the account ID and alias behind a profile or assume-role context.
+        
+        A cached identity is reused for IDENTITY_CACHE_TTL while the credential
+        fingerprint is unchanged. Otherwise STS and the IAM alias lookup run
+        concurrently; the alias is waited for only IDENTITY_ALIAS_GRACE seconds
+        after STS answers, and is added to the cache when it arrives later.
+        
+        Raises:
+            ClientError: If STS rejects the credentials
+        """
+        fingerprint = self._credential_fingerprint(profile)
+        with self._identity_lock:
+            entry = self._identity_cache.get(profile)
+        if entry is not None and entry[0] == fingerprint and time.time() - entry[1] < IDENTITY_CACHE_TTL:
+            self._cache_stats["identity"].record("hits")
+            return dict(entry[2])
+        self._cache_stats["identity"].record("misses" if entry is None else "expired")
+        
+        alias_future: Future = Future()
+        
+        def fetch_alias():
+            try:
+                aliases = self.client("iam", profile=profile, config_name="iam").list_account_aliases()
+                alias_future.set_result((aliases.get("AccountAliases") or [None])[0])
+            except Exception as e:
+                # Account alias is optional, so we don't fail if we can't get it
+                logger.debug(f"Could not retrieve account alias for {profile}: {e}")
+                alias_future.set_result(None)
+        
+        threading.Thread(target=fetch_alias, daemon=True).start()
+        account_id = self.client("sts", profile=profile).get_caller_identity()["Account"]
+        resolved_at = time.time()
+        
+        alias_pending = False
+        try:
+            account_alias = alias_future.result(timeout=IDENTITY_ALIAS_GRACE)
+        except FutureTimeoutError:
+            account_alias, alias_pending = None, True
+        
+        identity = {"account_id": account_id, "account_alias": account_alias}
+        with self._identity_lock:
+            self._identity_cache[profile] = (fingerprint, resolved_at, identity)
+        
+        if alias_pending:
+            # Runs at once if the alias arrived meanwhile
+            def store_late_alias(future: Future):
+                with self._identity_lock:
+                    current = self._identity_cache.get(profile)
+                    if current is not None and current[1] == resolved_at:
+                        self._identity_cache[profile] = (fingerprint, resolved_at, {**identity, "account_alias": future.result()})
+            
+            alias_future.add_done_callback(store_late_alias)
+        return dict(identity)
+
+    def _client_config(self, config_name: str = "default") -> "Config":
+        """Build the botocore config for a named client profile ("default" or "iam")."""
+        from botocore.config import Config
+        max_pool = getattr(self.preferences, "max_pool_connections", AWS_MAX_POOL_CONNECTIONS)
+        if config_name == "iam":
+            return Config(
+                retries={"max_attempts": AWS_IAM_MAX_RETRIES, "mode": AWS_RETRY_MODE},
+                connect_timeout=AWS_IAM_TIMEOUT,
+                read_timeout=AWS_IAM_READ_TIMEOUT,
+                max_pool_connections=max_pool
+            )
+        return Config(
+            retries={"max_attempts": AWS_MAX_RETRIES, "mode": AWS_RETRY_MODE},
+            connect_timeout=AWS_CONNECT_TIMEOUT,
+            read_timeout=AWS_READ_TIMEOUT,
+            max_pool_connections=max_pool
+        )
+
+    def _create_client(self, profile: Optional[str], region: Optional[str], service: str, config_name: str):
+        client = self.session(profile, region).client(service, config=self._client_config(config_name))
+        # Every call of the client takes a token of its (account, region, API) first
+        self._scheduler.attach(client, lambda api: (self._account_key(profile), client.meta.region_name or "", api))
+        return client
+
+    def _account_key(self, profile: Optional[str]) -> str:
+        """Account ID behind a profile or context once known (profile name until then)."""
+        profile = profile or "default"
+        with self._identity_lock:
+            entry = self._identity_cache.get(profile)
+        return entry[2]["account_id"] if entry is not None else profile
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        """AWS calls, throttled responses and queueing per (account, region, API)."""
+        return self._scheduler.stats()
+
+    def client(self, service: str, profile: Optional[str] = None, region: Optional[str] = None, config_name: str = "default"):
+        """
+        Get a pooled boto3 client.
+        
+        Args:
+            service: AWS service name (ec2, ssm, sts, iam, ...)
+            profile: AWS profile name (defaults to the connected profile)
+            region: AWS region name (defaults to the connected region)
+            config_name: Named client config ("default" or "iam")
+        """
+        profile = profile or self._profile or "default"
+        return self._clients.get(profile, region or self._region, service, config_name, self._credential_fingerprint(profile))
+
+    def reset_clients(self):
+        """Drop pooled clients so the next call picks up new client settings."""
+        self._clients.clear()
+
+    def describe_regions(self, profile: Optional[str] = None, wait: bool = False) -> List[str]:
+        """
+        Return enabled EC2 regions for the profile.
+        
+        Regions are cached per profile in memory and on disk. An entry older than
+        REGIONS_CACHE_TTL is still returned while a background fetch replaces it.
+        
+        Args:
+            profile: AWS profile name
+            wait: With nothing cached, wait for DescribeRegions instead of returning
+                the regions botocore knows about while it runs in the background
+        """
+        profile = profile or "default"
+        with self._discovery_lock:
+            entry = self._regions_cache.get(profile)
+        if entry is None:
+            try:
+                entry = self._store.load_regions(profile)
+            except Exception as e:
+                logger.warning(f"Could not read stored regions for {profile}: {e}")
+            if entry is not None:
+                with self._discovery_lock:
+                    entry = self._regions_cache.setdefault(profile, entry)
+        
+        stats = self._cache_stats["regions"]
+        if entry is not None:
+            fetched_at, regions = entry
+            if time.time() - fetched_at >= REGIONS_CACHE_TTL:
+                stats.record("expired")
+                self._refresh_regions_async(profile)
+            else:
+                stats.record("hits")
+            return list(regions)
+        stats.record("misses")
+        if wait:
+            return list(self._fetch_regions(profile))
+        self._refresh_regions_async(profile)
+        return self.list_regions()
+
+    def _fetch_regions(self, profile: str) -> List[str]:
+        """Call DescribeRegions for profile (once, however many callers) and cache the result."""
+        def fetch():
+            #  Always specify a fallback region (for profiles without a region)
+            ec2 = self.client("ec2", profile=profile, region="us-east-1")
+            resp = ec2.describe_regions(AllRegions=False)
+            regions = sorted(r["RegionName"] for r in resp["Regions"])
+            fetched_at = time.time()
+            with self._discovery_lock:
+                self._regions_cache[profile] = (fetched_at, regions)
+            try:
+                self._store.save_regions(profile, regions, fetched_at)
+            except Exception as e:
+                logger.warning(f"Could not persist regions for {profile}: {e}")
+            return regions
+        return self._inflight.do(("regions", profile), fetch)
+
+    def _refresh_regions_async(self, profile: str):
+        if self._inflight.in_flight(("regions", profile)):
+            return
+        
+        def refresh():
+            try:
+                with self._scheduler.background():
+                    self._fetch_regions(profile)
+            except Exception as e:
+                logger.warning(f"Could not fetch regions for {profile}: {e}")
+        
+        threading.Thread(target=refresh, daemon=True).start()
+
+    # ------------- Basic Info -------------
+
+    def list_profiles(self) -> List[str]:
+        """Return the configured profile names, re-reading the AWS config files only when they change."""
+        import configparser
+        aws_dir = os.path.expanduser("~/.aws")
+        paths = [os.path.join(aws_dir, fname) for fname in ("credentials", "config")]
+        signature = tuple(_file_signature(path) for path in paths)
+        with self._discovery_lock:
+            if self._profiles_cache is not None and self._profiles_cache[0] == signature:
+                self._cache_stats["profiles"].record("hits")
+                return list(self._profiles_cache[1])
+        self._cache_stats["profiles"].record("misses" if self._profiles_cache is None else "expired")
+        
+        profiles = set()
+        for path, stat in zip(paths, signature):
+            if stat is None:
+                continue
+            cfg = configparser.ConfigParser()
+            cfg.read(path)
+            for sec in cfg.sections():
+                if path.endswith("config") and sec.startswith("profile "):
+                    sec = sec.replace("profile ", "", 1)
+                profiles.add(sec)
+        result = sorted(profiles or ["default"])
+        with self._discovery_lock:
+            self._profiles_cache = (signature, result)
+        return list(result)
+
+    def list_regions(self) -> List[str]:
+        """Regions botocore knows EC2 in, without calling AWS (opt-in regions included)."""
+        if self._known_regions is None:
+            import botocore.session
+            # The list is static per botocore version; read it once, through the shared loader
+            core = botocore.session.Session()
+            core.register_component("data_loader", self._sessions.loader())
+            self._known_regions = sorted(core.get_available_regions("ec2"))
+        return list(self._known_regions)
+
+    def connect(self, profile: str, region: str) -> Dict[str, Any]:
+        """
+        Connect to AWS and validate credentials.
+        
+        Args:
+            profile: AWS profile name
+            region: AWS region name
+            
+        Returns:
+            Dict with account_id and optional account_alias
+            
+        Raises:
+            ClientError: If AWS credentials are invalid or connection fails
+            RuntimeError: If connection timeout occurs
+        """
+        from botocore.exceptions import ClientError
+        
+        # Snapshots are kept per (profile, region), so switching contexts keeps
+        # them: a cached one is served and revalidated like any stale snapshot
+        self._profile, self._region = profile, region
+        
+        # Known profiles answer from the identity cache; otherwise only STS is
+        # waited for, the IAM alias lookup runs alongside it
+        try:
+            identity = self._account_identity(profile or "default")
+            self._account_id = identity["account_id"]
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code", "")
+            error_message = e.response.get("Error", {}).get("Message", str(e))
+            logger.error(f"AWS connection failed: {error_code} - {error_message}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during AWS connection: {e}", exc_info=True)
+            raise RuntimeError(f"Failed to connect to AWS: {str(e)}")
+        
+        # The first instance listing then joins the fetch started here
+        if getattr(self.preferences, "prefetch", True):
+            self.prefetch(profile, region)
+        return identity
+
+    # ------------- EC2 + SSM -------------
+
+    def list_instances(self, filter_state: Optional[str] = None, refresh: str = "swr") -> List[Dict[str, Any]]:
+        """
+        List all EC2 instances in the current region.
+        Uses parallel API calls (EC2 and SSM) and caching for better performance.
+        
+        State-filtered listings are sliced from the full snapshot, which is
+        fetched (or joined, if already being fetched) when none is usable.
+        
+        Args:
+            filter_state: Optional instance state filter (e.g., 'running', 'stopped').
+                         If None, returns all instances. Default: None.
+            refresh: Cache mode:
+                     'swr' returns the cached snapshot at once and revalidates it in the
+                     background when it is stale (default),
+                     'blocking' refetches when the snapshot is older than the cache TTL,
+                     'force' always refetches.
+        
+        Returns:
+            InstanceList of instance dictionaries with id, name, type, state, os, has_ssm;
+            its ``meta`` carries the snapshot age, and ``offline`` when AWS could not
+            be reached and the last known snapshot is served instead
+            
+        Raises:
+            ClientError: If AWS API call fails and no snapshot is known for the context
+        """
+        profile = self._profile or "default"
+        region = self._region
+        key = (profile, region)
+        
+        snapshot, refreshing = self._cached_snapshot(key, refresh)
+        if snapshot is None:
+            # Filtered or not, join (or start) the one full fetch and slice it,
+            # so the next state switch is served from the snapshot it leaves
+            snapshot = self._refresh_or_last_known(profile, region)
+        
+        if refresh == "swr":
+            self._ensure_refresher()
+        return self._instance_list(snapshot, filter_state, refreshing)
+
+    def page_instances(self, filter_state: Optional[str] = None, refresh: str = "swr", sort: str = "name",
+                       limit: Optional[int] = None, cursor: Optional[str] = None) -> InstanceList:
+        """
+        List one sorted page of the instances in the current region.
+        
+        Pages are sliced from per-snapshot sorted indexes, so each call costs
+        O(page) once the index exists rather than O(fleet).
+        
+        Args:
+            filter_state: Optional instance state filter
+            refresh: Cache mode, as for list_instances
+            sort: Sort key from INVENTORY_SORT_KEYS, prefixed with '-' for descending
+            limit: Maximum instances per page (all remaining if None)
+            cursor: ``next_cursor`` returned with the previous page
+        
+        Returns:
+            InstanceList whose ``meta`` also carries ``total`` and ``next_cursor``
+            
+        Raises:
+            ValueError: If the sort key or cursor is invalid
+        """
+        descending = sort.startswith("-")
+        sort_key = sort.lstrip("-")
+        if sort_key not in INVENTORY_SORT_KEYS:
+            raise ValueError(f"Invalid sort key: {sort_key}")
+        
+        snapshot, refreshing = self._snapshot_for(self._profile or "default", self._region, refresh)
+        instances, next_cursor, total = snapshot.page(sort_key, descending, limit, cursor, filter_state)
+        meta = self._snapshot_meta(snapshot, refreshing)
+        meta.update(total=total, next_cursor=next_cursor)
+        return InstanceList(instances, meta)
+
+    def search_instances(self, query: str, filter_state: Optional[str] = None, limit: int = INVENTORY_SEARCH_LIMIT,
+                         refresh: str = "swr") -> InstanceList:
+        """
+        Fuzzy-search the instances in the current region by name, ID, private IP and selected tags.
+        
+        Args:
+            query: Free-text query
+            filter_state: Optional instance state filter
+            limit: Maximum number of results
+            refresh: Cache mode, as for list_instances
+        
+        Returns:
+            InstanceList of matching instances, best matches first
+        """
+        snapshot, refreshing = self._snapshot_for(self._profile or "default", self._region, refresh)
+        ids = self._search_index(snapshot).search(query, limit=None if filter_state else limit)
+        results = []
+        for iid in ids:
+            inst = snapshot.by_id.get(iid)
+            if inst is not None and (filter_state is None or inst.get("state") == filter_state):
+                results.append(inst)
+                if len(results) >= limit:
+                    break
+        return InstanceList(results, self._snapshot_meta(snapshot, refreshing))
+
+    def query_instances(self, query: str, limit: Optional[int] = None, refresh: str = "swr") -> InstanceList:
+        """
+        Filter the instances in the current region with the inventory query language
+        (e.g. ``tag:env=prod type:m5.* state:running ssm:yes``).
+        
+        Args:
+            query: Filter query, see src/inventory_query.py
+            limit: Maximum number of instances to return
+            refresh: Cache mode, as for list_instances
+        
+        Returns:
+            InstanceList of matching instances in name order; ``meta["total"]`` counts all matches
+            
+        Raises:
+            ValueError: If the query is malformed
+        """
+        snapshot, refreshing = self._snapshot_for(self._profile or "default", self._region, refresh)
+        matches = snapshot.query(query)
+        meta = self._snapshot_meta(snapshot, refreshing)
+        meta["total"] = len(matches)
+        return InstanceList(matches[:limit] if limit else matches, meta)
+
+    def instance_facets(self, refresh: str = "swr") -> Dict[str, Any]:
+        """
+        Return instance counts per state, type, OS, SSM status and tag value in the current region.
+        
+        Args:
+            refresh: Cache mode, as for list_instances
+        
+        Returns:
+            Dict with ``facets`` ({"state": {...}, "type": {...}, "os": {...}, "ssm": {...},
+            "tags": {key: {value: count}}}), ``total`` and the snapshot metadata
+        """
+        snapshot, refreshing = self._snapshot_for(self._profile or "default", self._region, refresh)
+        return {
+            "facets": snapshot.attributes.facets,
+            "total": len(snapshot.instances),
+            **self._snapshot_meta(snapshot, refreshing),
+        }
+
+    def _search_index(self, snapshot: InventorySnapshot) -> TrigramIndex:
+        """Return the search index for snapshot, building it if it is missing or out of step."""
+        with self._instance_cache_lock:
+            entry = self._search_indexes.get(snapshot.key)
+        if entry is not None and entry[0] == snapshot.generation:
+            return entry[1]
+        index = TrigramIndex(snapshot.instances)
+        with self._instance_cache_lock:
+            # Another request may have built this generation's index, or a newer
+            # one, meanwhile; never replace a newer index with this stale one
+            entry = self._search_indexes.get(snapshot.key)
+            if entry is None or entry[0] < snapshot.generation:
+                self._search_indexes[snapshot.key] = (snapshot.generation, index)
+            elif entry[0] == snapshot.generation:
+                return entry[1]
+        return index
+
+    def _cached_snapshot(self, key: tuple, refresh: str) -> tuple:
+        """
+        Look up the cached snapshot for key according to the refresh mode.
+        
+        Returns:
+            Tuple of (snapshot or None if it must be refetched, refreshing flag)
+        """
+        with self._instance_cache_lock:
+            snapshot = self._instance_cache.get(key)
+            self._instance_cache_access[key] = time.time()
+            self._instance_cache_uses[key] = self._instance_cache_uses.get(key, 0) + 1
+        
+        stats = self._cache_stats["inventory"]
+        if refresh == "force":
+            stats.record("bypassed")
+            return None, False
+        if snapshot is None:
+            stats.record("misses")
+            snapshot = self._load_persisted(key)
+            if snapshot is None:
+                return None, False
+            stats.record("disk_hits")
+            if refresh == "swr":
+                # Warm start: show the last known inventory however old it is
+                # and replace it as soon as AWS answers
+                logger.debug(f"Returning stored instance list for {key} (age {snapshot.age:.1f}s)")
+                return snapshot, self._revalidate_async(key)
+        
+        age = snapshot.age
+        if refresh == "swr" and age < INVENTORY_MAX_STALENESS:
+            refreshing = False
+            if age >= INVENTORY_ACTIVE_REFRESH_INTERVAL:
+                # Serve the stale snapshot now, refresh it behind the caller's back
+                refreshing = self._revalidate_async(key)
+                stats.record("stale_hits")
+            stats.record("hits")
+            logger.debug(f"Returning cached instance list for {key} (age {age:.1f}s)")
+            return snapshot, refreshing
+        if refresh == "blocking" and age < self._instance_cache_ttl:
+            stats.record("hits")
+            logger.debug(f"Returning cached instance list for {key}")
+            return snapshot, False
+        stats.record("expired")
+        return None, False
+
+    def _load_persisted(self, key: tuple) -> Optional[InventorySnapshot]:
+        """Adopt the snapshot stored on disk for key into the in-memory cache."""
+        try:
+            stored = self._store.load(*key)
+        except Exception as e:
+            logger.warning(f"Could not read stored inventory for {key}: {e}")
+            return None
+        if stored is None:
+            return None
+        with self._instance_cache_lock:
+            # A fetch may have completed meanwhile; it wins over the stored copy
+            current = self._instance_cache.get(key)
+            if current is not None:
+                return current
+            self._generation = max(self._generation, stored.generation)
+            self._instance_cache[key] = stored
+            history = self._snapshot_history.setdefault(key, deque(maxlen=INVENTORY_HISTORY_SIZE))
+            history.append((stored.generation, stored.by_id))
+        self._evict_snapshots()
+        return stored
+
+    def _persist_snapshot(self, snapshot: InventorySnapshot, changed: bool):
+        """Write snapshot to the on-disk store, logging rather than raising failures."""
+        try:
+            if changed:
+                self._store.save(snapshot)
+            else:
+                self._store.touch(snapshot)
+        except Exception as e:
+            logger.warning(f"Could not persist inventory for {snapshot.key}: {e}")
+
+    def _seed_generation(self):
+        """Start the generation counter above the stored snapshots' (caller holds the cache lock)."""
+        if self._generation_seeded:
+            return
+        self._generation_seeded = True
+        try:
+            self._generation = max(self._generation, self._store.max_generation())
+        except Exception as e:
+            logger.warning(f"Could not read stored inventory generation: {e}")
+        # Changes made before this process started can't be replayed
+        self._events.raise_floor(self._generation)
+
+    def _refresh_or_last_known(self, profile: str, region: Optional[str]) -> InventorySnapshot:
+        """
+        Refresh the snapshot for (profile, region), falling back to the last known
+        one (in memory or on disk) when AWS cannot be reached.
+        """
+        key = (profile, region)
+        try:
+            return self._refresh_snapshot(profile, region)
+        except Exception as e:
+            with self._instance_cache_lock:
+                snapshot = self._instance_cache.get(key)
+            if snapshot is None:
+                snapshot = self._load_persisted(key)
+            if snapshot is None:
+                raise
+            logger.warning(f"Serving last known inventory for {key} (age {snapshot.age:.1f}s): {e}")
+            return snapshot
+
+    def offline_instances(self, profile: str, region: Optional[str], filter_state: Optional[str] = None) -> Optional[InstanceList]:
+        """
+        Return the last known instance list for (profile, region) without contacting AWS.
+        
+        Args:
+            profile: AWS profile name
+            region: AWS region name
+            filter_state: Optional instance state filter
+        
+        Returns:
+            InstanceList flagged ``offline`` in its ``meta``, or None if nothing is known
+        """
+        key = (profile or "default", region)
+        with self._instance_cache_lock:
+            snapshot = self._instance_cache.get(key)
+        if snapshot is None:
+            snapshot = self._load_persisted(key)
+        if snapshot is None:
+            return None
+        instances = self._instance_list(snapshot, filter_state)
+        instances.meta["offline"] = True
+        return instances
+
+    def _instance_list(self, snapshot: InventorySnapshot, filter_state: Optional[str] = None, refreshing: bool = False) -> InstanceList:
+        return InstanceList(snapshot.select(filter_state), self._snapshot_meta(snapshot, refreshing))
+
+    def _snapshot_meta(self, snapshot: InventorySnapshot, refreshing: bool = False) -> Dict[str, Any]:
+        with self._instance_cache_lock:
+            refreshing = refreshing or snapshot.key in self._refreshing
+            error = self._refresh_errors.get(snapshot.key)
+        age = snapshot.age
+        meta = {
+            "age": age,
+            "stale": age >= INVENTORY_ACTIVE_REFRESH_INTERVAL,
+            "refreshing": refreshing,
+            "generation": snapshot.generation,
+            "offline": error is not None,
+        }
+        if error is not None:
+            meta["error"] = error
+        return meta
+
+    def instance_changes(self, since: int, filter_state: Optional[str] = None, refresh: str = "swr") -> Dict[str, Any]:
+        """
+        Return the inventory changes since a previously seen generation.
+        
+        Args:
+            since: Generation the client currently holds
+            filter_state: Optional instance state filter the client's view uses
+            refresh: Cache mode, as for list_instances
+        
+        Returns:
+            Dict with the current ``generation`` and either ``added``/``removed``/``changed``
+            lists, or ``resync: True`` and the full ``instances`` list when ``since``
+            is unknown or too old
+        """
+        profile = self._profile or "default"
+        region = self._region
+        key = (profile, region)
+        
+        snapshot, refreshing = self._snapshot_for(profile, region, refresh)
+        
+        result: Dict[str, Any] = {"since": since, **self._snapshot_meta(snapshot, refreshing)}
+        
+        if since == snapshot.generation:
+            result.update(resync=False, added=[], removed=[], changed=[])
+            return result
+        
+        with self._instance_cache_lock:
+            history = list(self._snapshot_history.get(key, ()))
+        base = next((by_id for generation, by_id in history if generation == since), None)
+        if base is None:
+            # Client is too far behind (or on another profile/region): send everything
+            result.update(resync=True, instances=snapshot.select(filter_state))
+            return result
+        
+        current = snapshot.by_id
+        if filter_state is not None:
+            base = {iid: inst for iid, inst in base.items() if inst.get("state") == filter_state}
+            current = {inst["id"]: inst for inst in snapshot.select(filter_state)}
+        result.update(resync=False, **diff_instances(base, current))
+        return result
+
+    def _snapshot_for(self, profile: str, region: Optional[str], refresh: str = "swr") -> Tuple[InventorySnapshot, bool]:
+        """Return a usable snapshot for (profile, region), fetching it if needed."""
+        snapshot, refreshing = self._cached_snapshot((profile, region), refresh)
+        if snapshot is None:
+            snapshot = self._refresh_or_last_known(profile, region)
+        if refresh == "swr":
+            self._ensure_refresher()
+        return snapshot, refreshing
+
+    def iter_region_inventories(self, regions: Optional[List[str]] = None, filter_state: Optional[str] = None, refresh: str = "swr", max_workers: int = INVENTORY_REGION_WORKERS) -> Iterator[Dict[str, Any]]:
+        """
+        Fetch the inventory of several regions concurrently, yielding each region's
+        result as soon as it finishes.
+        
+        Args:
+            regions: Regions to sweep (defaults to every enabled region of the profile)
+            filter_state: Optional instance state filter
+            refresh: Cache mode, as for list_instances
+            max_workers: Maximum regions fetched at once
+        
+        Yields:
+            One ``{"type": "region", ...}`` record per region with its instances or
+            error and timing, then a final ``{"type": "done", ...}`` summary
+        """
+        profile = self._profile or "default"
+        started = time.monotonic()
+        if not regions:
+            regions = self.describe_regions(profile=profile, wait=True)
+        
+        def fetch_region(region: str) -> Dict[str, Any]:
+            region_started = time.monotonic()
+            try:
+                snapshot, refreshing = self._snapshot_for(profile, region, refresh)
+                instances = snapshot.select(filter_state)
+                return {
+                    "type": "region",
+                    "region": region,
+                    "ok": True,
+                    "instances": instances,
+                    "count": len(instances),
+                    **self._snapshot_meta(snapshot, refreshing),
+                    "elapsed_ms": round((time.monotonic() - region_started) * 1000, 1),
+                }
+            except Exception as e:
+                logger.warning(f"Inventory fetch failed for region {region}: {e}")
+                return {
+                    "type": "region",
+                    "region": region,
+                    "ok": False,
+                    "error": str(e),
+                    "elapsed_ms": round((time.monotonic() - region_started) * 1000, 1),
+                }
+        
+        failed = 0
+        total = 0
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(regions))), thread_name_prefix="inventory-region")
+        try:
+            futures = [executor.submit(fetch_region, region) for region in regions]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["ok"]:
+                    total += result["count"]
+                else:
+                    failed += 1
+                yield result
+        finally:
+            # Don't keep sweeping regions nobody is waiting for (e.g. client went away)
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        yield {
+            "type": "done",
+            "regions": len(regions),
+            "failed": failed,
+            "instances": total,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    def iter_account_inventories(self, targets: List[Dict[str, Any]], regions: Optional[List[str]] = None, filter_state: Optional[str] = None, refresh: str = "swr", max_workers: int = INVENTORY_ACCOUNT_WORKERS) -> Iterator[Dict[str, Any]]:
+        """
+        Aggregate the inventory of several accounts, yielding results as they finish.
+        
+        Args:
+            targets: List of ``{"profile": name, "role_arn": optional ARN to assume}``
+            regions: Regions to fetch for every target (defaults to the connected region)
+            filter_state: Optional instance state filter
+            refresh: Cache mode, as for list_instances
+            max_workers: Maximum concurrent credential resolutions / region fetches
+        
+        Yields:
+            ``{"type": "account", ...}`` records per (target, region) whose instances are
+            tagged with profile, region, account_id and account_alias, ``{"type": "error", ...}``
+            records for targets whose credentials could not be resolved, then a
+            ``{"type": "done", ...}`` summary
+        """
+        started = time.monotonic()
+        regions = regions or [self._region]
+        contexts = []
+        for target in targets:
+            profile = target.get("profile") or "default"
+            role_arn = target.get("role_arn")
+            contexts.append((self.assume_role_context(profile, role_arn) if role_arn else profile, profile, role_arn))
+        
+        def fetch(context: str, profile: str, role_arn: Optional[str], identity: Dict[str, Any], region: str) -> Dict[str, Any]:
+            task_started = time.monotonic()
+            snapshot, refreshing = self._snapshot_for(context, region, refresh)
+            tags = {"profile": profile, "region": region, **identity}
+            if role_arn:
+                tags["role_arn"] = role_arn
+            instances = [{**inst, **tags} for inst in snapshot.select(filter_state)]
+            return {
+                "type": "account",
+                **tags,
+                "ok": True,
+                "instances": instances,
+                "count": len(instances),
+                **self._snapshot_meta(snapshot, refreshing),
+                "elapsed_ms": round((time.monotonic() - task_started) * 1000, 1),
+            }
+        
+        failed = 0
+        total = 0
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="inventory-account")
+        try:
+            # Resolve every target's credentials/identity in parallel first
+            identity_futures = {executor.submit(self._account_identity, context): (context, profile, role_arn) for context, profile, role_arn in contexts}
+            fetch_futures = {}
+            for future in as_completed(identity_futures):
+                context, profile, role_arn = identity_futures[future]
+                try:
+                    identity = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Could not resolve credentials for {context}: {e}")
+                    yield {"type": "error", "profile": profile, "role_arn": role_arn, "ok": False, "error": str(e)}
+                    continue
+                for region in regions:
+                    fetch_futures[executor.submit(fetch, context, profile, role_arn, identity, region)] = (profile, role_arn, identity, region)
+            
+            for future in as_completed(fetch_futures):
+                profile, role_arn, identity, region = fetch_futures[future]
+                try:
+                    result = future.result()
+                    total += result["count"]
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Inventory fetch failed for {profile} in {region}: {e}")
+                    result = {"type": "account", "profile": profile, "region": region, "role_arn": role_arn, **identity, "ok": False, "error": str(e)}
+                yield result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        yield {
+            "type": "done",
+            "targets": len(contexts),
+            "regions": len(regions),
+            "failed": failed,
+            "instances": total,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
 
-    # ------------- AWS Sessions & Helpers -------------
+    def _refresh_snapshot(self, profile: str, region: Optional[str]) -> InventorySnapshot:
+        """
+        Fetch the full inventory for (profile, region) and store it in the cache and on disk.
+        
+        Concurrent callers for the same (profile, region) - requests, background
+        revalidation, other tabs - share a single fetch.
+        """
+        return self._inflight.do(("snapshot", profile, region), lambda: self._fetch_snapshot(profile, region))
 
-    def session(self, profile: Optional[str] = None):
-        profile = profile or self._profile
-        return boto3.session.Session(profile_name=profile, region_name=self._region)
+    def _fetch_snapshot(self, profile: str, region: Optional[str]) -> InventorySnapshot:
+        key = (profile, region)
+        try:
+            instances = self._fetch_instances(profile, region)
+        except Exception as e:
+            with self._instance_cache_lock:
+                self._refresh_errors[key] = str(e)
+            raise
+        return self._install_snapshot(profile, region, instances)
 
-    # ------------- Basic Info -------------
+    def _install_snapshot(self, profile: str, region: Optional[str], instances: List[InstanceRecord]) -> InventorySnapshot:
+        """Store freshly fetched instances as the snapshot for (profile, region), in memory and on disk."""
+        key = (profile, region)
+        instances = tuple(instances)
+        with self._instance_cache_lock:
+            previous = self._instance_cache.get(key)
+        # Only bump the generation when something actually changed
+        changed = previous is None or previous.instances != instances
+        with self._instance_cache_lock:
+            self._refresh_errors.pop(key, None)
+            if changed:
+                self._seed_generation()
+                self._generation += 1
+                generation = self._generation
+            else:
+                generation = previous.generation
+        snapshot = InventorySnapshot(profile, region, instances, generation=generation)
+        if not changed:
+            # Same instances: reuse the indexes already built for them
+            snapshot.carry_from(previous)
+        # Precompute facets here rather than on the first query
+        snapshot.attributes
+        with self._instance_cache_lock:
+            self._instance_cache[key] = snapshot
+            if changed:
+                history = self._snapshot_history.setdefault(key, deque(maxlen=INVENTORY_HISTORY_SIZE))
+                history.append((generation, snapshot.by_id))
+            search_entry = self._search_indexes.get(key)
+        self._evict_snapshots()
+        changes = diff_instances(previous.by_id, snapshot.by_id) if changed and previous is not None else None
+        if changes is not None and search_entry is not None and search_entry[0] == previous.generation:
+            # Re-index only what changed
+            search_entry[1].update(**changes)
+            with self._instance_cache_lock:
+                self._search_indexes[key] = (generation, search_entry[1])
+        if changes is not None and changes["removed"]:
+            self._details_cache.invalidate(profile, region, changes["removed"])
+        self._persist_snapshot(snapshot, changed)
+        if changed:
+            self._publish_changes(snapshot, previous, changes)
+        return snapshot
 
-    def list_profiles(self) -> List[str]:
-        import configparser
-        profiles = set()
-        aws_dir = os.path.expanduser("~/.aws")
-        for fname in ("credentials", "config"):
-            path = os.path.join(aws_dir, fname)
-            if not os.path.exists(path):
-                continue
-            cfg = configparser.ConfigParser()
-            cfg.read(path)
-            for sec in cfg.sections():
-                if fname == "config" and sec.startswith("profile "):
-                    sec = sec.replace("profile ", "", 1)
-                profiles.add(sec)
-        return sorted(profiles or ["default"])
+    def _publish_changes(self, snapshot: InventorySnapshot, previous: Optional[InventorySnapshot], changes: Optional[Dict[str, list]]):
+        """Publish the change from previous to snapshot as an inventory event."""
+        data: Dict[str, Any] = {
+            "profile": snapshot.profile,
+            "region": snapshot.region,
+            "generation": snapshot.generation,
+            "previous_generation": previous.generation if previous is not None else None,
+        }
+        if changes is None:
+            # Nothing to diff against: subscribers reload the list
+            data["resync"] = True
+        else:
+            data.update(resync=False, **changes, **describe_changes(previous.by_id, changes))
+        self._events.publish({"id": snapshot.generation, "event": "inventory", "data": data})
 
-    def list_regions(self) -> List[str]:
-        return sorted(self.session().get_available_regions("ec2"))
+    def inventory_events(self, last_event_id: Optional[int] = None, keepalive: float = INVENTORY_EVENT_KEEPALIVE) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Follow the inventory changes of the current profile and region.
+        
+        Never returns on its own; the caller stops iterating when its client goes away.
+        
+        Args:
+            last_event_id: ID of the last event the client saw, to resume after it;
+                None to start with the next change
+            keepalive: Seconds to wait for a change before yielding None
+        
+        Yields:
+            ``{"id", "event", "data"}`` event dicts: ``inventory`` events carrying the
+            added/removed/changed instances plus ``state_changed`` and ``ssm_changed``
+            summaries, or a ``resync`` event when the changes since last_event_id are no
+            longer known. None is yielded as a keepalive when nothing happened.
+        """
+        with self._instance_cache_lock:
+            self._seed_generation()
+        self._ensure_refresher()
+        
+        if last_event_id is None:
+            last_event_id = self._events.latest_id
+        while True:
+            events = self._events.wait(last_event_id, keepalive)
+            if events is None:
+                last_event_id = self._events.latest_id
+                yield {"id": last_event_id, "event": "resync", "data": {"generation": last_event_id}}
+                continue
+            if not events:
+                yield None
+                continue
+            active_key = (self._profile or "default", self._region)
+            for event in events:
+                last_event_id = event["id"]
+                if (event["data"]["profile"], event["data"]["region"]) == active_key:
+                    yield event
 
-    def connect(self, profile: str, region: str) -> Dict[str, Any]:
+    def iter_instance_stream(self, filter_state: Optional[str] = None, refresh: str = "swr") -> Iterator[Dict[str, Any]]:
         """
-        Connect to AWS and validate credentials.
+        Stream the instances of the current region as DescribeInstances pages arrive.
+        
+        A usable cached snapshot is streamed at once. Otherwise instances are
+        emitted page by page while later pages are still being fetched, SSM status
+        follows in one patch record once DescribeInstanceInformation finishes, and
+        the complete result is stored as the new snapshot.
         
         Args:
-            profile: AWS profile name
-            region: AWS region name
-            
+            filter_state: Optional instance state filter
+            refresh: Cache mode, as for list_instances
+        
+        Yields:
+            ``{"type": "page", "instances": [...], "ssm_pending": bool}`` records, one
+            ``{"type": "ssm", "managed": [ids]}`` patch record for live fetches, then a
+            ``{"type": "done", ...}`` record with the count and snapshot metadata
+        """
+        profile = self._profile or "default"
+        region = self._region
+        key = (profile, region)
+        started = time.monotonic()
+        
+        flight_key = ("snapshot", profile, region)
+        snapshot, refreshing = self._cached_snapshot(key, refresh)
+        call = None
+        if snapshot is None:
+            # Lead the fetch, so listings, refreshes and prefetches starting meanwhile join it
+            call = self._inflight.lead(flight_key)
+            if call is None:
+                # Someone is already fetching this inventory: wait for it rather than fetch again
+                snapshot, refreshing = self._refresh_snapshot(profile, region), False
+        if snapshot is not None:
+            if refresh == "swr":
+                self._ensure_refresher()
+            items = snapshot.select(filter_state)
+            for offset in range(0, len(items), INVENTORY_STREAM_CHUNK):
+                yield {"type": "page", "instances": items[offset:offset + INVENTORY_STREAM_CHUNK], "ssm_pending": False}
+            yield {"type": "done", "count": len(items), "cached": True, **self._snapshot_meta(snapshot, refreshing)}
+            return
+        
+        records = self._stream_snapshot(profile, region, filter_state, started)
+        while True:
+            try:
+                record = next(records)
+            except StopIteration as stop:
+                snapshot, count = stop.value
+                break
+            except BaseException as e:
+                self._inflight.finish(flight_key, call, error=e)
+                raise
+            try:
+                yield record
+            except BaseException:
+                # The client went away mid-stream: finish the fetch in the background,
+                # so the listings and refreshes that joined it still get the snapshot
+                threading.Thread(target=self._drain_stream, args=(records, flight_key, call), daemon=True).start()
+                raise
+        self._inflight.finish(flight_key, call, snapshot)
+        yield {
+            "type": "done",
+            "count": count,
+            "cached": False,
+            **self._snapshot_meta(snapshot),
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    def _drain_stream(self, records: Iterator[Dict[str, Any]], flight_key: tuple, call):
+        """Run an abandoned stream's fetch to completion and complete its in-flight call."""
+        try:
+            with self._scheduler.adopt(call.priority):
+                while True:
+                    next(records)
+        except StopIteration as stop:
+            self._inflight.finish(flight_key, call, stop.value[0])
+        except BaseException as e:
+            logger.warning(f"Inventory fetch of an abandoned stream failed for {flight_key[1:]}: {e}")
+            self._inflight.finish(flight_key, call, error=e)
+
+    def _stream_snapshot(self, profile: str, region: Optional[str], filter_state: Optional[str], started: float):
+        """
+        Fetch and install the snapshot for (profile, region), yielding the page and
+        SSM records of iter_instance_stream along the way.
+        
         Returns:
-            Dict with account_id and optional account_alias
-            
-        Raises:
-            ClientError: If AWS credentials are invalid or connection fails
-            RuntimeError: If connection timeout occurs
+            (installed snapshot, number of instances streamed)
         """
-        # Invalidate cache if profile or region changed
-        old_key = (self._profile or "default", self._region)
-        self._profile, self._region = profile, region
-        new_key = (self._profile or "default", self._region)
+        key = (profile, region)
+        managed: set = set()
+        ssm_errors: List[Exception] = []
         
-        if old_key != new_key:
-            with self._instance_cache_lock:
-                # Clear cache for old key if it exists
-                if old_key in self._instance_cache:
-                    del self._instance_cache[old_key]
-                # Also clear new key to force fresh fetch
-                if new_key in self._instance_cache:
-                    del self._instance_cache[new_key]
-                logger.debug(f"Cache invalidated due to profile/region change: {old_key} -> {new_key}")
-        
-        # Configure with timeout and retries
-        config = Config(
-            retries={"max_attempts": AWS_MAX_RETRIES},
-            connect_timeout=AWS_CONNECT_TIMEOUT,
-            read_timeout=AWS_READ_TIMEOUT
-        )
+        def fetch_ssm():
+            try:
+                managed.update(self._fetch_managed_ids(profile, region))
+            except Exception as e:
+                ssm_errors.append(e)
+                logger.warning(f"SSM API call failed: {e}")
+        
+        thread_ssm = threading.Thread(target=fetch_ssm, daemon=True)
+        thread_ssm.start()
         
+        fetched: List[Dict[str, Any]] = []
+        count = 0
         try:
-            sts = self.session().client("sts", config=config)
-            identity = sts.get_caller_identity()
-            self._account_id = identity["Account"]
-        except ClientError as e:
-            error_code = e.response.get("Error", {}).get("Code", "")
-            error_message = e.response.get("Error", {}).get("Message", str(e))
-            logger.error(f"AWS connection failed: {error_code} - {error_message}")
-            raise
+            for page in self._iter_ec2_pages(profile, region):
+                fetched.extend(page)
+                visible = [inst for inst in page if filter_state is None or inst["state"] == filter_state]
+                if visible:
+                    count += len(visible)
+                    yield {
+                        "type": "page",
+                        "instances": visible,
+                        "ssm_pending": True,
+                        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+                    }
         except Exception as e:
-            logger.error(f"Unexpected error during AWS connection: {e}", exc_info=True)
-            raise RuntimeError(f"Failed to connect to AWS: {str(e)}")
+            with self._instance_cache_lock:
+                self._refresh_errors[key] = str(e)
+            raise RuntimeError(f"EC2 API call failed: {e}")
+        
+        thread_ssm.join()
+        visible_ids = [inst["id"] for inst in fetched if filter_state is None or inst["state"] == filter_state]
+        patch: Dict[str, Any] = {"type": "ssm", "ok": not ssm_errors, "managed": [iid for iid in visible_ids if iid in managed]}
+        if ssm_errors:
+            patch["error"] = str(ssm_errors[0])
+        yield patch
+        
+        for inst in fetched:
+            inst["has_ssm"] = inst["id"] in managed
+        snapshot = self._install_snapshot(profile, region, [InstanceRecord.from_dict(inst) for inst in fetched])
+        return snapshot, count
+
+    def _revalidate_async(self, key: tuple) -> bool:
+        """
+        Start a background refresh of the snapshot for key.
         
-        # Try to get account alias from IAM (with timeout)
-        account_alias = None
+        Returns:
+            True if a refresh is in flight for the key (new or already running)
+        """
+        with self._instance_cache_lock:
+            if key in self._refreshing:
+                return True
+            self._refreshing.add(key)
+        threading.Thread(target=self._revalidate, args=(key, True), daemon=True).start()
+        return True
+
+    def _revalidate(self, key: tuple, claimed: bool = False):
+        """Refresh the snapshot for key, logging rather than raising failures."""
+        if not claimed:
+            with self._instance_cache_lock:
+                if key in self._refreshing:
+                    return
+                self._refreshing.add(key)
         try:
-            iam_config = Config(
-                retries={"max_attempts": AWS_IAM_MAX_RETRIES},
-                connect_timeout=AWS_IAM_TIMEOUT,
-                read_timeout=AWS_IAM_READ_TIMEOUT
-            )
-            iam = self.session().client("iam", config=iam_config)
-            aliases = iam.list_account_aliases()
-            if aliases.get("AccountAliases") and len(aliases["AccountAliases"]) > 0:
-                account_alias = aliases["AccountAliases"][0]
+            with self._scheduler.background():
+                self._refresh_snapshot(*key)
+            logger.debug(f"Background refresh completed for {key}")
         except Exception as e:
-            # Account alias is optional, so we don't fail if we can't get it
-            logger.debug(f"Could not retrieve account alias: {e}")
-        
-        return {
-            "account_id": self._account_id,
-            "account_alias": account_alias
-        }
+            logger.warning(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self._instance_cache_lock:
+                self._refreshing.discard(key)
 
-    # ------------- EC2 + SSM -------------
+    def _ensure_refresher(self):
+        """Start the background refresher thread if it isn't running."""
+        with self._instance_cache_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher_stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="inventory-refresher", daemon=True)
+            self._refresher.start()
+
+    def stop_background_refresh(self):
+        """Stop the background refresher thread."""
+        self._refresher_stop.set()
+
+    def _refresh_loop(self):
+        """Periodically refresh cached snapshots: the active one often, others rarely."""
+        while not self._refresher_stop.wait(INVENTORY_REFRESHER_TICK):
+            for key in self._keys_due_for_refresh():
+                if self._refresher_stop.is_set():
+                    break
+                self._revalidate(key)
 
-    def list_instances(self, filter_state: Optional[str] = None) -> List[Dict[str, Any]]:
+    def _keys_due_for_refresh(self) -> List[tuple]:
+        now = time.time()
+        active_key = (self._profile or "default", self._region)
+        due = []
+        with self._instance_cache_lock:
+            for key, snapshot in self._instance_cache.items():
+                if key in self._refreshing:
+                    continue
+                age = now - snapshot.fetched_at
+                if key == active_key:
+                    if age >= INVENTORY_ACTIVE_REFRESH_INTERVAL:
+                        due.append(key)
+                elif age >= INVENTORY_INACTIVE_REFRESH_INTERVAL:
+                    last_access = self._instance_cache_access.get(key, 0)
+                    if now - last_access < INVENTORY_INACTIVE_KEEPALIVE:
+                        due.append(key)
+        # Active context first
+        due.sort(key=lambda k: k != active_key)
+        return due
+
+    def _fetch_instances(self, profile: str, region: Optional[str], filter_state: Optional[str] = None) -> List[InstanceRecord]:
         """
-        List all EC2 instances in the current region.
-        Uses parallel API calls (EC2 and SSM) and caching for better performance.
-        
-        Args:
-            filter_state: Optional instance state filter (e.g., 'running', 'stopped').
-                         If None, returns all instances. Default: None.
+        Fetch instances for (profile, region) from AWS.
+        Runs the EC2 and SSM calls in parallel.
         
         Returns:
-            List of instance dictionaries with id, name, type, state, os, has_ssm
-            
+            List of InstanceRecord
+        
         Raises:
-            ClientError: If AWS API call fails
+            RuntimeError: If the EC2 API call fails
         """
-        # Check cache first (only if no filter is applied, as filter affects results)
-        cache_key = (self._profile or "default", self._region, filter_state)
-        if filter_state is None:
-            with self._instance_cache_lock:
-                # Check unfiltered cache
-                unfiltered_key = (self._profile or "default", self._region, None)
-                if unfiltered_key in self._instance_cache:
-                    cached_data, timestamp = self._instance_cache[unfiltered_key]
-                    if time.time() - timestamp < self._instance_cache_ttl:
-                        logger.debug(f"Returning cached instance list for {unfiltered_key}")
-                        return cached_data
-        
         # Run EC2 and SSM calls in parallel
         instances_result: List[Dict[str, Any]] = []
         managed_result: set = set()
         exceptions: List[tuple] = []
+        # The calls keep the priority of the caller (background refresh or request),
+        # including when it's raised while they run
+        priority = self._scheduler.current()
         
         def fetch_ec2():
             """Fetch EC2 instances in a separate thread."""
             try:
-                sess = self.session()
-                config = Config(
-                    retries={"max_attempts": AWS_MAX_RETRIES},
-                    connect_timeout=AWS_CONNECT_TIMEOUT,
-                    read_timeout=AWS_READ_TIMEOUT
-                )
-                ec2 = sess.client("ec2", config=config)
-                
                 instances = []
-                # Build paginator with optional filter
-                paginator_kwargs = {}
-                if filter_state:
-                    paginator_kwargs["Filters"] = [
-                        {"Name": "instance-state-name", "Values": [filter_state]}
-                    ]
-                
-                paginator = ec2.get_paginator("describe_instances")
-                for page in paginator.paginate(**paginator_kwargs):
-                    for r in page.get("Reservations", []):
-                        for i in r.get("Instances", []):
-                            iid = i["InstanceId"]
-                            name = next((t["Value"] for t in i.get("Tags", []) if t["Key"] == "Name"), iid)
-                            platform = i.get("PlatformDetails", "Linux")
-                            state = i.get("State", {}).get("Name", "")
-                            instances.append({
-                                "id": iid,
-                                "name": name,
-                                "type": i.get("InstanceType", ""),
-                                "state": state,
-                                "os": "Windows" if "Windows" in platform else "Linux",
-                                "has_ssm": False,
-                            })
+                with self._scheduler.adopt(priority):
+                    for page in self._iter_ec2_pages(profile, region, filter_state):
+                        instances.extend(page)
                 instances_result.extend(instances)
             except Exception as e:
                 exceptions.append(('ec2', e))
@@ -354,19 +1865,8 @@ class AWSManager:
         def fetch_ssm():
             """Fetch SSM managed instances in a separate thread."""
             try:
-                sess = self.session()
-                config = Config(
-                    retries={"max_attempts": AWS_MAX_RETRIES},
-                    connect_timeout=AWS_CONNECT_TIMEOUT,
-                    read_timeout=AWS_READ_TIMEOUT
-                )
-                ssm = sess.client("ssm", config=config)
-                
-                managed = set()
-                for page in ssm.get_paginator("describe_instance_information").paginate():
-                    for info in page.get("InstanceInformationList", []):
-                        managed.add(info["InstanceId"])
-                managed_result.update(managed)
+                with self._scheduler.adopt(priority):
+                    managed_result.update(self._fetch_managed_ids(profile, region))
             except Exception as e:
                 exceptions.append(('ssm', e))
                 logger.warning(f"SSM API call failed: {e}")
@@ -395,20 +1895,68 @@ class AWSManager:
         for inst in instances_result:
             inst["has_ssm"] = inst["id"] in managed_result
         
-        # Cache the results (only cache unfiltered results for reuse)
-        if filter_state is None:
-            with self._instance_cache_lock:
-                cache_key_unfiltered = (self._profile or "default", self._region, None)
-                self._instance_cache[cache_key_unfiltered] = (instances_result, time.time())
+        return [InstanceRecord.from_dict(inst) for inst in instances_result]
+
+    def _iter_ec2_pages(self, profile: str, region: Optional[str], filter_state: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the instances of each DescribeInstances page as it arrives (has_ssm not yet known)."""
+        ec2 = self.client("ec2", profile=profile, region=region)
+        
+        # Build paginator with optional filter
+        paginator_kwargs = {}
+        if filter_state:
+            paginator_kwargs["Filters"] = [
+                {"Name": "instance-state-name", "Values": [filter_state]}
+            ]
         
-        return instances_result
+        paginator = ec2.get_paginator("describe_instances")
+        for page in paginator.paginate(**paginator_kwargs):
+            instances = []
+            details = []
+            for r in page.get("Reservations", []):
+                for i in r.get("Instances", []):
+                    details.append(_instance_details(i))
+                    iid = i["InstanceId"]
+                    name = next((t["Value"] for t in i.get("Tags", []) if t["Key"] == "Name"), iid)
+                    platform = i.get("PlatformDetails", "Linux")
+                    state = i.get("State", {}).get("Name", "")
+                    launch_time = i.get("LaunchTime")
+                    tags = {t["Key"]: t["Value"] for t in i.get("Tags", [])}
+                    instances.append({
+                        "id": iid,
+                        "name": name,
+                        "type": i.get("InstanceType", ""),
+                        "state": state,
+                        "os": "Windows" if "Windows" in platform else "Linux",
+                        "has_ssm": False,
+                        # ISO 8601, so it sorts as a string and survives JSON round-trips
+                        "launch_time": launch_time.isoformat() if hasattr(launch_time, "isoformat") else (launch_time or ""),
+                        "private_ip": i.get("PrivateIpAddress", ""),
+                        "tags": tags,
+                    })
+            # Keep what the instance details view needs, so it doesn't have to ask again
+            self._details_cache.put_many(profile or "default", region, details)
+            yield instances
 
-    def instance_details(self, instance_id: str) -> Dict[str, Any]:
+    def _fetch_managed_ids(self, profile: str, region: Optional[str]) -> set:
+        """Return the IDs of the SSM-managed instances in (profile, region)."""
+        ssm = self.client("ssm", profile=profile, region=region)
+        
+        managed = set()
+        for page in ssm.get_paginator("describe_instance_information").paginate():
+            for info in page.get("InstanceInformationList", []):
+                managed.add(info["InstanceId"])
+        return managed
+
+    def instance_details(self, instance_id: str, refresh: bool = False) -> Dict[str, Any]:
         """
         Get detailed information about a specific EC2 instance.
         
+        Details seen in a recent instance listing are served from the details
+        cache; otherwise the instance is described and the result cached.
+        
         Args:
             instance_id: EC2 instance ID
+            refresh: Bypass the details cache
             
         Returns:
             Dict with instance details
@@ -416,63 +1964,425 @@ class AWSManager:
         Raises:
             ClientError: If instance not found or API call fails
         """
-        config = Config(
-            retries={"max_attempts": AWS_MAX_RETRIES},
-            connect_timeout=AWS_CONNECT_TIMEOUT,
-            read_timeout=AWS_READ_TIMEOUT
-        )
-        ec2 = self.session().client("ec2", config=config)
+        profile = self._profile or "default"
+        region = self._region
+        if not refresh:
+            cached = self._details_cache.get(profile, region, instance_id)
+            if cached is not None:
+                return cached
+        
+        from botocore.exceptions import ClientError
+        ec2 = self.client("ec2")
         
         try:
             resp = ec2.describe_instances(InstanceIds=[instance_id])
         except ClientError as e:
             error_code = e.response.get("Error", {}).get("Code", "")
             if error_code == "InvalidInstanceID.NotFound":
+                self._details_cache.invalidate(profile, region, [instance_id])
                 raise ValueError(f"Instance {instance_id} not found")
             raise
-        i = resp["Reservations"][0]["Instances"][0]
-        
-        # Extract IAM Role
-        iam_role = ""
-        iam_profile = i.get("IamInstanceProfile")
-        if iam_profile:
-            arn = iam_profile.get("Arn", "")
-            if arn:
-                # Extract role name from ARN: arn:aws:iam::123456789012:instance-profile/role-name
-                # or arn:aws:iam::123456789012:role/role-name
-                parts = arn.split("/")
-                if len(parts) > 1:
-                    iam_role = parts[-1]
-                else:
-                    iam_role = arn
-        
-        # Extract Security Groups
-        security_groups = []
-        for sg in i.get("SecurityGroups", []):
-            sg_id = sg.get("GroupId", "")
-            sg_name = sg.get("GroupName", "")
-            if sg_name:
-                security_groups.append(f"{sg_name} ({sg_id})")
+        details = _instance_details(resp["Reservations"][0]["Instances"][0])
+        self._details_cache.put_many(profile, region, [details])
+        return dict(details)
+
+    def instance_details_batch(self, instance_ids: List[str], refresh: bool = False, max_workers: int = INSTANCE_DETAILS_BATCH_WORKERS) -> Dict[str, Any]:
+        """
+        Get the details of many instances at once.
+        
+        Cached details are used where available; the rest are described in
+        chunks of up to INSTANCE_DETAILS_BATCH_CHUNK IDs, run concurrently.
+        
+        Args:
+            instance_ids: EC2 instance IDs
+            refresh: Bypass the details cache
+            max_workers: Maximum DescribeInstances calls in flight
+        
+        Returns:
+            Dict with ``instances`` (ID -> details) and ``errors`` (ID -> message)
+        """
+        profile = self._profile or "default"
+        region = self._region
+        ids = list(dict.fromkeys(instance_ids))
+        found: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        
+        missing = []
+        for iid in ids:
+            cached = None if refresh else self._details_cache.get(profile, region, iid)
+            if cached is not None:
+                found[iid] = cached
             else:
-                security_groups.append(sg_id)
-        security_groups_str = ", ".join(security_groups) if security_groups else ""
+                missing.append(iid)
+        
+        chunks = [missing[i:i + INSTANCE_DETAILS_BATCH_CHUNK] for i in range(0, len(missing), INSTANCE_DETAILS_BATCH_CHUNK)]
+        if chunks:
+            ec2 = self.client("ec2")
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+                futures = {executor.submit(self._describe_details_chunk, ec2, chunk): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    try:
+                        chunk_found, chunk_errors = future.result()
+                    except Exception as e:
+                        logger.warning(f"DescribeInstances failed for {len(futures[future])} instances: {e}")
+                        chunk_found, chunk_errors = [], {iid: str(e) for iid in futures[future]}
+                    self._details_cache.put_many(profile, region, chunk_found)
+                    self._details_cache.invalidate(profile, region, list(chunk_errors))
+                    found.update((details["id"], dict(details)) for details in chunk_found)
+                    errors.update(chunk_errors)
+        
+        return {
+            "instances": {iid: found[iid] for iid in ids if iid in found},
+            "errors": {iid: errors[iid] for iid in ids if iid in errors},
+        }
+
+    def _describe_details_chunk(self, ec2, instance_ids: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Describe one chunk of instances, retrying without the IDs AWS reports as unknown.
+        
+        DescribeInstances fails the whole call when any ID doesn't exist, naming
+        the offending IDs in the error message.
+        """
+        from botocore.exceptions import ClientError
+        
+        errors: Dict[str, str] = {}
+        remaining = list(instance_ids)
+        while remaining:
+            try:
+                resp = ec2.describe_instances(InstanceIds=remaining)
+                break
+            except ClientError as e:
+                error_code = e.response.get("Error", {}).get("Code", "")
+                if error_code not in ("InvalidInstanceID.NotFound", "InvalidInstanceID.Malformed"):
+                    raise
+                message = e.response.get("Error", {}).get("Message", "")
+                mentioned = set(re.findall(r"[\w.-]+", message))
+                bad = [iid for iid in remaining if iid in mentioned]
+                if not bad:
+                    raise
+                reason = "not found" if error_code == "InvalidInstanceID.NotFound" else "malformed"
+                errors.update((iid, f"Instance {iid} {reason}") for iid in bad)
+                remaining = [iid for iid in remaining if iid not in errors]
+        else:
+            return [], errors
+        
+        found = [_instance_details(i) for r in resp.get("Reservations", []) for i in r.get("Instances", [])]
+        returned = {details["id"] for details in found}
+        errors.update((iid, f"Instance {iid} not found") for iid in remaining if iid not in returned)
+        return found, errors
+
+    # ------------- Cache Control -------------
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Report the state of the in-memory caches.
+        
+        Returns:
+            Dict per cache with its counters (hits, misses, expired, evictions,
+            invalidations, hit_ratio and cache-specific extras), entry count, and
+            where cheap to compute, approximate size in bytes and entry age distribution
+        """
+        now = time.time()
+        with self._instance_cache_lock:
+            snapshots = list(self._instance_cache.values())
+            search_entries = len(self._search_indexes)
+            history_entries = sum(len(history) for history in self._snapshot_history.values())
+            refreshing = set(self._refreshing)
+            errors = dict(self._refresh_errors)
+        with self._discovery_lock:
+            regions = dict(self._regions_cache)
+            profiles = self._profiles_cache
+        with self._identity_lock:
+            identities = dict(self._identity_cache)
         
         return {
-            "id": instance_id,
-            "name": next((t["Value"] for t in i.get("Tags", []) if t["Key"] == "Name"), instance_id),
-            "type": i.get("InstanceType", ""),
-            "state": i.get("State", {}).get("Name", ""),
-            "platform": i.get("PlatformDetails", ""),
-            "private_ip": i.get("PrivateIpAddress", "") or "N/A",
-            "public_ip": i.get("PublicIpAddress", "") or "N/A",
-            "vpc_id": i.get("VpcId", "") or "N/A",
-            "subnet_id": i.get("SubnetId", "") or "N/A",
-            "iam_role": iam_role or "N/A",
-            "ami_id": i.get("ImageId", "") or "N/A",
-            "key_name": i.get("KeyName", "") or "N/A",
-            "security_groups": security_groups_str or "N/A",
+            "inventory": {
+                **self._cache_stats["inventory"].snapshot(),
+                "entries": len(snapshots),
+                "instances": sum(len(snapshot.instances) for snapshot in snapshots),
+                "bytes": sum(snapshot.approx_bytes for snapshot in snapshots),
+                "age": age_summary(snapshot.age for snapshot in snapshots),
+                "history_entries": history_entries,
+                "search_indexes": search_entries,
+                "coalesced_fetches": self._inflight.coalesced,
+                "policy": getattr(self.preferences, "cache_policy", "lru"),
+                "max_entries": getattr(self.preferences, "cache_max_snapshots", INVENTORY_CACHE_MAX_SNAPSHOTS),
+                "max_bytes": getattr(self.preferences, "cache_max_memory_mb", INVENTORY_CACHE_MAX_MEMORY_MB) * 1024 * 1024,
+                "keys": [
+                    {
+                        "profile": snapshot.profile,
+                        "region": snapshot.region,
+                        "instances": len(snapshot.instances),
+                        "generation": snapshot.generation,
+                        "age": round(snapshot.age, 1),
+                        "refreshing": snapshot.key in refreshing,
+                        "error": errors.get(snapshot.key),
+                    }
+                    for snapshot in sorted(snapshots, key=lambda snap: (snap.profile, snap.region or ""))
+                ],
+            },
+            "details": {**self._details_cache.stats.snapshot(), **self._details_cache.usage()},
+            "clients": {**self._clients.stats.snapshot(), "entries": len(self._clients)},
+            "sessions": {**self._sessions.stats.snapshot(), "entries": len(self._sessions)},
+            "regions": {
+                **self._cache_stats["regions"].snapshot(),
+                "entries": len(regions),
+                "age": age_summary(now - fetched_at for fetched_at, _ in regions.values()),
+            },
+            "profiles": {**self._cache_stats["profiles"].snapshot(), "entries": len(profiles[1]) if profiles else 0},
+            "identity": {
+                **self._cache_stats["identity"].snapshot(),
+                "entries": len(identities),
+                "age": age_summary(now - resolved_at for _, resolved_at, _ in identities.values()),
+            },
         }
 
+    def invalidate_cache(self, profile: Optional[str] = None, region: Optional[str] = None, caches: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Drop cached entries, everywhere or for one profile (and region).
+        
+        Dropped inventory snapshots are removed from disk as well, with their
+        search index, delta history and last refresh error.
+        
+        Args:
+            profile: Only entries of this profile (all profiles when None)
+            region: Only entries of this region (all regions of the profile when None)
+            caches: Caches to clear (CACHE_NAMES; all when None)
+        
+        Returns:
+            Number of entries dropped per cache
+        """
+        caches = caches or CACHE_NAMES
+        matches = lambda key_profile, key_region: (profile is None or key_profile == profile) and (region is None or key_region == region)
+        dropped: Dict[str, int] = {}
+        
+        if "inventory" in caches:
+            with self._instance_cache_lock:
+                keys = [key for key in self._instance_cache if matches(*key)]
+                for key in keys:
+                    self._drop_snapshot(key)
+            self._cache_stats["inventory"].record("invalidations", len(keys))
+            dropped["inventory"] = len(keys)
+            if profile is not None and region is not None and (profile, region) not in keys:
+                # Not loaded yet, but a stored copy would be picked up on the next read
+                keys.append((profile, region))
+            for key in keys:
+                try:
+                    self._store.delete(*key)
+                except Exception as e:
+                    logger.warning(f"Could not delete stored inventory for {key}: {e}")
+        
+        if "details" in caches:
+            if profile is None:
+                dropped["details"] = len(self._details_cache)
+                self._details_cache.clear()
+            elif region is not None:
+                dropped["details"] = self._details_cache.invalidate(profile, region)
+            else:
+                dropped["details"] = self._details_cache.invalidate_profile(profile)
+        
+        if "regions" in caches and region is None:
+            with self._discovery_lock:
+                names = [name for name in self._regions_cache if profile is None or name == profile]
+                for name in names:
+                    del self._regions_cache[name]
+            for name in names:
+                try:
+                    self._store.delete_regions(name)
+                except Exception as e:
+                    logger.warning(f"Could not delete stored regions for {name}: {e}")
+            self._cache_stats["regions"].record("invalidations", len(names))
+            dropped["regions"] = len(names)
+        
+        if "identity" in caches and region is None:
+            with self._identity_lock:
+                names = [name for name in self._identity_cache if profile is None or name == profile]
+                for name in names:
+                    del self._identity_cache[name]
+            self._cache_stats["identity"].record("invalidations", len(names))
+            dropped["identity"] = len(names)
+        
+        if "sessions" in caches and region is None:
+            dropped["sessions"] = self._sessions.invalidate(profile)
+        
+        if "profiles" in caches and profile is None:
+            with self._discovery_lock:
+                dropped["profiles"] = len(self._profiles_cache[1]) if self._profiles_cache else 0
+                self._profiles_cache = None
+            self._cache_stats["profiles"].record("invalidations", dropped["profiles"])
+        
+        if "clients" in caches and profile is None:
+            dropped["clients"] = len(self._clients)
+            self._clients.clear()
+        
+        logger.info(f"Invalidated caches for profile={profile} region={region}: {dropped}")
+        return dropped
+
+    def _drop_snapshot(self, key: tuple):
+        """Forget the in-memory snapshot of key and everything derived from it (caller holds the cache lock)."""
+        self._instance_cache.pop(key, None)
+        self._search_indexes.pop(key, None)
+        self._snapshot_history.pop(key, None)
+        self._refresh_errors.pop(key, None)
+        self._instance_cache_access.pop(key, None)
+        self._instance_cache_uses.pop(key, None)
+
+    def _evict_snapshots(self):
+        """
+        Evict in-memory snapshots beyond the preferences' cache limits.
+        
+        The connected profile/region and snapshots being refreshed are never
+        evicted. Others go least recently used first, or least frequently used
+        first with the "lfu" policy. Evicted snapshots stay on disk.
+        """
+        max_snapshots = getattr(self.preferences, "cache_max_snapshots", INVENTORY_CACHE_MAX_SNAPSHOTS)
+        max_bytes = getattr(self.preferences, "cache_max_memory_mb", INVENTORY_CACHE_MAX_MEMORY_MB) * 1024 * 1024
+        policy = getattr(self.preferences, "cache_policy", "lru")
+        active_key = (self._profile or "default", self._region)
+        
+        with self._instance_cache_lock:
+            sizes = {key: snapshot.approx_bytes for key, snapshot in self._instance_cache.items()}
+            count, total = len(sizes), sum(sizes.values())
+            if count <= max_snapshots and total <= max_bytes:
+                return
+            if policy == "lfu":
+                rank = lambda key: (self._instance_cache_uses.get(key, 0), self._instance_cache_access.get(key, 0))
+            else:
+                rank = lambda key: self._instance_cache_access.get(key, 0)
+            evicted = []
+            for key in sorted((k for k in sizes if k != active_key and k not in self._refreshing), key=rank):
+                if count <= max_snapshots and total <= max_bytes:
+                    break
+                self._drop_snapshot(key)
+                evicted.append(key)
+                count -= 1
+                total -= sizes[key]
+        
+        for key in evicted:
+            self._details_cache.invalidate(*key)
+        if evicted:
+            self._cache_stats["inventory"].record("evictions", len(evicted))
+            logger.info(f"Evicted {len(evicted)} cached inventories ({policy}): {evicted}")
+
+    def apply_cache_limits(self):
+        """Apply the cache limits of the current preferences, evicting what no longer fits."""
+        self._clients.resize(getattr(self.preferences, "cache_max_clients", AWS_CLIENT_CACHE_SIZE))
+        self._details_cache.resize(getattr(self.preferences, "cache_max_details", INSTANCE_DETAILS_CACHE_SIZE))
+        self._evict_snapshots()
+
+    def warm_cache(self, profile: str, region: str) -> Dict[str, Any]:
+        """
+        Fetch the inventory and regions of (profile, region) in the background.
+        
+        The warmed snapshot is then kept current by the background refresher like
+        any recently read one.
+        
+        Returns:
+            Dict with the key and whether a refresh is in flight
+        """
+        key = (profile, region)
+        with self._instance_cache_lock:
+            self._instance_cache_access[key] = time.time()
+        refreshing = self._revalidate_async(key)
+        self._refresh_regions_async(profile)
+        self._ensure_refresher()
+        return {"profile": profile, "region": region, "refreshing": refreshing}
+
+    def prefetch(self, profile: str, region: str) -> Dict[str, Any]:
+        """
+        Warm the inventory snapshot (with its SSM managed set), the enabled regions
+        and the SSH key path index of (profile, region) in the background.
+        
+        The snapshot is fetched through the shared in-flight call, so an instance
+        listing requested meanwhile waits for it instead of starting a second fetch.
+        A snapshot refreshed within INVENTORY_ACTIVE_REFRESH_INTERVAL is not refetched.
+        
+        Returns:
+            Progress of the prefetch of (profile, region), as in prefetch_status()
+        """
+        key = (profile, region)
+        with self._instance_cache_lock:
+            progress = self._prefetches.get(key)
+            if progress is not None and progress["finished_at"] is None:
+                return self._prefetch_view(progress)
+            snapshot = self._instance_cache.get(key)
+            fetch = snapshot is None or snapshot.age >= INVENTORY_ACTIVE_REFRESH_INTERVAL
+            # Claim the key so listings see the refresh as pending and join it
+            claimed = fetch and key not in self._refreshing
+            if claimed:
+                self._refreshing.add(key)
+            self._instance_cache_access[key] = time.time()
+            progress = {
+                "profile": profile,
+                "region": region,
+                "started_at": time.time(),
+                "finished_at": None,
+                "tasks": {"inventory": "pending" if fetch else "cached", "regions": "pending", "key_paths": "pending"},
+                "errors": {},
+            }
+            self._prefetches[key] = progress
+        
+        threading.Thread(target=self._run_prefetch, args=(key, progress, fetch, claimed),
+                         name=f"prefetch-{profile}-{region}", daemon=True).start()
+        self._ensure_refresher()
+        return self._prefetch_view(progress)
+
+    def _run_prefetch(self, key: tuple, progress: Dict[str, Any], fetch: bool, claimed: bool):
+        profile, region = key
+        
+        def run(task: str, fn: Callable[[], Any]):
+            with self._instance_cache_lock:
+                progress["tasks"][task] = "running"
+            try:
+                with self._scheduler.background():
+                    fn()
+                state, error = "done", None
+            except Exception as e:
+                logger.warning(f"Prefetch of {task} failed for {key}: {e}")
+                state, error = "failed", str(e)
+            with self._instance_cache_lock:
+                progress["tasks"][task] = state
+                if error is not None:
+                    progress["errors"][task] = error
+        
+        def fetch_inventory():
+            try:
+                self._refresh_snapshot(profile, region)
+            finally:
+                if claimed:
+                    with self._instance_cache_lock:
+                        self._refreshing.discard(key)
+        
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            if fetch:
+                executor.submit(run, "inventory", fetch_inventory)
+            executor.submit(run, "regions", lambda: self.describe_regions(profile, wait=True))
+            executor.submit(run, "key_paths", lambda: self._key_path_index(self._get_ssh_key_folders()))
+        
+        with self._instance_cache_lock:
+            progress["finished_at"] = time.time()
+        logger.info(f"Prefetch finished for {key} in {progress['finished_at'] - progress['started_at']:.1f}s")
+
+    def _prefetch_view(self, progress: Dict[str, Any]) -> Dict[str, Any]:
+        tasks = dict(progress["tasks"])
+        if progress["finished_at"] is None:
+            state = "running"
+        else:
+            state = "failed" if "failed" in tasks.values() else "done"
+        return dict(progress, state=state, tasks=tasks, errors=dict(progress["errors"]))
+
+    def prefetch_status(self) -> List[Dict[str, Any]]:
+        """
+        Progress of the prefetches started so far, the most recent first.
+        
+        Each entry has the profile and region, an overall ``state`` (running, done or
+        failed), the state of each task (inventory, regions, key_paths: pending,
+        running, cached, done or failed), their ``errors`` and the start/finish times.
+        """
+        with self._instance_cache_lock:
+            views = [self._prefetch_view(progress) for progress in self._prefetches.values()]
+        return sorted(views, key=lambda view: view["started_at"], reverse=True)
+
     # ------------- Port Forwarding & Sessions -------------
 
     def _spawn_background_process(self, cmd: list[str]) -> subprocess.Popen:
@@ -549,6 +2459,39 @@ class AWSManager:
         normalized = str(path_obj).replace('\\', '/')
         return normalized
     
+    def _key_path_index(self, folders: List[str]) -> Dict[str, str]:
+        """
+        Map SSH key names to the key files in folders.
+        
+        A key matches a file with its name, or its name plus ``.pem``; the first
+        folder wins, and within a folder the name without extension does. The
+        index is rescanned only when the folders or their modification times change.
+        
+        Returns:
+            Dict of key name -> normalized key path
+        """
+        signature = tuple((folder, _file_signature(folder)) for folder in folders)
+        with self._discovery_lock:
+            if self._key_paths is not None and self._key_paths[0] == signature:
+                return self._key_paths[1]
+        
+        index: Dict[str, str] = {}
+        for folder in folders:
+            try:
+                names = [entry.name for entry in os.scandir(folder) if entry.is_file()]
+            except OSError as e:
+                logger.debug(f"Could not scan SSH key folder {folder}: {e}")
+                continue
+            files = {name[:-4]: name for name in names if name.endswith(".pem")}
+            files.update((name, name) for name in names)
+            for key_name, file_name in files.items():
+                if key_name not in index:
+                    index[key_name] = self._normalize_path_for_ssh(os.path.join(folder, file_name))
+        
+        with self._discovery_lock:
+            self._key_paths = (signature, index)
+        return index
+
     def _construct_ssh_key_path(self, key_name: str) -> Optional[str]:
         """
         Construct SSH key path based on preferences and key name.
@@ -567,6 +2510,11 @@ class AWSManager:
         # Get list of SSH key folders to search
         ssh_key_folders = self._get_ssh_key_folders()
         
+        key_path = self._key_path_index(ssh_key_folders).get(key_name)
+        if key_path:
+            return key_path
+        
+        # Not in the index (folder unreadable, or the key added within the same mtime tick)
         # Search through all configured folders
         for ssh_key_folder in ssh_key_folders:
             # Try with and without .pem extension
@@ -685,24 +2633,20 @@ class AWSManager:
         start = getattr(self.preferences, "port_range_start", 60000)
         end = getattr(self.preferences, "port_range_end", 60100)
         
-        # Determine local port
-        if preferred_local_port is not None:
-            # If a preferred local port is provided, try to use it
-            if _is_port_free(preferred_local_port):
-                local_port = preferred_local_port
-                logger.info(f"Using preferred local port {preferred_local_port} for {connection_type} connection")
-            else:
-                logger.info(f"Preferred local port {preferred_local_port} not available, using port from range for {connection_type} connection")
-                local_port = _in_range_free_port(start, end)
-        elif connection_type in ("ssh", "rdp", "custom_port"):
-            # For SSH, RDP, and custom ports, always use a safe port from the configured range
-            # This avoids conflicts with system ports and ensures consistent behavior
-            local_port = _in_range_free_port(start, end)
-            logger.info(f"Using safe local port {local_port} from range for {connection_type} connection (remote port: {remote_port})")
+        # Reserve the local port; the same target gets its previous port back while it's free
+        local_port = self._ports.reserve(start, end, key=(instance_id, remote_host, remote_port), preferred=preferred_local_port)
+        if preferred_local_port is not None and local_port != preferred_local_port:
+            logger.info(f"Preferred local port {preferred_local_port} not available, using port {local_port} from range for {connection_type} connection")
         else:
-            # For other port forwarding types, use port range
-            local_port = _in_range_free_port(start, end)
+            logger.info(f"Using local port {local_port} for {connection_type} connection (remote port: {remote_port})")
+        try:
+            return self._spawn_port_forward(instance_id, local_port, remote_port, remote_host, connection_type)
+        except Exception:
+            self._ports.release(local_port)
+            raise
 
+    def _spawn_port_forward(self, instance_id: str, local_port: int, remote_port: int, remote_host: Optional[str], connection_type: str) -> Dict[str, Any]:
+        """Start the SSM port forwarding process for a reserved local port and track it as a connection."""
         _require("aws", "the AWS CLI v2")
         _require("session-manager-plugin", "the AWS Session Manager Plugin")
 
@@ -814,7 +2758,9 @@ class AWSManager:
 
     def get_windows_password_data(self, instance_id: str) -> Dict[str, Any]:
         """Get encrypted password data for a Windows instance."""
-        ec2 = self.session().client("ec2")
+        from botocore.exceptions import ClientError
+        
+        ec2 = self.client("ec2")
         try:
             response = ec2.get_password_data(InstanceId=instance_id)
             return {
@@ -832,7 +2778,11 @@ class AWSManager:
 
     def decrypt_windows_password(self, encrypted_password: str, pem_key_content: str) -> str:
         """Decrypt Windows password using PEM private key."""
-        if not CRYPTO_AVAILABLE:
+        try:
+            from cryptography.hazmat.primitives.asymmetric import padding
+            from cryptography.hazmat.primitives.serialization import load_pem_private_key
+            from cryptography.hazmat.backends import default_backend
+        except ImportError:
             raise RuntimeError("cryptography library is required for password decryption. Install it with: pip install cryptography")
         
         if not encrypted_password:
@@ -1148,6 +3098,8 @@ class AWSManager:
                         conn.proc.kill()
                 except Exception:
                     pass
+        if conn:
+            self._ports.release(conn.meta.get("local_port"))
 
     def terminate_all(self):
         """Terminate all active connections."""
@@ -1222,11 +3174,16 @@ class AWSManager:
                     else:
                         # Process has terminated
                         logger.info(f"Connection {cid} process terminated (exit code: {conn.proc.returncode})")
-                        with self._connections_lock:
-                            self._connections.pop(cid, None)
+                        self._forget_connection(cid)
                 except Exception as e:
                     logger.warning(f"Error checking connection {cid}: {e}")
                     # Remove problematic connection
-                    with self._connections_lock:
-                        self._connections.pop(cid, None)
+                    self._forget_connection(cid)
         return alive
+
+    def _forget_connection(self, cid: str):
+        """Drop a connection whose process has exited and release its local port."""
+        with self._connections_lock:
+            conn = self._connections.pop(cid, None)
+        if conn:
+            self._ports.release(conn.meta.get("local_port"))
@@ -0,0 +1,229 @@
+"""
+Client-side rate limiting of the manager's AWS calls.
+
+Every call made through a pooled client takes a token from the bucket of its
+(account, region, API) first, so bursts from several tabs and fan-outs queue
+here instead of running into RequestLimitExceeded. Background calls (refreshes,
+prefetches) leave part of each bucket to interactive ones and wait while
+interactive calls are queued. Retries take a token per attempt as well. A throttled response halves the bucket's rate,
+which then recovers with each successful call.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .constants import (
+    AWS_API_BUCKET_CAPACITY,
+    AWS_API_BUCKET_RATE,
+    AWS_API_MIN_RATE,
+    AWS_API_BACKGROUND_RESERVE,
+)
+
+# Error codes AWS uses for throttled requests (as botocore's retry handler)
+THROTTLE_CODES = frozenset({
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+    "TooManyRequestsException", "ProvisionedThroughputExceededException", "TransactionInProgressException",
+    "RequestLimitExceeded", "BandwidthLimitExceeded", "LimitExceededException", "RequestThrottled",
+    "SlowDown", "PriorRequestNotComplete", "EC2ThrottledException",
+})
+
+# Share of the full rate regained by each successful call after a throttle
+RATE_RECOVERY = 0.05
+# Longest a background call sleeps before checking again for queued interactive calls
+BACKGROUND_POLL = 0.1
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second up to ``capacity``."""
+
+    __slots__ = ("capacity", "max_rate", "rate", "tokens", "updated", "calls", "throttled", "waits", "wait_seconds")
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.max_rate = rate
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.calls = 0
+        self.throttled = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class Priority:
+    """
+    Priority of the calls made on behalf of one caller, shared by the threads
+    working for it, so it can be raised while they're in flight.
+    """
+    __slots__ = ("background",)
+
+    def __init__(self, background: bool = False):
+        self.background = background
+
+
+class AWSCallScheduler:
+    """Thread-safe token buckets per (account, region, API) with interactive-over-background priority."""
+
+    def __init__(self, capacity: float = AWS_API_BUCKET_CAPACITY, rate: float = AWS_API_BUCKET_RATE,
+                 min_rate: float = AWS_API_MIN_RATE, background_reserve: float = AWS_API_BACKGROUND_RESERVE):
+        self._capacity = capacity
+        self._rate = rate
+        self._min_rate = min_rate
+        self._reserve = capacity * background_reserve
+        self._buckets: Dict[Tuple[str, str, str], TokenBucket] = {}
+        # Interactive callers waiting per bucket; background callers yield to them
+        self._interactive_waiting: Dict[tuple, int] = {}
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def current(self) -> Optional[Priority]:
+        """Priority of the calling thread (None for interactive calls outside background())."""
+        return getattr(self._local, "priority", None)
+
+    def is_background(self) -> bool:
+        priority = self.current()
+        return priority is not None and priority.background
+
+    @contextmanager
+    def background(self, enabled: bool = True) -> Iterator[None]:
+        """Run the calls made by this thread in the block at background priority."""
+        with self.adopt(Priority(enabled)):
+            yield
+
+    @contextmanager
+    def adopt(self, priority: Optional[Priority]) -> Iterator[None]:
+        """Run the calls made by this thread in the block at another thread's priority."""
+        previous = self.current()
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def promote(self, priority: Optional[Priority]):
+        """Raise a background priority to interactive, e.g. when a request starts waiting on its result."""
+        if priority is None or not priority.background:
+            return
+        with self._cond:
+            priority.background = False
+            self._cond.notify_all()
+
+    def _bucket(self, key: tuple) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self._capacity, self._rate)
+        return bucket
+
+    def acquire(self, key: tuple):
+        """Block until the calling thread may make one call of key's API."""
+        priority = self.current()
+        interactive = priority is None or not priority.background
+        started = time.monotonic()
+        with self._cond:
+            bucket = self._bucket(key)
+            if interactive:
+                self._interactive_waiting[key] = self._interactive_waiting.get(key, 0) + 1
+            try:
+                while True:
+                    # Re-read each time: a waiting background call may be promoted
+                    background = not interactive and priority.background
+                    # Background calls leave the reserve to interactive ones
+                    needed = 1 + (self._reserve if background else 0)
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    yielding = background and self._interactive_waiting.get(key, 0) > 0
+                    if not yielding and bucket.tokens >= needed:
+                        bucket.tokens -= 1
+                        break
+                    delay = BACKGROUND_POLL if yielding else (needed - bucket.tokens) / bucket.rate
+                    self._cond.wait(min(delay, BACKGROUND_POLL) if background else delay)
+            finally:
+                if interactive:
+                    self._interactive_waiting[key] -= 1
+                    if not self._interactive_waiting[key]:
+                        del self._interactive_waiting[key]
+                    self._cond.notify_all()
+            bucket.calls += 1
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                bucket.waits += 1
+                bucket.wait_seconds += waited
+
+    def throttled(self, key: tuple):
+        """Record a throttled response: empty the bucket and halve its rate."""
+        with self._cond:
+            bucket = self._bucket(key)
+            bucket.throttled += 1
+            bucket.tokens = min(bucket.tokens, 0.0)
+            bucket.rate = max(self._min_rate, bucket.rate / 2)
+
+    def succeeded(self, key: tuple):
+        """Record a successful call, recovering the rate lowered by throttles."""
+        with self._cond:
+            bucket = self._bucket(key)
+            if bucket.rate < bucket.max_rate:
+                bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate * RATE_RECOVERY)
+                self._cond.notify_all()
+
+    def attach(self, client, key_of: Callable[[str], tuple]):
+        """
+        Route the calls of a botocore client through the scheduler.
+
+        Args:
+            client: boto3/botocore client
+            key_of: Maps an API (operation) name to its (account, region, API) bucket key
+        """
+        def before_call(model, **kwargs):
+            self.acquire(key_of(model.name))
+
+        def request_created(request, operation_name, **kwargs):
+            # Retries don't go through before-call again; each further attempt takes a token too
+            if request.context.get("retries", {}).get("attempt", 1) > 1:
+                self.acquire(key_of(operation_name))
+
+        def after_call(http_response, model, **kwargs):
+            if http_response.status_code < 300:
+                self.succeeded(key_of(model.name))
+
+        def needs_retry(response=None, operation=None, **kwargs):
+            # Observes every attempt; returning None leaves the retry decision to botocore
+            if response is not None and response[1].get("Error", {}).get("Code") in THROTTLE_CODES:
+                self.throttled(key_of(operation.name))
+
+        client.meta.events.register("before-call", before_call)
+        # Ahead of the signer, so a retry is signed after it has waited for its token
+        service_id = client.meta.service_model.service_id.hyphenize()
+        client.meta.events.register_first(f"request-created.{service_id}", request_created)
+        client.meta.events.register("after-call", after_call)
+        client.meta.events.register("needs-retry", needs_retry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, throttles and queueing per (account, region, API), with totals."""
+        with self._cond:
+            now = time.monotonic()
+            buckets = []
+            for (account, region, api), bucket in sorted(self._buckets.items()):
+                bucket.refill(now)
+                buckets.append({
+                    "account": account,
+                    "region": region,
+                    "api": api,
+                    "calls": bucket.calls,
+                    "throttled": bucket.throttled,
+                    "waits": bucket.waits,
+                    "wait_seconds": round(bucket.wait_seconds, 3),
+                    "rate": round(bucket.rate, 2),
+                    "tokens": round(bucket.tokens, 1),
+                })
+            waiting = sum(self._interactive_waiting.values())
+        return {
+            "calls": sum(b["calls"] for b in buckets),
+            "throttled": sum(b["throttled"] for b in buckets),
+            "interactive_waiting": waiting,
+            "buckets": buckets,
+        }
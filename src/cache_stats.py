@@ -0,0 +1,70 @@
+"""
+Counters and size/age estimates for the manager's in-memory caches.
+
+Reported by /api/cache so TTLs and cache sizes can be tuned from what the
+caches actually see rather than guessed.
+"""
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Sequence
+
+# Entries sampled when estimating the byte size of a large collection
+SIZE_SAMPLE = 100
+
+
+class CacheStats:
+    """Thread-safe event counters of one cache."""
+
+    COUNTERS = ("hits", "misses", "expired", "evictions", "invalidations")
+
+    def __init__(self):
+        self._counts: Dict[str, int] = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def record(self, counter: str, count: int = 1):
+        with self._lock:
+            self._counts[counter] = self._counts.get(counter, 0) + count
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus the hit ratio of the lookups seen so far."""
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"] + counts["expired"]
+        counts["hit_ratio"] = round(counts["hits"] / lookups, 3) if lookups else None
+        return counts
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate memory footprint of obj and the containers and strings it holds."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item) for item in obj)
+    slots = getattr(type(obj), "__slots__", ())
+    if slots:
+        return size + sum(deep_sizeof(getattr(obj, name, None)) for name in slots)
+    if isinstance(obj, Mapping):
+        return size + sum(deep_sizeof(k) + deep_sizeof(obj[k]) for k in obj)
+    return size
+
+
+def approx_size(items: Sequence[Any]) -> int:
+    """Estimate the total size of items from a sample of them."""
+    if not items:
+        return 0
+    step = max(1, len(items) // SIZE_SAMPLE)
+    sample = items[::step][:SIZE_SAMPLE]
+    return int(sum(deep_sizeof(item) for item in sample) / len(sample) * len(items))
+
+
+def age_summary(ages: Iterable[float]) -> Dict[str, Any]:
+    """Min, median, 90th percentile and max of entry ages in seconds (None when empty)."""
+    ordered: List[float] = sorted(ages)
+    if not ordered:
+        return {"min": None, "p50": None, "p90": None, "max": None}
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+    return {"min": round(ordered[0], 1), "p50": pick(0.5), "p90": pick(0.9), "max": round(ordered[-1], 1)}
@@ -16,19 +16,75 @@ PROCESS_STARTUP_CHECK_DELAY = 0.1  # seconds
 # Retry settings
 AWS_MAX_RETRIES = 3
 AWS_IAM_MAX_RETRIES = 2
+AWS_RETRY_MODE = "adaptive"  # botocore retry mode; adaptive also slows a client down after throttles
 PORT_CHECK_RETRIES = 3
-PORT_RANGE_MAX_ATTEMPTS = 3
+
+# AWS client pooling
+AWS_MAX_POOL_CONNECTIONS = 10  # botocore default is 10 connections per client
+AWS_CLIENT_CACHE_SIZE = 64  # max (profile, region, service, config) clients kept alive
+
+# AWS call scheduling, per (account, region, API)
+AWS_API_BUCKET_CAPACITY = 50  # calls allowed in a burst
+AWS_API_BUCKET_RATE = 10.0  # sustained calls per second
+AWS_API_MIN_RATE = 1.0  # floor the rate is halved down to by throttled responses
+AWS_API_BACKGROUND_RESERVE = 0.2  # share of a bucket background calls leave to interactive ones
+
+# Account identity (seconds)
+IDENTITY_CACHE_TTL = 43200  # account ID/alias per profile are reused this long while its credentials are unchanged
+IDENTITY_ALIAS_GRACE = 0.5  # seconds connect waits for the IAM alias after STS answers
+
+# In-memory cache limits and eviction
+CACHE_NAMES = ["inventory", "details", "regions", "identity", "sessions", "profiles", "clients"]  # caches /api/cache can invalidate
+INVENTORY_CACHE_MAX_SNAPSHOTS = 32  # default max (profile, region) snapshots kept in memory
+INVENTORY_CACHE_MAX_MEMORY_MB = 256  # default approximate memory budget of in-memory snapshots
+CACHE_POLICIES = ["lru", "lfu"]  # which snapshot goes first when over budget; the first is the default
+
+# Instance inventory cache (seconds)
+REGIONS_CACHE_TTL = 86400  # enabled regions per profile are re-fetched (in the background) after this
+INVENTORY_CACHE_TTL = 300  # blocking mode: snapshots older than this are refetched
+INVENTORY_ACTIVE_REFRESH_INTERVAL = 20  # background refresh for the connected (profile, region)
+INVENTORY_INACTIVE_REFRESH_INTERVAL = 300  # background refresh for other cached (profile, region)s
+INVENTORY_INACTIVE_KEEPALIVE = 1800  # stop refreshing inactive snapshots not read for this long
+INVENTORY_MAX_STALENESS = 3600  # never serve a snapshot older than this without blocking
+INVENTORY_REFRESHER_TICK = 5
+INVENTORY_REFRESH_MODES = ["swr", "blocking", "force"]
+INVENTORY_HISTORY_SIZE = 20  # past generations kept per (profile, region) for ?since= deltas
+INVENTORY_REGION_WORKERS = 8  # concurrent regions in a multi-region inventory sweep
+INVENTORY_ACCOUNT_WORKERS = 8  # concurrent (account, region) fetches in a multi-account sweep
+INVENTORY_SORT_KEYS = ["name", "state", "type", "launch_time", "ssm"]  # prefix with '-' for descending
+INVENTORY_MAX_PAGE_SIZE = 1000
+INVENTORY_SEARCH_LIMIT = 50  # default number of /api/instances/search results
+INVENTORY_SEARCH_MAX_QUERY = 200
+INVENTORY_STREAM_CHUNK = 1000  # instances per record when streaming a cached snapshot
+INVENTORY_EVENT_LOG_SIZE = 256  # change events kept for /api/events Last-Event-ID resume
+INVENTORY_EVENT_KEEPALIVE = 15  # seconds between /api/events keepalive comments
+INVENTORY_EVENT_RETRY_MS = 5000  # EventSource reconnect delay sent to clients
+INSTANCE_DETAILS_TTL = 300  # instance details from a listing are reused for this long
+INSTANCE_DETAILS_CACHE_SIZE = 50000  # max instances whose details are cached
+INSTANCE_DETAILS_BATCH_CHUNK = 1000  # instance IDs per DescribeInstances call in a batch lookup
+INSTANCE_DETAILS_BATCH_WORKERS = 4  # concurrent DescribeInstances calls in a batch lookup
+INSTANCE_DETAILS_BATCH_MAX = 5000  # max instance IDs per /api/instance-details request
+# Tags matched by instance search (besides name, ID and private IP)
+INVENTORY_SEARCH_TAGS = ["Environment", "Env", "Application", "Service", "Team", "Owner", "Role"]
+ASSUME_ROLE_SESSION_NAME = "ec2-session-gate"
 
 # Port ranges
 MIN_PORT = 1
 MAX_PORT = 65535
 SYSTEM_PORT_MAX = 1023
 
+# Local port allocation
+PORT_SCAN_TTL = 2.0  # seconds a read of the OS's busy ports is reused
+PORT_STICKY_MAX = 1024  # connection targets whose last local port is remembered
+
 # String limits
 MAX_INSTANCE_NAME_LENGTH = 255
 MAX_CONNECTION_ID_LENGTH = 36  # UUID length
 MAX_FILTER_QUERY_LENGTH = 100
 
+# EC2 instance states accepted by filter_state
+VALID_INSTANCE_STATES = ["pending", "running", "shutting-down", "terminated", "stopping", "stopped"]
+
 # Logging levels
 VALID_LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 
@@ -1,6 +1,5 @@
 import platform
 import shutil
-import boto3
 import logging
 from dataclasses import dataclass
 from typing import Dict, Optional
@@ -63,6 +62,7 @@ def check_health() -> HealthReport:
     creds_ok = False
     creds_error = None
     try:
+        import boto3
         sess = boto3.session.Session()
         creds = sess.get_credentials()
         creds_ok = creds is not None
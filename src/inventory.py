@@ -0,0 +1,332 @@
+"""
+In-memory inventory snapshots used by the AWS manager's instance cache.
+"""
+import sys
+import json
+import time
+import base64
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from collections.abc import Sequence as SequenceABC
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .inventory_query import AttributeIndex, parse_query
+from .cache_stats import approx_size
+
+# Value each sort key orders instances by; ties are broken by instance ID
+SORT_FIELDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "name": lambda inst: (inst.get("name") or "").lower(),
+    "state": lambda inst: inst.get("state") or "",
+    "type": lambda inst: inst.get("type") or "",
+    "launch_time": lambda inst: inst.get("launch_time") or "",
+    "ssm": lambda inst: 1 if inst.get("has_ssm") else 0,
+}
+
+
+# Fields of an instance record, in serialization order
+RECORD_FIELDS = ("id", "name", "type", "state", "os", "has_ssm", "launch_time", "private_ip", "tags")
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class InstanceRecord(Mapping):
+    """
+    Compact, immutable instance record.
+    
+    Reads like the instance dict it replaces (``record["state"]``,
+    ``record.get("tags")``) but is slotted, interns its low-cardinality
+    strings (state, type, OS, tag keys and values) and keeps tags as a
+    tuple of pairs. It is converted to a dict only at the API edge (to_dict).
+    """
+    __slots__ = ("id", "name", "type", "state", "os", "has_ssm", "launch_time", "private_ip", "_tags")
+
+    def __init__(self, id: str, name: str = "", type: str = "", state: str = "", os: str = "", has_ssm: bool = False,
+                 launch_time: str = "", private_ip: str = "", tags: Optional[Dict[str, str]] = None):
+        set_slot = object.__setattr__
+        set_slot(self, "id", id)
+        set_slot(self, "name", name)
+        set_slot(self, "type", _intern(type))
+        set_slot(self, "state", _intern(state))
+        set_slot(self, "os", _intern(os))
+        set_slot(self, "has_ssm", bool(has_ssm))
+        set_slot(self, "launch_time", launch_time)
+        set_slot(self, "private_ip", private_ip)
+        set_slot(self, "_tags", tuple((_intern(k), _intern(v)) for k, v in (tags or {}).items()))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InstanceRecord":
+        return cls(**{key: data[key] for key in RECORD_FIELDS if data.get(key) is not None})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in RECORD_FIELDS}
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        return dict(self._tags)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("InstanceRecord is immutable")
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "tags":
+            return dict(self._tags)
+        if key in RECORD_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(RECORD_FIELDS)
+
+    def __len__(self) -> int:
+        return len(RECORD_FIELDS)
+
+    def _values(self) -> tuple:
+        return (self.id, self.name, self.type, self.state, self.os, self.has_ssm, self.launch_time, self.private_ip, self._tags)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, InstanceRecord):
+            return self._values() == other._values()
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self) -> int:
+        return hash(self._values())
+
+    def __repr__(self) -> str:
+        return f"InstanceRecord({self.to_dict()!r})"
+
+
+@dataclass
+class InventorySnapshot:
+    """
+    An immutable point-in-time view of the instances in one (profile, region).
+    
+    Refreshes build a new snapshot instead of mutating this one, so readers
+    share it (and the tuples it hands out) without copying or locking.
+    """
+    profile: str
+    region: Optional[str]
+    instances: Sequence[Mapping]
+    fetched_at: float = field(default_factory=time.time)
+    # Monotonically increasing across all snapshots; unchanged refreshes keep it
+    generation: int = 0
+    # Indexes built once per refresh
+    by_state: Dict[str, Tuple[Mapping, ...]] = field(init=False, repr=False)
+    by_id: Dict[str, Mapping] = field(init=False, repr=False)
+    # Sorted indexes built on first use: (sort, filter_state) -> (sort keys, instances)
+    _sorted: Dict[tuple, tuple] = field(init=False, repr=False, compare=False, default_factory=dict)
+    _attributes: Optional[AttributeIndex] = field(init=False, repr=False, compare=False, default=None)
+    _bytes: Optional[int] = field(init=False, repr=False, compare=False, default=None)
+
+    def __post_init__(self):
+        self.instances = tuple(self.instances)
+        by_state: Dict[str, list] = {}
+        by_id: Dict[str, Mapping] = {}
+        for inst in self.instances:
+            by_state.setdefault(inst.get("state", ""), []).append(inst)
+            by_id[inst["id"]] = inst
+        self.by_state = {state: tuple(items) for state, items in by_state.items()}
+        self.by_id = by_id
+
+    def select(self, filter_state: Optional[str] = None) -> Tuple[Mapping, ...]:
+        """Return all instances, or only those in filter_state (shared, not copied)."""
+        if filter_state is None:
+            return self.instances
+        return self.by_state.get(filter_state, ())
+
+    def sorted_index(self, sort: str, filter_state: Optional[str] = None) -> Tuple[list, List[Mapping]]:
+        """
+        Return the instances ordered by sort, with their (value, id) sort keys.
+        
+        Built once per snapshot and (sort, filter_state); snapshots are replaced
+        rather than mutated, so the index never needs invalidating.
+        """
+        index = self._sorted.get((sort, filter_state))
+        if index is None:
+            if filter_state is None:
+                value = SORT_FIELDS[sort]
+                items = sorted(self.instances, key=lambda inst: (value(inst), inst["id"]))
+                index = ([(value(inst), inst["id"]) for inst in items], items)
+            else:
+                keys, items = self.sorted_index(sort)
+                pairs = [(k, inst) for k, inst in zip(keys, items) if inst.get("state") == filter_state]
+                index = ([k for k, _ in pairs], [inst for _, inst in pairs])
+            self._sorted[(sort, filter_state)] = index
+        return index
+
+    def page(self, sort: str = "name", descending: bool = False, limit: Optional[int] = None,
+             cursor: Optional[str] = None, filter_state: Optional[str] = None) -> Tuple[List[Mapping], Optional[str], int]:
+        """
+        Return one page of instances in sort order.
+        
+        Cursors mark the last instance of the previous page by its sort key, so
+        paging stays consistent when the snapshot is refreshed between pages.
+        
+        Args:
+            sort: One of SORT_FIELDS
+            descending: Reverse the order
+            limit: Maximum instances to return (all remaining if None)
+            cursor: next_cursor of the previous page
+            filter_state: Optional instance state filter
+        
+        Returns:
+            Tuple of (instances, next_cursor or None on the last page, total matching instances)
+        
+        Raises:
+            ValueError: If the cursor is malformed or was issued for another sort order
+        """
+        keys, items = self.sorted_index(sort, filter_state)
+        total = len(items)
+        position = None
+        if cursor:
+            position = decode_cursor(cursor, sort, descending)
+        
+        if descending:
+            end = bisect_left(keys, position) if position is not None else total
+            start = max(0, end - limit) if limit else 0
+            page = items[start:end][::-1]
+            has_more = start > 0
+        else:
+            start = bisect_right(keys, position) if position is not None else 0
+            end = min(total, start + limit) if limit else total
+            page = items[start:end]
+            has_more = end < total
+        
+        next_cursor = None
+        if has_more and page:
+            last = page[-1]
+            next_cursor = encode_cursor(sort, descending, (SORT_FIELDS[sort](last), last["id"]))
+        return page, next_cursor, total
+
+    def carry_from(self, previous: "InventorySnapshot"):
+        """
+        Reuse the indexes built for previous, which must hold the same instances
+        (an unchanged refresh), instead of building them again.
+        """
+        self._sorted = previous._sorted
+        self._attributes = previous._attributes
+        self._bytes = previous._bytes
+
+    @property
+    def attributes(self) -> AttributeIndex:
+        """Tag/attribute inverted index with facet counts, built once per snapshot."""
+        if self._attributes is None:
+            self._attributes = AttributeIndex(self.instances)
+        return self._attributes
+
+    def query(self, query: str) -> List[Mapping]:
+        """
+        Return the instances matching a filter query, in name order.
+        
+        Raises:
+            ValueError: If the query is malformed
+        """
+        ids = self.attributes.evaluate(parse_query(query))
+        _, by_name = self.sorted_index("name")
+        if len(ids) * 8 < len(by_name):
+            return sorted((self.by_id[iid] for iid in ids), key=lambda inst: (SORT_FIELDS["name"](inst), inst["id"]))
+        return [inst for inst in by_name if inst["id"] in ids]
+
+    @property
+    def approx_bytes(self) -> int:
+        """Estimated memory held by the instance records (computed once, from a sample)."""
+        if self._bytes is None:
+            self._bytes = approx_size(self.instances)
+        return self._bytes
+
+    @property
+    def key(self) -> tuple:
+        return (self.profile, self.region)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was fetched from AWS."""
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class InstanceList(SequenceABC):
+    """
+    Read-only list of instance dicts annotated with snapshot metadata.
+
+    Wraps the snapshot's tuple (or a page of it) without copying, and compares
+    equal to a list or tuple with the same items. The API layer serializes
+    ``items`` directly and reads ``meta`` to report the snapshot age in
+    response headers.
+    """
+
+    __slots__ = ("items", "meta")
+
+    def __init__(self, items: Sequence[Mapping] = (), meta: Optional[Dict[str, Any]] = None):
+        self.items = items if isinstance(items, (tuple, list)) else tuple(items)
+        self.meta: Dict[str, Any] = meta or {}
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) -> Iterator[Mapping]:
+        return iter(self.items)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, InstanceList):
+            other = other.items
+        if not isinstance(other, (tuple, list)):
+            return NotImplemented
+        return len(self.items) == len(other) and all(a == b for a, b in zip(self.items, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"InstanceList({list(self.items)!r}, meta={self.meta!r})"
+
+
+def to_json_value(value: Any) -> Any:
+    """``default`` hook for json.dumps: serializes instance records as plain dicts."""
+    if isinstance(value, InstanceRecord):
+        return value.to_dict()
+    if isinstance(value, InstanceList):
+        return value.items
+    return str(value)
+
+
+def encode_cursor(sort: str, descending: bool, position: tuple) -> str:
+    """Encode a page position as an opaque URL-safe cursor."""
+    payload = json.dumps([("-" if descending else "") + sort, *position], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort order
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        order, value, iid = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if order != ("-" if descending else "") + sort or not isinstance(iid, str):
+        raise ValueError("Cursor does not match the requested sort order")
+    expected = type(SORT_FIELDS[sort]({}))
+    if not isinstance(value, expected):
+        raise ValueError("Invalid cursor")
+    return (value, iid)
+
+
+def diff_instances(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> Dict[str, list]:
+    """
+    Compute the changes between two id -> instance maps.
+
+    Returns:
+        Dict with ``added`` and ``changed`` instance dicts and ``removed`` instance IDs
+    """
+    added = [inst for iid, inst in new.items() if iid not in old]
+    changed = [inst for iid, inst in new.items() if iid in old and old[iid] != inst]
+    removed = [iid for iid in old if iid not in new]
+    return {"added": added, "removed": removed, "changed": changed}
@@ -0,0 +1,84 @@
+"""
+Journal of inventory change events for the /api/events stream.
+
+Every refresh that changes a snapshot publishes one event, identified by the
+snapshot's generation. Subscribers resume after the last event ID they saw; if
+that is older than what the journal still holds, they are told to resync.
+"""
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .constants import INVENTORY_EVENT_LOG_SIZE
+
+
+def describe_changes(old: Dict[str, Dict[str, Any]], changes: Dict[str, list]) -> Dict[str, list]:
+    """
+    Summarize the state and SSM transitions in a diff_instances() result.
+
+    Args:
+        old: Previous id -> instance map the diff was computed from
+        changes: diff_instances() result
+
+    Returns:
+        Dict with ``state_changed`` ({id, from, to}) and ``ssm_changed`` ({id, has_ssm}) lists
+    """
+    state_changed = []
+    ssm_changed = []
+    for inst in changes["changed"]:
+        before = old[inst["id"]]
+        if before.get("state") != inst.get("state"):
+            state_changed.append({"id": inst["id"], "from": before.get("state"), "to": inst.get("state")})
+        if bool(before.get("has_ssm")) != bool(inst.get("has_ssm")):
+            ssm_changed.append({"id": inst["id"], "has_ssm": bool(inst.get("has_ssm"))})
+    return {"state_changed": state_changed, "ssm_changed": ssm_changed}
+
+
+class InventoryEventLog:
+    """Bounded, thread-safe journal of change events with blocking reads."""
+
+    def __init__(self, size: int = INVENTORY_EVENT_LOG_SIZE):
+        self._events: deque = deque(maxlen=size)
+        self._cond = threading.Condition()
+        # Events with IDs at or below the floor can no longer be replayed
+        self._floor = 0
+
+    @property
+    def latest_id(self) -> int:
+        with self._cond:
+            return self._events[-1]["id"] if self._events else self._floor
+
+    def raise_floor(self, event_id: int):
+        """Mark everything up to event_id as not replayable (e.g. from before a restart)."""
+        with self._cond:
+            self._floor = max(self._floor, event_id)
+
+    def publish(self, event: Dict[str, Any]):
+        """Append an event (a dict with an increasing ``id``) and wake up waiting readers."""
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self._floor = max(self._floor, self._events[0]["id"])
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def _since(self, last_id: int) -> Optional[List[Dict[str, Any]]]:
+        if last_id < self._floor or last_id > (self._events[-1]["id"] if self._events else self._floor):
+            return None
+        return [event for event in self._events if event["id"] > last_id]
+
+    def since(self, last_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the events after last_id.
+
+        Returns:
+            The events in order (possibly empty), or None if last_id can't be
+            resumed from because the events after it were dropped or it is unknown
+        """
+        with self._cond:
+            return self._since(last_id)
+
+    def wait(self, last_id: int, timeout: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """Like since(), but block up to timeout seconds for an event after last_id."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._since(last_id) != [], timeout)
+            return self._since(last_id)
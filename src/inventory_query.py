@@ -0,0 +1,144 @@
+"""
+Attribute index and filter query language for inventory snapshots.
+
+Queries are whitespace-separated terms, all of which must match:
+
+    tag:env=prod      tag value (tag key and value accept * and ? wildcards)
+    tag:owner         instances having the tag at all
+    type:m5.*         instance type
+    state:running     instance state
+    ssm:yes           SSM-managed (yes/no)
+    os:windows        operating system
+    name:web-*        instance name
+    web               bare words match names containing them
+
+Prefix a term with ``-`` to exclude matches. Matching is case-insensitive.
+"""
+import shlex
+import fnmatch
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Set
+
+# Fields indexed as field -> value -> instance IDs (tags as "tag:<key>")
+INDEXED_FIELDS = ("state", "type", "os", "ssm", "name")
+# Fields reported in facet counts (names are unique, so they're left out)
+FACET_FIELDS = ("state", "type", "os", "ssm")
+
+
+@dataclass(frozen=True)
+class QueryTerm:
+    field: str
+    key: str  # tag key pattern, for tag terms
+    value: str  # value pattern; "*" matches any value
+    negated: bool = False
+
+
+def _field_value(instance: Dict[str, Any], field: str) -> str:
+    if field == "ssm":
+        return "yes" if instance.get("has_ssm") else "no"
+    return instance.get(field) or ""
+
+
+class AttributeIndex:
+    """Inverted index of instance attributes and tags, with precomputed facet counts."""
+
+    def __init__(self, instances: Iterable[Dict[str, Any]]):
+        self.postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        self.tags: Dict[str, Dict[str, Set[str]]] = {}
+        self.all_ids: Set[str] = set()
+        for inst in instances:
+            iid = inst["id"]
+            self.all_ids.add(iid)
+            for field in INDEXED_FIELDS:
+                self.postings[field].setdefault(_field_value(inst, field), set()).add(iid)
+            for key, value in (inst.get("tags") or {}).items():
+                self.tags.setdefault(key, {}).setdefault(value, set()).add(iid)
+        self.facets = self._facets()
+
+    def _facets(self) -> Dict[str, Any]:
+        facets: Dict[str, Any] = {
+            field: {value: len(ids) for value, ids in self.postings[field].items() if value}
+            for field in FACET_FIELDS
+        }
+        facets["tags"] = {
+            key: {value: len(ids) for value, ids in values.items()}
+            for key, values in self.tags.items()
+        }
+        return facets
+
+    def match(self, term: QueryTerm) -> Set[str]:
+        """IDs of the instances matching term (ignoring its negation)."""
+        if term.field == "tag":
+            groups = [values for key, values in self.tags.items() if _glob(key, term.key)]
+        else:
+            groups = [self.postings[term.field]]
+        matched: Set[str] = set()
+        for values in groups:
+            for value, ids in values.items():
+                if _glob(value, term.value):
+                    matched |= ids
+        return matched
+
+    def evaluate(self, terms: List[QueryTerm]) -> Set[str]:
+        """IDs of the instances matching every term."""
+        include = [self.match(t) for t in terms if not t.negated]
+        exclude = [self.match(t) for t in terms if t.negated]
+        if include:
+            include.sort(key=len)
+            result = set(include[0])
+            for ids in include[1:]:
+                result &= ids
+                if not result:
+                    break
+        else:
+            result = set(self.all_ids)
+        for ids in exclude:
+            result -= ids
+        return result
+
+
+def _glob(value: str, pattern: str) -> bool:
+    if pattern == "*":
+        return True
+    value, pattern = value.lower(), pattern.lower()
+    if "*" in pattern or "?" in pattern:
+        return fnmatch.fnmatchcase(value, pattern)
+    return value == pattern
+
+
+def parse_query(query: str) -> List[QueryTerm]:
+    """
+    Parse a filter query into terms.
+
+    Raises:
+        ValueError: If the query is malformed or uses an unknown field
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError as e:
+        raise ValueError(f"Invalid query: {e}")
+
+    terms = []
+    for token in tokens:
+        negated = token.startswith("-") and len(token) > 1
+        if negated:
+            token = token[1:]
+        field, sep, value = token.partition(":")
+        if not sep:
+            terms.append(QueryTerm("name", "", f"*{token}*", negated))
+            continue
+        field = field.lower()
+        if field == "tag":
+            key, _, tag_value = value.partition("=")
+            if not key:
+                raise ValueError("tag: terms need a tag key, e.g. tag:env=prod")
+            terms.append(QueryTerm("tag", key, tag_value or "*", negated))
+        elif field in INDEXED_FIELDS:
+            if not value:
+                raise ValueError(f"{field}: needs a value")
+            if field == "ssm" and value.lower() not in ("yes", "no"):
+                raise ValueError("ssm: must be yes or no")
+            terms.append(QueryTerm(field, "", value, negated))
+        else:
+            raise ValueError(f"Unknown query field: {field}")
+    return terms
@@ -0,0 +1,128 @@
+"""
+Trigram index for fuzzy instance search.
+
+One index is kept per cached (profile, region) snapshot and updated from the
+diff between successive snapshots, so a refresh only re-indexes the instances
+that changed.
+"""
+import heapq
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .constants import INVENTORY_SEARCH_TAGS
+
+# Share of the query's trigrams a fuzzy match must contain
+FUZZY_MIN_OVERLAP = 0.5
+# Posting lists intersected to find candidates for a verbatim match
+INTERSECT_GRAMS = 3
+
+
+def searchable_text(instance: Dict[str, Any]) -> str:
+    """Lower-cased text an instance is found by: name, ID, private IP and selected tags."""
+    parts = [instance.get("name") or "", instance.get("id") or "", instance.get("private_ip") or ""]
+    tags = instance.get("tags") or {}
+    parts.extend(str(tags[key]) for key in INVENTORY_SEARCH_TAGS if tags.get(key))
+    return " ".join(part for part in parts if part).lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    """All three-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Incrementally maintained trigram -> instance ID index."""
+
+    def __init__(self, instances: Iterable[Dict[str, Any]] = ()):
+        self._docs: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        with self._lock:
+            for inst in instances:
+                self._add(inst["id"], searchable_text(inst))
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _add(self, iid: str, text: str):
+        self._docs[iid] = text
+        for gram in trigrams(text):
+            self._postings.setdefault(gram, set()).add(iid)
+
+    def _remove(self, iid: str):
+        text = self._docs.pop(iid, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(iid)
+                if not ids:
+                    del self._postings[gram]
+
+    def update(self, added: Iterable[Dict[str, Any]] = (), removed: Iterable[str] = (), changed: Iterable[Dict[str, Any]] = ()):
+        """Apply a diff_instances() result to the index."""
+        with self._lock:
+            for iid in removed:
+                self._remove(iid)
+            for inst in changed:
+                text = searchable_text(inst)
+                if self._docs.get(inst["id"]) != text:
+                    self._remove(inst["id"])
+                    self._add(inst["id"], text)
+            for inst in added:
+                self._remove(inst["id"])
+                self._add(inst["id"], searchable_text(inst))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Return the IDs of instances matching query, best matches first.
+
+        Instances containing the query verbatim rank first (earlier and shorter
+        matches higher); otherwise instances sharing enough of the query's
+        trigrams are returned as fuzzy matches.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of IDs to return
+        """
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        with self._lock:
+            grams = sorted(trigrams(query), key=lambda g: len(self._postings.get(g, ())))
+            if not grams:
+                # Too short to index: scan
+                candidates: Iterable[str] = self._docs
+            else:
+                # Intersect the rarest postings; the substring check below is exact,
+                # so intersecting common trigrams too would rarely narrow it further
+                candidates = None
+                for gram in grams[:INTERSECT_GRAMS]:
+                    ids = self._postings.get(gram, set())
+                    candidates = set(ids) if candidates is None else candidates & ids
+                    if not candidates:
+                        break
+            # Verify the substring and rank earlier, then shorter matches first
+            exact = [(self._docs[iid].find(query), len(self._docs[iid]), iid) for iid in candidates if query in self._docs[iid]]
+            if exact or not grams:
+                return [iid for _, _, iid in _best(exact, limit)]
+            
+            # Fuzzy: instances sharing enough trigrams with the query. Any such
+            # instance holds at least one of the rarest (len - needed + 1) trigrams
+            needed = max(1, int(len(grams) * FUZZY_MIN_OVERLAP + 0.5))
+            postings = [self._postings.get(gram, set()) for gram in grams]
+            candidates = set().union(*postings[:len(grams) - needed + 1])
+            fuzzy = []
+            for iid in candidates:
+                hits = sum(1 for ids in postings if iid in ids)
+                if hits >= needed:
+                    fuzzy.append((-hits, len(self._docs[iid]), iid))
+            return [iid for _, _, iid in _best(fuzzy, limit)]
+
+
+def _best(scored: List[tuple], limit: Optional[int]) -> List[tuple]:
+    """The lowest-scored entries in order, without sorting everything when limited."""
+    if limit and limit < len(scored):
+        return heapq.nsmallest(limit, scored)
+    return sorted(scored)
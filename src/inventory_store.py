@@ -0,0 +1,171 @@
+"""
+Persistent on-disk store for inventory snapshots.
+
+Keeps the latest snapshot per (profile, region) in a small SQLite database so
+the instance list can be shown immediately at startup and browsed offline. The
+enabled regions of each profile are kept alongside, so the region dropdown
+doesn't wait on AWS either.
+"""
+import os
+import json
+import zlib
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .inventory import InventorySnapshot, InstanceRecord, to_json_value
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_DB_PATH = Path.home() / ".config" / "ec2-session-gate" / "inventory.db"
+
+# Bump when the stored payload format changes; older databases are discarded
+SCHEMA_VERSION = 1
+
+
+class InventoryStore:
+    """SQLite-backed store of the latest inventory snapshot per (profile, region)."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return Path(self._path or INVENTORY_DB_PATH)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (caller holds the lock)."""
+        if self._conn is not None:
+            return self._conn
+
+        from .constants import PREF_DIR_PERMISSIONS, PREF_FILE_PERMISSIONS
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.chmod(path.parent, PREF_DIR_PERMISSIONS)
+        except Exception:
+            pass  # Ignore permission errors on some systems
+
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS snapshots")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " profile TEXT NOT NULL,"
+            " region TEXT NOT NULL,"
+            " generation INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " PRIMARY KEY (profile, region))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS regions ("
+            " profile TEXT PRIMARY KEY,"
+            " fetched_at REAL NOT NULL,"
+            " regions TEXT NOT NULL)"
+        )
+        conn.commit()
+
+        try:
+            os.chmod(path, PREF_FILE_PERMISSIONS)
+        except Exception:
+            pass  # Ignore permission errors on some systems
+
+        self._conn = conn
+        return conn
+
+    def save(self, snapshot: InventorySnapshot):
+        """Store snapshot as the latest one for its (profile, region)."""
+        payload = zlib.compress(json.dumps(snapshot.instances, separators=(",", ":"), default=to_json_value).encode("utf-8"))
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (profile, region, generation, fetched_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (snapshot.profile, snapshot.region or "", snapshot.generation, snapshot.fetched_at, payload)
+            )
+            conn.commit()
+
+    def touch(self, snapshot: InventorySnapshot):
+        """Record that an unchanged snapshot was revalidated."""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE snapshots SET fetched_at = ? WHERE profile = ? AND region = ? AND generation = ?",
+                (snapshot.fetched_at, snapshot.profile, snapshot.region or "", snapshot.generation)
+            )
+            conn.commit()
+        if cursor.rowcount == 0:
+            self.save(snapshot)
+
+    def load(self, profile: str, region: Optional[str]) -> Optional[InventorySnapshot]:
+        """Return the stored snapshot for (profile, region), or None."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT generation, fetched_at, payload FROM snapshots WHERE profile = ? AND region = ?",
+                (profile, region or "")
+            ).fetchone()
+        if row is None:
+            return None
+        generation, fetched_at, payload = row
+        try:
+            instances = json.loads(zlib.decompress(payload).decode("utf-8"))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"Discarding unreadable stored inventory for {(profile, region)}: {e}")
+            self.delete(profile, region)
+            return None
+        instances = [InstanceRecord.from_dict(inst) for inst in instances]
+        return InventorySnapshot(profile, region, instances, fetched_at=fetched_at, generation=generation)
+
+    def max_generation(self) -> int:
+        """Highest generation stored, so new generations keep increasing across restarts."""
+        with self._lock:
+            row = self._connection().execute("SELECT MAX(generation) FROM snapshots").fetchone()
+        return row[0] or 0
+
+    def delete(self, profile: str, region: Optional[str]):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM snapshots WHERE profile = ? AND region = ?", (profile, region or ""))
+            conn.commit()
+
+    def save_regions(self, profile: str, regions: List[str], fetched_at: float):
+        """Store the enabled regions of profile."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO regions (profile, fetched_at, regions) VALUES (?, ?, ?)",
+                (profile, fetched_at, json.dumps(regions))
+            )
+            conn.commit()
+
+    def load_regions(self, profile: str) -> Optional[Tuple[float, List[str]]]:
+        """Return (fetched_at, regions) stored for profile, or None."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT fetched_at, regions FROM regions WHERE profile = ?", (profile,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return row[0], json.loads(row[1])
+        except ValueError as e:
+            logger.warning(f"Discarding unreadable stored regions for {profile}: {e}")
+            return None
+
+    def delete_regions(self, profile: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM regions WHERE profile = ?", (profile,))
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
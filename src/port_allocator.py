@@ -0,0 +1,182 @@
+"""
+Local port allocation for port forwarding sessions.
+
+Ports are handed out from bitmaps (one bit per TCP port) of the ports this
+process has reserved and of those the OS reports in use, so picking a port is
+a couple of integer operations instead of a bind attempt per port. The OS view
+is read from /proc/net/tcp{,6} at most once per ``scan_ttl``; where /proc isn't
+available it is built up from failed bind checks instead. The chosen port is
+still bind-checked once before it's handed out, since another program may have
+taken it since the last scan.
+
+Reservations are atomic, so concurrent connections never get the same port,
+and each (instance, remote target) remembers its last port and gets it again
+while it's free, keeping SSH known_hosts entries and bookmarks stable.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .constants import PORT_SCAN_TTL, PORT_STICKY_MAX
+
+# /proc/net/tcp{,6} list every TCP socket; the local port is the hex after the
+# colon of the second column, the state the fourth column
+PROC_NET_TCP = ("/proc/net/tcp", "/proc/net/tcp6")
+# Sockets in TIME_WAIT don't stop a bind with SO_REUSEADDR
+TCP_TIME_WAIT = "06"
+
+
+def _range_mask(start: int, end: int) -> int:
+    """Bitmap with the bits of ports start..end (inclusive) set."""
+    return ((1 << (end - start + 1)) - 1) << start
+
+
+def read_busy_ports(paths=PROC_NET_TCP) -> Optional[int]:
+    """
+    Bitmap of the local TCP ports in use according to /proc/net/tcp{,6}.
+
+    Returns:
+        Bitmap with a bit set per busy port, or None if none of the files could be read
+    """
+    busy = 0
+    found = False
+    for path in paths:
+        try:
+            with open(path) as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 4 or fields[3] == TCP_TIME_WAIT:
+                        continue
+                    busy |= 1 << int(fields[1].rsplit(":", 1)[1], 16)
+            found = True
+        except (OSError, ValueError, IndexError):
+            continue
+    return busy if found else None
+
+
+class PortAllocator:
+    """Thread-safe reservations of local ports with sticky per-key preferences."""
+
+    def __init__(self, probe: Callable[[int], bool], scan: Callable[[], Optional[int]] = read_busy_ports,
+                 scan_ttl: float = PORT_SCAN_TTL, sticky_max: int = PORT_STICKY_MAX):
+        """
+        Args:
+            probe: Single bind check of a port, True if it's free
+            scan: Returns a bitmap of the ports in use, or None if the OS can't be asked
+            scan_ttl: Seconds a scan is trusted before the OS is read again
+            sticky_max: Most keys whose last port is remembered
+        """
+        self._probe = probe
+        self._scan = scan
+        self._scan_ttl = scan_ttl
+        self._sticky_max = sticky_max
+        self._owned = 0
+        self._busy = 0
+        self._scanned_at: Optional[float] = None
+        self._sticky: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.probes = 0
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self._scanned_at is not None and now - self._scanned_at < self._scan_ttl:
+            return
+        busy = self._scan()
+        # Without /proc, forget the ports seen busy so they're bind-checked again
+        self._busy = busy if busy is not None else 0
+        self._scanned_at = now
+        self.scans += 1
+
+    def _take(self, port: int) -> bool:
+        """Reserve port if it's neither owned nor busy and passes the bind check."""
+        bit = 1 << port
+        if (self._owned | self._busy) & bit:
+            return False
+        self.probes += 1
+        if not self._probe(port):
+            self._busy |= bit
+            return False
+        self._owned |= bit
+        return True
+
+    def _take_from_range(self, start: int, end: int) -> Optional[int]:
+        mask = _range_mask(start, end)
+        while True:
+            free = mask & ~(self._owned | self._busy)
+            if not free:
+                return None
+            port = (free & -free).bit_length() - 1  # lowest set bit
+            if self._take(port):
+                return port
+
+    def reserve(self, start: int, end: int, key: Optional[Hashable] = None, preferred: Optional[int] = None) -> int:
+        """
+        Reserve a local port until release() is called.
+
+        The preferred port is used if it's free (it may lie outside the range),
+        then the port last reserved for key, then the lowest free port in the range.
+
+        Args:
+            start: Start of the port range
+            end: End of the port range (inclusive)
+            key: Identifies the connection target whose port should stay the same across sessions
+            preferred: Port explicitly asked for
+
+        Returns:
+            Reserved port
+
+        Raises:
+            RuntimeError: If no port in the range is free
+        """
+        with self._lock:
+            self._refresh()
+            candidates = [preferred]
+            if key is not None:
+                sticky = self._sticky.get(key)
+                if sticky is not None and start <= sticky <= end:
+                    candidates.append(sticky)
+            port = next((p for p in candidates if p is not None and self._take(p)), None)
+            if port is None:
+                port = self._take_from_range(start, end)
+            if port is None and self._scanned_at is not None:
+                # The range looks full; ports may have been closed since the last scan
+                self._refresh(force=True)
+                port = self._take_from_range(start, end)
+            if port is None:
+                raise RuntimeError(f"No free port available in configured range ({start}-{end})")
+            if key is not None:
+                self._sticky[key] = port
+                self._sticky.move_to_end(key)
+                while len(self._sticky) > self._sticky_max:
+                    self._sticky.popitem(last=False)
+            return port
+
+    def release(self, port: Optional[int]):
+        """Give a reserved port back; unknown ports are ignored."""
+        if port is None:
+            return
+        with self._lock:
+            self._owned &= ~(1 << port)
+
+    def is_reserved(self, port: int) -> bool:
+        with self._lock:
+            return bool(self._owned & (1 << port))
+
+    def stats(self) -> Dict[str, Any]:
+        """Reserved ports, remembered preferences and how often the OS was asked."""
+        with self._lock:
+            owned = self._owned
+            reserved = []
+            while owned:
+                low = owned & -owned
+                reserved.append(low.bit_length() - 1)
+                owned ^= low
+            return {
+                "reserved": reserved,
+                "sticky": len(self._sticky),
+                "scans": self.scans,
+                "probes": self.probes,
+            }
@@ -6,6 +6,15 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Tuple
 
+from .constants import (
+    AWS_CLIENT_CACHE_SIZE,
+    AWS_MAX_POOL_CONNECTIONS,
+    CACHE_POLICIES,
+    INSTANCE_DETAILS_CACHE_SIZE,
+    INVENTORY_CACHE_MAX_MEMORY_MB,
+    INVENTORY_CACHE_MAX_SNAPSHOTS,
+)
+
 logger = logging.getLogger(__name__)
 
 PREF_PATH = Path.home() / ".config" / "ec2-session-gate" / "preferences.json"
@@ -40,7 +49,18 @@ DEFAULTS = {
     "logging": {"level": "INFO", "format": "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"},
     "aws": {"profile": None, "region": None},
     "ssh_key_folder": None,
-    "ssh_options": "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null"
+    "ssh_options": "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null",
+    "performance": {
+        "max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+        # In-memory cache limits; the connected profile/region is never evicted
+        "cache_policy": CACHE_POLICIES[0],
+        "cache_max_snapshots": INVENTORY_CACHE_MAX_SNAPSHOTS,
+        "cache_max_memory_mb": INVENTORY_CACHE_MAX_MEMORY_MB,
+        "cache_max_details": INSTANCE_DETAILS_CACHE_SIZE,
+        "cache_max_clients": AWS_CLIENT_CACHE_SIZE,
+        # Warm the inventory, regions and SSH key paths on connect and at startup
+        "prefetch": True,
+    }
 }
 
 @dataclass
@@ -53,6 +73,13 @@ class Preferences:
     last_region: Optional[str] = None
     ssh_key_folder: Optional[str] = None
     ssh_options: str = DEFAULTS["ssh_options"]
+    max_pool_connections: int = DEFAULTS["performance"]["max_pool_connections"]
+    cache_policy: str = DEFAULTS["performance"]["cache_policy"]
+    cache_max_snapshots: int = DEFAULTS["performance"]["cache_max_snapshots"]
+    cache_max_memory_mb: int = DEFAULTS["performance"]["cache_max_memory_mb"]
+    cache_max_details: int = DEFAULTS["performance"]["cache_max_details"]
+    cache_max_clients: int = DEFAULTS["performance"]["cache_max_clients"]
+    prefetch: bool = DEFAULTS["performance"]["prefetch"]
 
     @classmethod
     def load(cls):
@@ -69,6 +96,7 @@ class Preferences:
         pr = data.get("port_range", {})
         lg = data.get("logging", {})
         aws = data.get("aws", {})
+        perf = data.get("performance", {})
         
         # Validate and set port range
         from .constants import MIN_PORT, MAX_PORT
@@ -94,6 +122,28 @@ class Preferences:
             logger.warning(f"Invalid logging level {log_level}, using default")
             log_level = DEFAULTS["logging"]["level"]
         
+        # Validate AWS connection pool size and cache limits (positive integers)
+        limits = {}
+        for name in ("max_pool_connections", "cache_max_snapshots", "cache_max_memory_mb", "cache_max_details", "cache_max_clients"):
+            try:
+                value = int(perf.get(name, DEFAULTS["performance"][name]))
+            except (TypeError, ValueError):
+                value = DEFAULTS["performance"][name]
+            if value < 1:
+                logger.warning(f"Invalid {name} {value}, using default")
+                value = DEFAULTS["performance"][name]
+            limits[name] = value
+        
+        cache_policy = str(perf.get("cache_policy", DEFAULTS["performance"]["cache_policy"])).lower()
+        if cache_policy not in CACHE_POLICIES:
+            logger.warning(f"Invalid cache_policy {cache_policy}, using default")
+            cache_policy = DEFAULTS["performance"]["cache_policy"]
+        
+        prefetch = perf.get("prefetch", DEFAULTS["performance"]["prefetch"])
+        if not isinstance(prefetch, bool):
+            logger.warning(f"Invalid prefetch {prefetch!r}, using default")
+            prefetch = DEFAULTS["performance"]["prefetch"]
+        
         return cls(
             port_range_start=port_start,
             port_range_end=port_end,
@@ -103,6 +153,9 @@ class Preferences:
             last_region=aws.get("region") or None,
             ssh_key_folder=data.get("ssh_key_folder") or None,
             ssh_options=str(data.get("ssh_options", DEFAULTS["ssh_options"])),
+            cache_policy=cache_policy,
+            prefetch=prefetch,
+            **limits,
         )
 
     def to_dict(self):
@@ -123,6 +176,7 @@ class Preferences:
             result["ssh_key_folder"] = self.ssh_key_folder
         # Include SSH options (always include, has default value)
         result["ssh_options"] = self.ssh_options
+        result["performance"] = {name: getattr(self, name) for name in DEFAULTS["performance"]}
         return result
 
     def save(self):
@@ -3,12 +3,20 @@
 const app = {
     // State
     is_connected: false,
-    refresh_interval: null,  // 
+    refresh_interval: null,  // Polling timer, when EventSource isn't available
+    event_source: null,  // /api/events subscription while auto-refresh is on
     refresh_countdown: 30,
     current_profile: '',
     current_region: '',
     instances: [],
+    instances_filter: null,  // State filter the current instance list was loaded with
+    inventory_generation: null,  // Server snapshot generation of the current list (for ?since= deltas)
+    instance_page_size: 200,  // Instances fetched per page (server-side sorted)
+    instance_max_page_size: 1000,  // Largest page the server returns (INVENTORY_MAX_PAGE_SIZE)
+    instances_cursor: null,  // Cursor of the next page, null when everything is loaded
+    instances_total: null,  // Total instances matching the current filter on the server
     connections: [],
+    regions_by_profile: {},  // profile -> enabled regions, as returned by /api/regions
     aws_account_id: null,  // Add AWS account ID state
     aws_account_alias: null,  // Add AWS account alias state 
     // Cached DOM elements
@@ -335,7 +343,7 @@ try {
     setup_event_listeners() {
         console.log('Setting up event listeners...');
         this.elements.connectBtn.onclick = () => this.toggle_connection();
-        this.elements.refreshBtn.onclick = () => this.refresh_data();
+        this.elements.refreshBtn.onclick = () => this.refresh_data(true);
         this.elements.autoRefreshSwitch.onchange = (e) => this.toggle_auto_refresh(e);
     },
 
@@ -450,31 +458,16 @@ async load_profiles_and_regions() {
             : (Array.isArray(profiles) && profiles.length > 0 ? profiles[0] : 'default');
         
         try {
-            const regionsRes = await fetch(`/api/regions?profile=${encodeURIComponent(profileToUse)}`);
-            const regionsData = await regionsRes.json();
-            
-            if (regionsRes.ok && regionsData.ok && Array.isArray(regionsData.data)) {
-                this.updateSelect(this.elements.regionSelect, regionsData.data);
-                
-                // Restore saved region if it exists and is valid
-                if (savedRegion && regionsData.data.includes(savedRegion)) {
-                    this.elements.regionSelect.value = savedRegion;
-                    this.current_region = savedRegion;
-                    console.log('[Profile Loading] Restored region from backend:', savedRegion);
-                }
-            } else {
-                // Fallback to default regions
-                const defaultRegionsRes = await fetch('/api/regions');
-                if (defaultRegionsRes.ok) {
-                    const defaultRegionsJson = await defaultRegionsRes.json();
-                    if (defaultRegionsJson.ok && Array.isArray(defaultRegionsJson.data)) {
-                        this.updateSelect(this.elements.regionSelect, defaultRegionsJson.data);
-                        if (savedRegion && defaultRegionsJson.data.includes(savedRegion)) {
-                            this.elements.regionSelect.value = savedRegion;
-                            this.current_region = savedRegion;
-                        }
-                    }
-                }
+            // The server answers from its region cache (or botocore's region list), so
+            // one request is enough; there is no second fallback call
+            const regions = await this.fetch_regions(profileToUse);
+            this.updateSelect(this.elements.regionSelect, regions);
+            
+            // Restore saved region if it exists and is valid
+            if (savedRegion && regions.includes(savedRegion)) {
+                this.elements.regionSelect.value = savedRegion;
+                this.current_region = savedRegion;
+                console.log('[Profile Loading] Restored region from backend:', savedRegion);
             }
         } catch (error) {
             console.error('[Profile Loading] Error loading regions:', error);
@@ -488,35 +481,27 @@ async load_profiles_and_regions() {
 
             try {
                 console.log(`[Profile] Selected: ${profile}`);
-                const res = await fetch(`/api/regions?profile=${encodeURIComponent(profile)}`);
-                if (!res.ok) throw new Error(`Failed to fetch regions for profile ${profile}`);
-                const data = await res.json();
-
-                if (data.ok) {
-                    const regionList = data.data;
-                    console.log(`[Regions] Enabled regions for ${profile}:`, regionList);
-                    this.updateSelect(this.elements.regionSelect, regionList);
-                    
-                    // Try to restore saved region from backend if it's valid for this profile
-                    try {
-                        const lastConnRes = await fetch('/api/last-connection');
-                        if (lastConnRes.ok) {
-                            const lastConn = await lastConnRes.json();
-                            const savedRegionForProfile = lastConn.region || '';
-                            if (savedRegionForProfile && regionList.includes(savedRegionForProfile)) {
-                                this.elements.regionSelect.value = savedRegionForProfile;
-                                this.current_region = savedRegionForProfile;
-                                console.log(`[Profile Change] Restored saved region from backend: ${savedRegionForProfile}`);
-                            }
+                const regionList = await this.fetch_regions(profile);
+                console.log(`[Regions] Enabled regions for ${profile}:`, regionList);
+                this.updateSelect(this.elements.regionSelect, regionList);
+                
+                // Try to restore saved region from backend if it's valid for this profile
+                try {
+                    const lastConnRes = await fetch('/api/last-connection');
+                    if (lastConnRes.ok) {
+                        const lastConn = await lastConnRes.json();
+                        const savedRegionForProfile = lastConn.region || '';
+                        if (savedRegionForProfile && regionList.includes(savedRegionForProfile)) {
+                            this.elements.regionSelect.value = savedRegionForProfile;
+                            this.current_region = savedRegionForProfile;
+                            console.log(`[Profile Change] Restored saved region from backend: ${savedRegionForProfile}`);
                         }
-                    } catch (e) {
-                        console.warn('[Profile Change] Failed to load last connection:', e);
                     }
-                    
-                    this.show_toast(`Regions updated for profile ${profile}`, 'info');
-                } else {
-                    throw new Error(data.error || 'Unknown error fetching regions');
+                } catch (e) {
+                    console.warn('[Profile Change] Failed to load last connection:', e);
                 }
+                
+                this.show_toast(`Regions updated for profile ${profile}`, 'info');
             } catch (err) {
                 console.error(`[Regions] Error for profile ${profile}:`, err);
                 this.show_error(`Could not load regions for profile ${profile}`);
@@ -530,6 +515,19 @@ async load_profiles_and_regions() {
 },
 
 
+    // Enabled regions of a profile, fetched once per profile and page load
+    async fetch_regions(profile) {
+        if (!this.regions_by_profile[profile]) {
+            const res = await fetch(`/api/regions?profile=${encodeURIComponent(profile)}`);
+            const data = await res.json();
+            if (!res.ok || !data.ok || !Array.isArray(data.data)) {
+                throw new Error(data.error || `Failed to fetch regions for profile ${profile}`);
+            }
+            this.regions_by_profile[profile] = data.data;
+        }
+        return this.regions_by_profile[profile];
+    },
+
     // Update select element with options
     updateSelect(select, options) {
         if (!select || !options) return;
@@ -598,6 +596,7 @@ async load_profiles_and_regions() {
             }
         } catch (error) {
             this.show_error('Connection error: ' + error.message);
+            await this.load_offline_instances(profile, region);
         } finally {
             this.hide_loading();
         }
@@ -633,9 +632,12 @@ async load_profiles_and_regions() {
         this.aws_account_id = null; // Clear account ID
         this.aws_account_alias = null; // Clear account alias
         this.instances = [];
+        this.instances_cursor = null;
+        this.instances_total = null;
         this.connections = [];
         
         this.update_aws_account_display();
+        this.update_load_more();
         this.elements.connectBtn.innerHTML = '<i class="bi bi-plug"></i> Connect';
         this.elements.connectBtn.classList.replace('btn-danger', 'btn-success');
         this.elements.instancesList.innerHTML = '';
@@ -674,18 +676,21 @@ async load_profiles_and_regions() {
             }
             if (emptyState) emptyState.classList.add('d-none');
             
-            // Build URL with optional filter
-            let url = '/api/instances';
-            if (filterState) {
-                url += `?filter_state=${encodeURIComponent(filterState)}`;
-            }
+            // First page of the name-sorted list, with optional filter
+            const params = new URLSearchParams({ sort: 'name', limit: this.instance_page_size });
+            if (filterState) params.set('filter_state', filterState);
             
-            const response = await fetch(url);
+            const response = await fetch(`/api/instances?${params}`);
             if (!response.ok) throw new Error('Failed to load instances');
             
             this.instances = await response.json();
+            this.instances_filter = filterState || null;
+            this.inventory_generation = response.headers.get('X-Inventory-Generation');
+            this.set_instance_page(response);
+            this.update_inventory_age(response);
             this.render_instances();
             this.update_counters();
+            this.update_state_facets();
         } catch (error) {
             this.show_error('Failed to load instances: ' + error.message);
             if (loadingState) loadingState.classList.add('d-none');
@@ -720,6 +725,7 @@ async load_profiles_and_regions() {
     create_instance_card(instance) {
         const card = document.createElement('div');
         card.className = `col-md-12 ${instance.has_ssm ? '' : 'non-ssm'}`;
+        card.dataset.instanceId = instance.id || '';
         
         const statusClass = instance.state === 'running' ? 'success' : 'danger';
         
@@ -869,7 +875,10 @@ async load_profiles_and_regions() {
     },
 
     update_counters() {
-        this.elements.instanceCount.textContent = `${this.instances.length} instances`;
+        const total = this.instances_total;
+        this.elements.instanceCount.textContent = total !== null && total > this.instances.length
+            ? `${this.instances.length} of ${total} instances`
+            : `${this.instances.length} instances`;
         this.elements.connectionCount.textContent = `${this.connections.length} active`;
     },
 
@@ -1427,7 +1436,9 @@ async load_profiles_and_regions() {
     };
 
 
-    app.refresh_data = async function() {
+    // force=true bypasses the server's instance cache (manual refresh);
+    // auto-refresh is served from the cached snapshot, which the server revalidates in the background
+    app.refresh_data = async function(force = false) {
         if (!this.is_connected) return;
 
         try {
@@ -1440,13 +1451,24 @@ async load_profiles_and_regions() {
             // (Optional) You can skip this call entirely if you don’t need to reload profiles each time
             // await this.loadProfilesAndRegions();
 
-            // Refresh instance list
-            const response = await fetch('/api/instances');
-            if (!response.ok) throw new Error('Failed to load instances');
-
-            this.instances = await response.json();
-            this.render_instances();
-            this.update_counters();
+            if (force) {
+                // A forced refresh streams instances from AWS as pages arrive
+                await this.stream_instances(this.instances_filter);
+            } else {
+                // Refresh instance list, keeping the state filter the list was loaded with
+                if (this.inventory_generation !== null) {
+                    // Only fetch what changed since the generation we already hold
+                    const params = new URLSearchParams({ since: this.inventory_generation });
+                    if (this.instances_filter) params.set('filter_state', this.instances_filter);
+                    const response = await fetch(`/api/instances?${params}`);
+                    if (!response.ok) throw new Error('Failed to load instances');
+                    await this.apply_instance_changes(await response.json());
+                } else {
+                    await this.reload_instances();
+                }
+                this.update_counters();
+                this.update_state_facets();
+            }
             this.show_success('Data refreshed successfully');
 
             // Restore selections
@@ -1481,15 +1503,25 @@ async load_profiles_and_regions() {
         }
     };
     
+    // Auto-refresh follows the server's inventory change events; the 30-second
+    // polling countdown is only used where EventSource isn't available
     app.start_auto_refresh = function() {
         console.log('Starting auto-refresh');
-        this.refresh_countdown = 30;
-        this.update_refresh_timer();
+        this.stop_inventory_events();
     
         // Clear any existing interval
         if (this.refresh_interval) {
             clearInterval(this.refresh_interval);
+            this.refresh_interval = null;
         }
+
+        if (typeof EventSource !== 'undefined') {
+            this.start_inventory_events();
+            return;
+        }
+
+        this.refresh_countdown = 30;
+        this.update_refresh_timer();
     
         // Set new interval for countdown and refresh
         this.refresh_interval = setInterval(() => {
@@ -1505,6 +1537,7 @@ async load_profiles_and_regions() {
     
     app.stop_auto_refresh = function() {
         console.log('Stopping auto-refresh');
+        this.stop_inventory_events();
         // Clear the interval
         if (this.refresh_interval) {
             clearInterval(this.refresh_interval);
@@ -1517,10 +1550,67 @@ async load_profiles_and_regions() {
         this.elements.autoRefreshSwitch.checked = false;
     };
 
+    // Subscribe to /api/events, resuming from the generation of the list we hold;
+    // the browser reconnects on its own and resumes with Last-Event-ID
+    app.start_inventory_events = function() {
+        const params = new URLSearchParams();
+        if (this.inventory_generation !== null) params.set('last_event_id', this.inventory_generation);
+        const query = params.toString();
+        this.event_source = new EventSource('/api/events' + (query ? `?${query}` : ''));
+        this.event_source.addEventListener('inventory', (message) => this.handle_inventory_event(JSON.parse(message.data)));
+        this.event_source.addEventListener('resync', () => this.refresh_data());
+        this.event_source.onopen = () => { this.elements.refreshTimer.textContent = '(live)'; };
+        this.event_source.onerror = () => { this.elements.refreshTimer.textContent = '(reconnecting)'; };
+    };
+
+    app.stop_inventory_events = function() {
+        if (this.event_source) {
+            this.event_source.close();
+            this.event_source = null;
+        }
+    };
+
+    // Apply a pushed inventory diff to the list when it follows the generation we hold;
+    // otherwise catch up with a ?since= delta fetch
+    app.handle_inventory_event = function(event) {
+        if (!this.is_connected || this.inventory_generation === null) return;
+        const held = Number(this.inventory_generation);
+        if (event.generation <= held) return;
+        if (event.resync || event.previous_generation !== held) {
+            this.refresh_data();
+            return;
+        }
+
+        // Removed IDs carry no state: past the loaded pages, only the server can tell
+        // whether they were in the filtered total, so fetch the narrowed delta instead
+        const loaded = new Set(this.instances.map(inst => inst.id));
+        if (this.instances_cursor && event.removed.some(id => !loaded.has(id))) {
+            this.refresh_data();
+            return;
+        }
+
+        // The event covers every instance; narrow it to the state filter of the list,
+        // using the state transitions to tell which changed instances entered or left it
+        const matches = (state) => !this.instances_filter || state === this.instances_filter;
+        const previous = new Map((event.state_changed || []).map(change => [change.id, change.from]));
+        const matched = (inst) => matches(previous.has(inst.id) ? previous.get(inst.id) : inst.state);
+        Promise.resolve(this.apply_instance_changes({
+            generation: event.generation,
+            added: event.added.filter(inst => matches(inst.state))
+                .concat(event.changed.filter(inst => matches(inst.state) && !matched(inst))),
+            removed: event.removed.filter(id => loaded.has(id))
+                .concat(event.changed.filter(inst => matched(inst) && !matches(inst.state)).map(inst => inst.id)),
+            changed: event.changed.filter(inst => matched(inst) && matches(inst.state)),
+        })).then(() => {
+            this.update_counters();
+            this.update_state_facets();
+        }).catch(() => this.refresh_data());
+    };
+
     app.setup_event_listeners = function() {
         console.log('Setting up event listeners...');
         this.elements.connectBtn.onclick = () => this.toggle_connection();
-        this.elements.refreshBtn.onclick = () => this.refresh_data();
+        this.elements.refreshBtn.onclick = () => this.refresh_data(true);
         
         // Modifica la gestione dell'evento autoRefreshSwitch
         this.elements.autoRefreshSwitch.onchange = (e) => {
@@ -1528,6 +1618,204 @@ async load_profiles_and_regions() {
         };
     };
     
+    // Apply a ?since= delta (narrowed to the list's state filter) to the loaded pages,
+    // touching only the affected cards. Edits and removals keep the keyset cursor valid;
+    // additions and renames can land anywhere in the sort order, so the pages are reloaded
+    app.apply_instance_changes = function(delta) {
+        this.inventory_generation = delta.generation;
+        // The resync list is the whole unpaged inventory; reload the pages instead
+        if (delta.resync) return this.reload_instances();
+
+        const loaded = new Map(this.instances.map(inst => [inst.id, inst]));
+        const renamed = (inst) => loaded.has(inst.id) && loaded.get(inst.id).name !== inst.name;
+        if (delta.added.length || delta.changed.some(renamed)) return this.reload_instances();
+
+        // Changes to instances past the loaded pages arrive with those pages
+        const changed = new Map(delta.changed.filter(inst => loaded.has(inst.id)).map(inst => [inst.id, inst]));
+        const removed = new Set(delta.removed);
+        if (removed.size && this.instances_total !== null) {
+            this.instances_total = Math.max(0, this.instances_total - removed.size);
+        }
+        if (!removed.size && !changed.size) return;
+
+        const list = this.elements.instancesList;
+        const cardFor = (id) => Array.from(list.children).find(el => el.dataset.instanceId === id);
+        this.instances = this.instances
+            .filter(inst => !removed.has(inst.id))
+            .map(inst => changed.get(inst.id) || inst);
+
+        removed.forEach(id => cardFor(id)?.remove());
+        changed.forEach(inst => {
+            const card = cardFor(inst.id);
+            if (card) card.replaceWith(this.create_instance_card(inst));
+        });
+        this.update_load_more();
+
+        const emptyState = document.getElementById('instancesEmptyState');
+        if (emptyState) emptyState.classList.toggle('d-none', this.instances.length > 0);
+    };
+
+    // Fetch instances live from AWS, showing each NDJSON page as it arrives; SSM
+    // status is patched in afterwards, then the sorted first page replaces the preview
+    app.stream_instances = async function(filterState) {
+        const params = new URLSearchParams({ refresh: 'force' });
+        if (filterState) params.set('filter_state', filterState);
+        const response = await fetch(`/api/instances/stream?${params}`);
+        if (!response.ok || !response.body) throw new Error('Failed to load instances');
+
+        const list = this.elements.instancesList;
+        const shown = new Map();
+        let received = 0;
+        list.innerHTML = '';
+        const handle = (record) => {
+            if (record.type === 'error') throw new Error(record.error);
+            if (record.type === 'page') {
+                record.instances.forEach(inst => {
+                    if (shown.size >= this.instance_page_size) return;
+                    const card = this.create_instance_card(inst);
+                    shown.set(inst.id, { inst, card });
+                    list.appendChild(card);
+                });
+                received += record.instances.length;
+                this.elements.instanceCount.textContent = `${received} instances (loading...)`;
+            } else if (record.type === 'ssm') {
+                record.managed.forEach(id => {
+                    const entry = shown.get(id);
+                    if (!entry) return;
+                    const card = this.create_instance_card({ ...entry.inst, has_ssm: true });
+                    entry.card.replaceWith(card);
+                    entry.card = card;
+                });
+            }
+        };
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+            const { done, value } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (line) handle(JSON.parse(line));
+            }
+            if (done) break;
+        }
+
+        // The stream stored a fresh snapshot; show its sorted, paged view
+        this.inventory_generation = null;
+        await this.load_instances(filterState);
+    };
+
+    // Show per-state instance counts in the state filter, from the server's precomputed facets
+    app.update_state_facets = async function() {
+        const select = document.getElementById('instanceStateFilter');
+        if (!select) return;
+        try {
+            const response = await fetch('/api/instances/facets');
+            if (!response.ok) return;
+            const { facets, total } = await response.json();
+            Array.from(select.options).forEach(option => {
+                option.dataset.label = option.dataset.label || option.textContent;
+                const count = option.value ? (facets.state[option.value] || 0) : total;
+                option.textContent = `${option.dataset.label} (${count})`;
+            });
+        } catch (error) {
+            console.warn('Could not load instance facets:', error);
+        }
+    };
+
+    // Fetch the name-sorted list again, as far as it was loaded, with a fresh cursor and total
+    app.reload_instances = async function() {
+        const limit = Math.min(Math.max(this.instances.length, this.instance_page_size), this.instance_max_page_size);
+        const params = new URLSearchParams({ sort: 'name', limit });
+        if (this.instances_filter) params.set('filter_state', this.instances_filter);
+        const response = await fetch(`/api/instances?${params}`);
+        if (!response.ok) throw new Error('Failed to load instances');
+
+        this.instances = await response.json();
+        this.inventory_generation = response.headers.get('X-Inventory-Generation');
+        this.set_instance_page(response);
+        this.update_inventory_age(response);
+        this.render_instances();
+    };
+
+    // Remember where the loaded page ends (X-Next-Cursor / X-Total-Count headers)
+    app.set_instance_page = function(response) {
+        this.instances_cursor = response.headers.get('X-Next-Cursor');
+        const total = response.headers.get('X-Total-Count');
+        this.instances_total = total !== null ? parseInt(total, 10) : null;
+        this.update_load_more();
+    };
+
+    // Show a "Load more" button below the list while pages remain
+    app.update_load_more = function() {
+        let button = document.getElementById('instancesLoadMore');
+        if (!button) {
+            button = document.createElement('button');
+            button.id = 'instancesLoadMore';
+            button.type = 'button';
+            button.className = 'btn btn-outline-secondary w-100 mt-3 d-none';
+            button.onclick = () => this.load_more_instances();
+            this.elements.instancesList.after(button);
+        }
+        const remaining = (this.instances_total || 0) - this.instances.length;
+        button.textContent = `Load more (${remaining} remaining)`;
+        button.classList.toggle('d-none', !this.instances_cursor);
+    };
+
+    app.load_more_instances = async function() {
+        if (!this.instances_cursor) return;
+        try {
+            const params = new URLSearchParams({ sort: 'name', limit: this.instance_page_size, cursor: this.instances_cursor });
+            if (this.instances_filter) params.set('filter_state', this.instances_filter);
+            const response = await fetch(`/api/instances?${params}`);
+            if (!response.ok) throw new Error('Failed to load instances');
+
+            // Skip instances already shown, e.g. if the list was reloaded meanwhile
+            const known = new Set(this.instances.map(inst => inst.id));
+            const page = (await response.json()).filter(inst => !known.has(inst.id));
+            this.instances = this.instances.concat(page);
+            page.forEach(inst => this.elements.instancesList.appendChild(this.create_instance_card(inst)));
+            this.set_instance_page(response);
+            this.update_counters();
+        } catch (error) {
+            this.show_error('Failed to load more instances: ' + error.message);
+        }
+    };
+
+    // Show how old the server's inventory snapshot is (X-Inventory-Age header)
+    app.update_inventory_age = function(response) {
+        const age = response.headers.get('X-Inventory-Age');
+        if (age === null || !this.elements.refreshTimer) return;
+        const refreshing = response.headers.get('X-Inventory-Refreshing') === 'true';
+        const offline = response.headers.get('X-Inventory-Offline') === 'true';
+        this.elements.refreshTimer.title = `Instance list updated ${Math.round(parseFloat(age))}s ago` +
+            (offline ? ' (AWS unreachable, showing last known inventory)' : '') +
+            (refreshing ? ' (refreshing in background)' : '');
+    };
+
+    // Show the last known inventory (read-only) when AWS can't be reached
+    app.load_offline_instances = async function(profile, region) {
+        try {
+            const params = new URLSearchParams({ profile, region, filter_state: 'running' });
+            const response = await fetch(`/api/instances/offline?${params}`);
+            if (!response.ok) return;
+            this.instances = await response.json();
+            this.instances_filter = 'running';
+            this.set_instance_page(response);
+            this.update_inventory_age(response);
+            this.render_instances();
+            this.update_counters();
+            const age = Math.round(parseFloat(response.headers.get('X-Inventory-Age') || '0') / 60);
+            this.show_toast(`Offline: showing the inventory stored ${age} min ago`, 'warning');
+        } catch (error) {
+            console.warn('No offline inventory available:', error);
+        }
+    };
+
     app.update_refresh_timer = function() {
         // Only show countdown if auto-refresh is active
         if (this.elements.autoRefreshSwitch.checked && this.refresh_countdown > 0) {
@@ -2194,7 +2482,13 @@ function setupInstanceFilter() {
     const filterInput = document.getElementById('instanceFilter');
     const stateFilterSelect = document.getElementById('instanceStateFilter');
     
-    // Setup state filter change handler
+    // render_instances calls this on every render; bind the handlers only once,
+    // otherwise each state change triggers one reload per previous render
+    const bindAnchor = stateFilterSelect || filterInput;
+    if (!bindAnchor || bindAnchor.dataset.filterBound) return;
+    bindAnchor.dataset.filterBound = 'true';
+    
+    // Setup state filter change handler (served from the server's cached snapshot)
     if (stateFilterSelect) {
         stateFilterSelect.addEventListener('change', async function() {
             const selectedState = this.value;
@@ -2204,12 +2498,36 @@ function setupInstanceFilter() {
     }
     if (!filterInput) return;
 
-    filterInput.addEventListener('input', app.debounce(() => {
+    filterInput.addEventListener('input', app.debounce(async () => {
         // Sanitize input to prevent XSS
         const rawQuery = filterInput.value.trim();
         const query = app.sanitize_string(rawQuery); // Uses default max length
         
+        // Filter queries (tag:env=prod type:m5.* ...) and partially loaded lists
+        // are answered by the server from the whole inventory
+        let searched = null;
+        const isFilterQuery = /\b(tag|type|state|ssm|os|name):/i.test(query);
+        if (query && (isFilterQuery || app.instances_cursor)) {
+            try {
+                let response;
+                if (isFilterQuery) {
+                    const q = app.instances_filter ? `${query} state:${app.instances_filter}` : query;
+                    response = await fetch(`/api/instances/query?${new URLSearchParams({ q, limit: 1000 })}`);
+                } else {
+                    const params = new URLSearchParams({ q: query });
+                    if (app.instances_filter) params.set('filter_state', app.instances_filter);
+                    response = await fetch(`/api/instances/search?${params}`);
+                }
+                if (response.ok) searched = await response.json();
+            } catch (err) {
+                console.warn('Instance search failed, filtering loaded instances:', err.message);
+            }
+            // A newer keystroke has replaced this query meanwhile
+            if (app.sanitize_string(filterInput.value.trim()) !== query) return;
+        }
+        
         let regex = null;
+        if (isFilterQuery && !searched) searched = [];
         try {
             // Only create regex if query is not empty and safe
             if (query && query.length > 0) {
@@ -2221,7 +2539,7 @@ function setupInstanceFilter() {
         }
 
         // Filter the actual data list
-        const filtered = !regex
+        const filtered = searched ? searched : !regex
             ? app.instances
             : app.instances.filter(inst => {
                 // Sanitize instance name before testing
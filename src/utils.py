@@ -1,6 +1,5 @@
 import os
 import subprocess
-import psutil
 import logging
 import time
 
@@ -8,6 +7,8 @@ logger = logging.getLogger(__name__)
 
 def kill_process_tree(pid):
     """Kill a process and all its children"""
+    import psutil
+    
     try:
         parent = psutil.Process(pid)
         children = parent.children(recursive=True)
@@ -91,6 +92,10 @@ def require_cmd(cmd: str, friendly: str):
 _HOST_RE = re.compile(r"^[A-Za-z0-9_.:-]+$")
 # EC2 instance ID format: i-[0-9a-f]{8,17} (8-17 hex digits after 'i-')
 _INSTANCE_ID_RE = re.compile(r"^i-[0-9a-f]{8,17}$", re.IGNORECASE)
+# AWS region format: us-east-1, ap-southeast-2, us-gov-west-1, ...
+_REGION_RE = re.compile(r"^[a-z]{2}(-[a-z]+)+-\d+$")
+# IAM role ARN format: arn:aws:iam::123456789012:role/path/name
+_ROLE_ARN_RE = re.compile(r"^arn:aws[a-z-]*:iam::\d{12}:role/[\w+=,.@/-]+$")
 # Connection ID format: UUID (8-4-4-4-12 hex digits)
 _CONNECTION_ID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
 
@@ -100,6 +105,18 @@ def validate_remote_host(host: str) -> bool:
         return False
     return bool(_HOST_RE.match(host))
 
+def validate_region(region: str) -> bool:
+    """Validate AWS region name format."""
+    if not region or not isinstance(region, str):
+        return False
+    return bool(_REGION_RE.match(region))
+
+def validate_role_arn(role_arn: str) -> bool:
+    """Validate IAM role ARN format."""
+    if not role_arn or not isinstance(role_arn, str):
+        return False
+    return bool(_ROLE_ARN_RE.match(role_arn))
+
 def validate_port(port: int) -> bool:
     """Validate port number is in valid range (1-65535)."""
     from .constants import MIN_PORT, MAX_PORT
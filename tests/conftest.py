@@ -13,6 +13,8 @@ def mock_preferences():
     prefs.ssh_key_folder = None
     prefs.last_profile = None
     prefs.last_region = None
+    # connect() would otherwise start background fetches against the mocks
+    prefs.prefetch = False
     return prefs
 
 
@@ -25,3 +27,11 @@ def mock_aws_manager():
     manager._region = None
     manager._account_id = None
     return manager
+
+
+@pytest.fixture(autouse=True)
+def isolated_inventory_store(tmp_path, monkeypatch):
+    """Keep tests from reading or writing the user's persisted inventory"""
+    db_path = tmp_path / "inventory.db"
+    monkeypatch.setattr("src.inventory_store.INVENTORY_DB_PATH", db_path)
+    return db_path
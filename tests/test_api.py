@@ -1,6 +1,7 @@
 """Tests for API endpoints in src/api.py"""
 import pytest
 import json
+import threading
 from unittest.mock import Mock, patch, MagicMock
 from flask import Flask
 from src.app import create_app
@@ -33,6 +34,47 @@ def mock_aws_manager():
         yield mock_manager
 
 
+class TestLazyManager:
+    """Tests for the deferred AWS manager singleton"""
+    
+    def test_built_on_first_use(self):
+        """Test the manager is built once, on the first attribute access"""
+        from src.api import _LazyManager
+        manager = MagicMock()
+        factory = Mock(return_value=manager)
+        lazy = _LazyManager(factory)
+        
+        factory.assert_not_called()
+        lazy.preferences = "prefs"
+        lazy.terminate_all()
+        
+        factory.assert_called_once()
+        assert manager.preferences == "prefs"
+        manager.terminate_all.assert_called_once()
+
+
+class TestStartupWarmUp:
+    """Tests for warming the last used context outside of tests"""
+    
+    def test_warm_up_waits_for_first_request(self, app):
+        """Test the last context is warmed once, on the first request rather than at startup"""
+        app.config['PREFETCH_ON_FIRST_REQUEST'] = True
+        started = []
+        warmed = threading.Event()
+        
+        def prefetch(manager):
+            started.append(manager)
+            warmed.set()
+        
+        with patch('src.app._prefetch_last_context', side_effect=prefetch):
+            assert not warmed.is_set()
+            app.test_client().get('/api/version')
+            assert warmed.wait(5)
+            app.test_client().get('/api/version')
+        
+        assert len(started) == 1
+
+
 class TestProfilesEndpoint:
     """Tests for /api/profiles endpoint"""
     
@@ -62,16 +104,7 @@ class TestRegionsEndpoint:
     
     def test_get_regions_success(self, client, mock_aws_manager):
         """Test getting AWS regions"""
-        mock_session = MagicMock()
-        mock_ec2 = MagicMock()
-        mock_ec2.describe_regions.return_value = {
-            "Regions": [
-                {"RegionName": "us-east-1"},
-                {"RegionName": "us-west-2"}
-            ]
-        }
-        mock_session.client.return_value = mock_ec2
-        mock_aws_manager.session.return_value = mock_session
+        mock_aws_manager.describe_regions.return_value = ["us-east-1", "us-west-2"]
         
         response = client.get('/api/regions?profile=default')
         
@@ -80,10 +113,11 @@ class TestRegionsEndpoint:
         assert data["ok"] is True
         assert "us-east-1" in data["data"]
         assert "us-west-2" in data["data"]
+        mock_aws_manager.describe_regions.assert_called_once_with(profile="default")
     
     def test_get_regions_error(self, client, mock_aws_manager):
         """Test error handling in get_regions"""
-        mock_aws_manager.session.side_effect = Exception("AWS error")
+        mock_aws_manager.describe_regions.side_effect = Exception("AWS error")
         
         response = client.get('/api/regions?profile=default')
         
@@ -170,6 +204,258 @@ class TestInstancesEndpoint:
         assert len(data) == 1
         assert data[0]["id"] == "i-123"
     
+    def test_get_instances_serializes_records(self, client, mock_aws_manager):
+        """Test instance records are converted to plain JSON objects"""
+        from src.inventory import InstanceList, InstanceRecord
+        mock_aws_manager.list_instances.return_value = InstanceList(
+            [InstanceRecord("i-123", name="web", state="running", tags={"env": "prod"})], {"age": 0.0}
+        )
+        
+        response = client.get('/api/instances')
+        
+        data = json.loads(response.data)
+        assert data[0]["id"] == "i-123"
+        assert data[0]["tags"] == {"env": "prod"}
+    
+    def test_get_instances_reports_snapshot_age(self, client, mock_aws_manager):
+        """Test snapshot freshness is reported in response headers"""
+        from src.inventory import InstanceList
+        mock_aws_manager.list_instances.return_value = InstanceList(
+            [{"id": "i-123"}], {"age": 42.0, "stale": True, "refreshing": True}
+        )
+        
+        response = client.get('/api/instances')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data) == [{"id": "i-123"}]
+        assert response.headers["X-Inventory-Age"] == "42.0"
+        assert response.headers["X-Inventory-Stale"] == "true"
+        assert response.headers["X-Inventory-Refreshing"] == "true"
+    
+    def test_get_instances_paged(self, client, mock_aws_manager):
+        """Test paged mode reports the total and next cursor in headers"""
+        from src.inventory import InstanceList
+        mock_aws_manager.page_instances.return_value = InstanceList(
+            [{"id": "i-123"}], {"age": 1.0, "generation": 3, "total": 40, "next_cursor": "abc"}
+        )
+        
+        response = client.get('/api/instances?sort=-launch_time&limit=1&filter_state=running')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data) == [{"id": "i-123"}]
+        assert response.headers["X-Total-Count"] == "40"
+        assert response.headers["X-Next-Cursor"] == "abc"
+        mock_aws_manager.page_instances.assert_called_once_with(
+            filter_state="running", refresh="swr", sort="-launch_time", limit=1, cursor=None
+        )
+        mock_aws_manager.list_instances.assert_not_called()
+    
+    @pytest.mark.parametrize("query", ["sort=cost", "limit=0", "limit=5000", "limit=ten"])
+    def test_get_instances_paged_invalid(self, client, mock_aws_manager, query):
+        """Test invalid paging parameters are rejected"""
+        response = client.get(f'/api/instances?{query}')
+        
+        assert response.status_code == 400
+        mock_aws_manager.page_instances.assert_not_called()
+    
+    def test_get_instances_paged_bad_cursor(self, client, mock_aws_manager):
+        """Test a rejected cursor is reported as a client error"""
+        mock_aws_manager.page_instances.side_effect = ValueError("Invalid cursor")
+        
+        response = client.get('/api/instances?cursor=zzz')
+        
+        assert response.status_code == 400
+    
+    def test_inventory_events(self, client, mock_aws_manager):
+        """Test inventory events are sent as Server-Sent Events, resuming from Last-Event-ID"""
+        mock_aws_manager.inventory_events.return_value = iter([
+            None,
+            {"id": 7, "event": "inventory", "data": {"generation": 7, "removed": ["i-123"]}},
+        ])
+        
+        response = client.get('/api/events', headers={"Last-Event-ID": "5"})
+        
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        body = response.data.decode()
+        assert ": keepalive\n\n" in body
+        assert 'id: 7\nevent: inventory\ndata: {"generation": 7, "removed": ["i-123"]}\n\n' in body
+        mock_aws_manager.inventory_events.assert_called_once_with(last_event_id=5)
+    
+    def test_inventory_events_invalid_id(self, client, mock_aws_manager):
+        """Test a non-numeric Last-Event-ID is rejected"""
+        response = client.get('/api/events?last_event_id=abc')
+        
+        assert response.status_code == 400
+    
+    def test_stream_instances(self, client, mock_aws_manager):
+        """Test the streaming listing is sent as NDJSON"""
+        from src.inventory import InstanceRecord
+        mock_aws_manager.iter_instance_stream.return_value = iter([
+            {"type": "page", "instances": [InstanceRecord("i-123", state="running")], "ssm_pending": True},
+            {"type": "ssm", "ok": True, "managed": ["i-123"]},
+            {"type": "done", "count": 1},
+        ])
+        
+        response = client.get('/api/instances/stream?filter_state=running')
+        
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert records[0]["instances"][0]["id"] == "i-123"
+        assert records[1]["managed"] == ["i-123"]
+        mock_aws_manager.iter_instance_stream.assert_called_once_with(filter_state="running", refresh="swr")
+    
+    def test_search_instances(self, client, mock_aws_manager):
+        """Test instance search returns ranked matches"""
+        from src.inventory import InstanceList
+        mock_aws_manager.search_instances.return_value = InstanceList([{"id": "i-123"}], {"age": 2.0, "generation": 5})
+        
+        response = client.get('/api/instances/search?q=payments&limit=10')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data) == [{"id": "i-123"}]
+        assert response.headers["X-Inventory-Generation"] == "5"
+        mock_aws_manager.search_instances.assert_called_once_with("payments", filter_state=None, limit=10, refresh="swr")
+    
+    @pytest.mark.parametrize("query", ["", "q=", "q=web&limit=0", "q=" + "x" * 201, "q=web&filter_state=gone"])
+    def test_search_instances_invalid(self, client, mock_aws_manager, query):
+        """Test invalid search parameters are rejected"""
+        response = client.get(f'/api/instances/search?{query}')
+        
+        assert response.status_code == 400
+        mock_aws_manager.search_instances.assert_not_called()
+    
+    def test_query_instances(self, client, mock_aws_manager):
+        """Test the filter query endpoint"""
+        from src.inventory import InstanceList
+        mock_aws_manager.query_instances.return_value = InstanceList([{"id": "i-123"}], {"age": 1.0, "total": 7})
+        
+        response = client.get('/api/instances/query?q=tag:env=prod+ssm:yes&limit=1')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data) == [{"id": "i-123"}]
+        assert response.headers["X-Total-Count"] == "7"
+        mock_aws_manager.query_instances.assert_called_once_with("tag:env=prod ssm:yes", limit=1, refresh="swr")
+    
+    def test_query_instances_invalid(self, client, mock_aws_manager):
+        """Test malformed queries are reported as client errors"""
+        mock_aws_manager.query_instances.side_effect = ValueError("Unknown query field: color")
+        
+        response = client.get('/api/instances/query?q=color:red')
+        
+        assert response.status_code == 400
+        assert "color" in json.loads(response.data)["error"]
+    
+    def test_get_instance_facets(self, client, mock_aws_manager):
+        mock_aws_manager.instance_facets.return_value = {"facets": {"state": {"running": 2}}, "total": 2}
+        
+        response = client.get('/api/instances/facets')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data)["facets"]["state"] == {"running": 2}
+    
+    def test_get_offline_instances(self, client, mock_aws_manager):
+        """Test the offline view returns the stored inventory flagged in headers"""
+        from src.inventory import InstanceList
+        mock_aws_manager.offline_instances.return_value = InstanceList(
+            [{"id": "i-123"}], {"age": 3600.0, "stale": True, "refreshing": False, "generation": 4, "offline": True}
+        )
+        
+        response = client.get('/api/instances/offline?profile=dev&region=us-east-1&filter_state=running')
+        
+        assert response.status_code == 200
+        assert json.loads(response.data) == [{"id": "i-123"}]
+        assert response.headers["X-Inventory-Offline"] == "true"
+        mock_aws_manager.offline_instances.assert_called_once_with("dev", "us-east-1", filter_state="running")
+    
+    def test_get_offline_instances_missing(self, client, mock_aws_manager):
+        """Test the offline view reports 404 when nothing is stored"""
+        mock_aws_manager.offline_instances.return_value = None
+        
+        response = client.get('/api/instances/offline?profile=dev&region=us-east-1')
+        
+        assert response.status_code == 404
+    
+    def test_get_instances_since(self, client, mock_aws_manager):
+        """Test delta mode returns only the changes"""
+        mock_aws_manager.instance_changes.return_value = {
+            "generation": 7, "since": 5, "resync": False,
+            "added": [{"id": "i-123"}], "removed": ["i-456"], "changed": []
+        }
+        
+        response = client.get('/api/instances?since=5&filter_state=running')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["generation"] == 7
+        assert data["removed"] == ["i-456"]
+        mock_aws_manager.instance_changes.assert_called_once_with(5, filter_state="running", refresh="swr")
+        mock_aws_manager.list_instances.assert_not_called()
+    
+    def test_get_instances_invalid_since(self, client, mock_aws_manager):
+        """Test non-integer since is rejected"""
+        response = client.get('/api/instances?since=latest')
+        
+        assert response.status_code == 400
+    
+    def test_get_instances_all_regions(self, client, mock_aws_manager):
+        """Test the multi-region sweep streams one NDJSON record per region"""
+        mock_aws_manager.iter_region_inventories.return_value = iter([
+            {"type": "region", "region": "us-east-1", "ok": True, "instances": [], "count": 0},
+            {"type": "region", "region": "eu-west-1", "ok": False, "error": "boom"},
+            {"type": "done", "regions": 2, "failed": 1},
+        ])
+        
+        response = client.get('/api/instances/regions?regions=us-east-1,eu-west-1')
+        
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert [r["type"] for r in records] == ["region", "region", "done"]
+        mock_aws_manager.iter_region_inventories.assert_called_once_with(
+            regions=["us-east-1", "eu-west-1"], filter_state=None, refresh="swr"
+        )
+    
+    def test_get_instances_all_regions_invalid_region(self, client, mock_aws_manager):
+        """Test malformed region names are rejected"""
+        response = client.get('/api/instances/regions?regions=us-east-1,not_a_region')
+        
+        assert response.status_code == 400
+    
+    def test_get_instances_all_accounts(self, client, mock_aws_manager):
+        """Test the multi-account inventory streams tagged records"""
+        mock_aws_manager.list_profiles.return_value = ["dev", "ops"]
+        mock_aws_manager.iter_account_inventories.return_value = iter([
+            {"type": "account", "profile": "dev", "account_id": "111111111111", "ok": True, "instances": []},
+            {"type": "done", "targets": 2, "failed": 0},
+        ])
+        targets = [{"profile": "dev"}, {"profile": "ops", "role_arn": "arn:aws:iam::222222222222:role/Viewer"}]
+        
+        response = client.post('/api/instances/accounts', json={"targets": targets, "regions": ["us-east-1"]})
+        
+        assert response.status_code == 200
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert records[0]["account_id"] == "111111111111"
+        mock_aws_manager.iter_account_inventories.assert_called_once_with(
+            targets, regions=["us-east-1"], filter_state=None, refresh="swr"
+        )
+    
+    def test_get_instances_all_accounts_unknown_profile(self, client, mock_aws_manager):
+        """Test unknown profiles are rejected"""
+        mock_aws_manager.list_profiles.return_value = ["dev"]
+        
+        response = client.post('/api/instances/accounts', json={"targets": [{"profile": "prod"}]})
+        
+        assert response.status_code == 400
+        mock_aws_manager.iter_account_inventories.assert_not_called()
+    
+    def test_get_instances_invalid_refresh(self, client, mock_aws_manager):
+        """Test invalid refresh mode is rejected"""
+        response = client.get('/api/instances?refresh=sometimes')
+        
+        assert response.status_code == 400
+    
     def test_get_instances_error(self, client, mock_aws_manager):
         """Test error handling in get_instances"""
         mock_aws_manager.list_instances.side_effect = Exception("AWS error")
@@ -179,6 +465,116 @@ class TestInstancesEndpoint:
         assert response.status_code == 500
 
 
+class TestInstanceDetailsBatchEndpoint:
+    """Tests for /api/instance-details (batch) endpoint"""
+    
+    def test_batch_details(self, client, mock_aws_manager):
+        """Test per-ID results and errors, with invalid IDs reported rather than rejected"""
+        mock_aws_manager.instance_details_batch.return_value = {
+            "instances": {"i-1234567890abcdef0": {"id": "i-1234567890abcdef0", "iam_role": "web"}},
+            "errors": {"i-0fedcba987654321f": "Instance i-0fedcba987654321f not found"},
+        }
+        
+        response = client.post('/api/instance-details', json={
+            "instance_ids": ["i-1234567890abcdef0", "i-0fedcba987654321f", "bogus"],
+        })
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["instances"]["i-1234567890abcdef0"]["iam_role"] == "web"
+        assert set(data["errors"]) == {"i-0fedcba987654321f", "bogus"}
+        mock_aws_manager.instance_details_batch.assert_called_once_with(
+            ["i-1234567890abcdef0", "i-0fedcba987654321f"], refresh=False
+        )
+    
+    @pytest.mark.parametrize("body", [{}, {"instance_ids": "i-1234567890abcdef0"}, {"instance_ids": ["i-1234567890abcdef0"] * 5001}])
+    def test_batch_details_invalid(self, client, mock_aws_manager, body):
+        """Test malformed requests are rejected"""
+        response = client.post('/api/instance-details', json=body)
+        
+        assert response.status_code == 400
+        mock_aws_manager.instance_details_batch.assert_not_called()
+
+
+class TestCacheEndpoint:
+    """Tests for /api/cache endpoint"""
+    
+    def test_get_cache_stats(self, client, mock_aws_manager):
+        """Test cache statistics are returned"""
+        mock_aws_manager.cache_stats.return_value = {"inventory": {"hits": 3, "misses": 1}}
+        
+        response = client.get('/api/cache')
+        
+        assert response.status_code == 200
+        assert response.get_json()["inventory"]["hits"] == 3
+    
+    def test_invalidate(self, client, mock_aws_manager):
+        """Test invalidating one profile/region"""
+        mock_aws_manager.list_profiles.return_value = ["dev"]
+        mock_aws_manager.invalidate_cache.return_value = {"inventory": 1}
+        
+        response = client.post('/api/cache', json={"action": "invalidate", "profile": "dev", "region": "us-east-1", "caches": ["inventory"]})
+        
+        assert response.status_code == 200
+        assert response.get_json()["invalidated"] == {"inventory": 1}
+        mock_aws_manager.invalidate_cache.assert_called_once_with(profile="dev", region="us-east-1", caches=["inventory"])
+    
+    def test_warm(self, client, mock_aws_manager):
+        """Test warming a profile/region"""
+        mock_aws_manager.list_profiles.return_value = ["dev"]
+        mock_aws_manager.warm_cache.return_value = {"profile": "dev", "region": "us-east-1", "refreshing": True}
+        
+        response = client.post('/api/cache', json={"action": "warm", "profile": "dev", "region": "us-east-1"})
+        
+        assert response.status_code == 202
+        mock_aws_manager.warm_cache.assert_called_once_with("dev", "us-east-1")
+    
+    @pytest.mark.parametrize("body", [
+        {"action": "drop"},
+        {"action": "warm", "profile": "dev"},
+        {"action": "invalidate", "region": "us-east-1"},
+        {"action": "invalidate", "profile": "unknown"},
+        {"action": "invalidate", "caches": ["bogus"]},
+    ])
+    def test_invalid_requests(self, client, mock_aws_manager, body):
+        """Test malformed cache control requests are rejected"""
+        mock_aws_manager.list_profiles.return_value = ["dev"]
+        
+        response = client.post('/api/cache', json=body)
+        
+        assert response.status_code == 400
+        mock_aws_manager.invalidate_cache.assert_not_called()
+        mock_aws_manager.warm_cache.assert_not_called()
+
+
+class TestPrefetchEndpoint:
+    """Tests for /api/prefetch endpoint"""
+    
+    def test_get_prefetch_status(self, client, mock_aws_manager):
+        """Test prefetch progress is returned"""
+        mock_aws_manager.prefetch_status.return_value = [
+            {"profile": "dev", "region": "us-east-1", "state": "running", "tasks": {"inventory": "running"}}
+        ]
+        
+        response = client.get('/api/prefetch')
+        
+        assert response.status_code == 200
+        assert response.get_json()[0]["tasks"]["inventory"] == "running"
+
+
+class TestSchedulerEndpoint:
+    """Tests for /api/scheduler endpoint"""
+    
+    def test_get_scheduler_stats(self, client, mock_aws_manager):
+        """Test AWS call and throttle counters are returned"""
+        mock_aws_manager.scheduler_stats.return_value = {"calls": 12, "throttled": 1, "interactive_waiting": 0, "buckets": []}
+        
+        response = client.get('/api/scheduler')
+        
+        assert response.status_code == 200
+        assert response.get_json()["throttled"] == 1
+
+
 class TestSSHEndpoint:
     """Tests for /api/ssh/<instance_id> endpoint"""
     
@@ -3,9 +3,14 @@ import pytest
 import os
 import socket
 import uuid
+import time
+import threading
 from unittest.mock import Mock, patch, MagicMock, mock_open
 from botocore.exceptions import ClientError
-from src.aws_manager import AWSManager, Connection, _is_port_free, _in_range_free_port
+from src.aws_manager import AWSManager, Connection, _ClientRegistry, _SessionRegistry, _SingleFlight, _is_port_free
+from src.inventory import InventorySnapshot, InstanceRecord
+from src.aws_scheduler import AWSCallScheduler
+from src.port_allocator import PortAllocator
 from src.preferences_handler import Preferences
 
 
@@ -40,21 +45,219 @@ class TestPortHelpers:
         except (PermissionError, OSError):
             # Skip socket binding test in restricted environments
             pytest.skip("Cannot bind sockets in this environment")
+
+
+def make_inventory_session(instances, managed_ids=()):
+    """Build a mock boto3 session whose EC2/SSM paginators return the given data"""
+    mock_session = MagicMock()
+    mock_ec2 = MagicMock()
+    mock_ec2.get_paginator.return_value.paginate.return_value = [
+        {"Reservations": [{"Instances": instances}]}
+    ]
+    mock_ssm = MagicMock()
+    mock_ssm.get_paginator.return_value.paginate.return_value = [
+        {"InstanceInformationList": [{"InstanceId": iid} for iid in managed_ids]}
+    ]
+    mock_session.client.side_effect = lambda service, **kwargs: {"ec2": mock_ec2, "ssm": mock_ssm}[service]
+    return mock_session, mock_ec2
+
+
+def make_raw_instance(iid, state="running", name=None, **extra):
+    """Build a DescribeInstances instance payload"""
+    instance = {
+        "InstanceId": iid,
+        "InstanceType": "t3.micro",
+        "State": {"Name": state},
+        "PlatformDetails": "Linux/UNIX",
+        "Tags": [{"Key": "Name", "Value": name or iid}],
+    }
+    instance.update(extra)
+    return instance
+
+
+class TestClientRegistry:
+    """Tests for the pooled boto3 client registry"""
     
-    def test_in_range_free_port(self):
-        """Test finding a free port in a range"""
-        # Use a wide range to ensure we find a free port
-        port = _in_range_free_port(50000, 50100)
-        assert 50000 <= port <= 50100
-        assert _is_port_free(port) is True
+    def test_reuses_client_per_key(self):
+        """Test that a client is built once per (profile, region, service, config)"""
+        factory = MagicMock(side_effect=lambda *args: object())
+        registry = _ClientRegistry(factory)
+        
+        first = registry.get("dev", "us-east-1", "ec2")
+        second = registry.get("dev", "us-east-1", "ec2")
+        other = registry.get("dev", "us-east-1", "ssm")
+        
+        assert first is second
+        assert other is not first
+        assert factory.call_count == 2
     
-    def test_in_range_free_port_no_available(self):
-        """Test error when no ports are available"""
-        # This test might be flaky, but we can test the error case
-        # by mocking _is_port_free to always return False
-        with patch('src.aws_manager._is_port_free', return_value=False):
-            with pytest.raises(RuntimeError, match="No free port available"):
-                _in_range_free_port(50000, 50001)
+    def test_evicts_least_recently_used(self):
+        """Test that the registry stays bounded"""
+        factory = MagicMock(side_effect=lambda *args: object())
+        registry = _ClientRegistry(factory, max_size=2)
+        
+        a = registry.get("dev", "us-east-1", "ec2")
+        registry.get("dev", "us-west-2", "ec2")
+        registry.get("dev", "us-east-1", "ec2")  # refresh a
+        registry.get("dev", "eu-west-1", "ec2")  # evicts us-west-2
+        
+        assert len(registry) == 2
+        assert registry.get("dev", "us-east-1", "ec2") is a
+        assert factory.call_count == 3
+    
+    def test_concurrent_get_builds_once(self):
+        """Test that concurrent callers share a single client build"""
+        import threading
+        import time
+        
+        def slow_factory(*args):
+            time.sleep(0.05)
+            return object()
+        
+        factory = MagicMock(side_effect=slow_factory)
+        registry = _ClientRegistry(factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("dev", "us-east-1", "ec2"))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert factory.call_count == 1
+        assert all(r is results[0] for r in results)
+
+    def test_failed_build_releases_lock(self):
+        """Test a factory error doesn't leave the key's build lock behind"""
+        factory = MagicMock(side_effect=[RuntimeError("expired SSO token"), object()])
+        registry = _ClientRegistry(factory)
+
+        with pytest.raises(RuntimeError):
+            registry.get("dev", "us-east-1", "ec2")
+        assert registry._build_locks == {}
+
+        assert registry.get("dev", "us-east-1", "ec2") is not None
+        assert factory.call_count == 2
+
+
+class TestSessionRegistry:
+    """Tests for the shared botocore sessions"""
+    
+    def test_reuses_session_per_fingerprint(self):
+        """Test a session is built once per name and rebuilt when its fingerprint changes"""
+        import botocore.session
+        build = MagicMock(side_effect=lambda: botocore.session.Session())
+        registry = _SessionRegistry()
+        
+        first = registry.get("dev", ("v1",), build)
+        assert registry.get("dev", ("v1",), build) is first
+        rotated = registry.get("dev", ("v2",), build)
+        
+        assert rotated is not first
+        assert build.call_count == 2
+        assert len(registry) == 1
+        assert registry.stats.snapshot()["expired"] == 1
+    
+    def test_sessions_share_loader(self):
+        """Test every session uses the same service model loader"""
+        import botocore.session
+        registry = _SessionRegistry()
+        
+        dev = registry.get("dev", (), botocore.session.Session)
+        prod = registry.get("prod", (), botocore.session.Session)
+        
+        assert dev.core.get_component("data_loader") is prod.core.get_component("data_loader")
+        assert registry.invalidate("dev") == 1
+        assert len(registry) == 1
+
+
+class TestSingleFlight:
+    """Tests for request coalescing"""
+    
+    def run_concurrently(self, count, target):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+    
+    def test_concurrent_calls_share_one_result(self):
+        """Test callers arriving while a call is in flight share its result"""
+        flight = _SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+        
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return "inventory"
+        
+        threads = self.run_concurrently(5, lambda: results.append(flight.do(("k",), fetch)))
+        while flight.coalesced < 4:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        assert calls == [1]
+        assert results == ["inventory"] * 5
+        assert not flight.in_flight(("k",))
+        # Finished calls aren't reused
+        assert flight.do(("k",), lambda: "fresh") == "fresh"
+    
+    def test_errors_are_shared(self):
+        """Test waiters get the exception of the call they joined"""
+        flight = _SingleFlight()
+        release = threading.Event()
+        errors = []
+        
+        def fetch():
+            release.wait(5)
+            raise RuntimeError("Throttled")
+        
+        def call():
+            try:
+                flight.do(("k",), fetch)
+            except RuntimeError as e:
+                errors.append(str(e))
+        
+        threads = self.run_concurrently(3, call)
+        while flight.coalesced < 2:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        assert errors == ["Throttled"] * 3
+
+    def test_interactive_waiter_promotes_background_call(self):
+        """Test a request joining a background call raises the call to interactive priority"""
+        scheduler = AWSCallScheduler()
+        flight = _SingleFlight(scheduler)
+        release = threading.Event()
+        priorities = []
+        
+        def fetch():
+            release.wait(5)
+            priorities.append(scheduler.is_background())
+            return "inventory"
+        
+        def refresh():
+            with scheduler.background():
+                flight.do(("k",), fetch)
+        
+        leader = threading.Thread(target=refresh)
+        leader.start()
+        while not flight.in_flight(("k",)):
+            time.sleep(0.005)
+        follower = threading.Thread(target=lambda: flight.do(("k",), fetch))
+        follower.start()
+        while flight.coalesced < 1:
+            time.sleep(0.005)
+        release.set()
+        for thread in (leader, follower):
+            thread.join(5)
+        
+        assert priorities == [False]
 
 
 class TestAWSManager:
@@ -67,13 +270,17 @@ class TestAWSManager:
         prefs.port_range_start = 60000
         prefs.port_range_end = 60100
         prefs.ssh_key_folder = None
+        # connect() would otherwise start background fetches against the mocks
+        prefs.prefetch = False
         return prefs
     
     @pytest.fixture
     def aws_manager(self, mock_preferences):
         """Create AWSManager instance"""
         with patch('src.aws_manager.AWSManager._cleanup_orphaned_processes'):
-            return AWSManager(mock_preferences)
+            manager = AWSManager(mock_preferences)
+        yield manager
+        manager.stop_background_refresh()
     
     def test_init(self, mock_preferences):
         """Test AWSManager initialization"""
@@ -108,6 +315,63 @@ class TestAWSManager:
         assert aws_manager._profile == "test-profile"
         assert aws_manager._region == "us-east-1"
     
+    def test_connect_reuses_cached_identity(self, aws_manager, monkeypatch):
+        """Test reconnecting to a known profile skips STS/IAM until its credentials change"""
+        mock_session = MagicMock()
+        mock_sts = MagicMock()
+        mock_sts.get_caller_identity.return_value = {"Account": "123456789012"}
+        mock_iam = MagicMock()
+        mock_iam.list_account_aliases.return_value = {"AccountAliases": ["test-alias"]}
+        mock_session.client.side_effect = lambda service, **kwargs: {"sts": mock_sts, "iam": mock_iam}[service]
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            aws_manager.connect("test-profile", "us-east-1")
+            again = aws_manager.connect("test-profile", "eu-west-1")
+            assert mock_sts.get_caller_identity.call_count == 1
+            
+            monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAROTATED")
+            aws_manager.connect("test-profile", "eu-west-1")
+            assert mock_sts.get_caller_identity.call_count == 2
+        
+        assert again == {"account_id": "123456789012", "account_alias": "test-alias"}
+        assert aws_manager._account_id == "123456789012"
+    
+    def test_connect_does_not_wait_for_slow_alias(self, aws_manager):
+        """Test connect returns once STS answers, and the alias is cached when it arrives"""
+        release = threading.Event()
+        mock_session = MagicMock()
+        mock_sts = MagicMock()
+        mock_sts.get_caller_identity.return_value = {"Account": "123456789012"}
+        mock_iam = MagicMock()
+        mock_iam.list_account_aliases.side_effect = lambda: release.wait(5) and {"AccountAliases": ["late-alias"]}
+        mock_session.client.side_effect = lambda service, **kwargs: {"sts": mock_sts, "iam": mock_iam}[service]
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch('src.aws_manager.IDENTITY_ALIAS_GRACE', 0.01):
+            account_info = aws_manager.connect("test-profile", "us-east-1")
+            assert account_info == {"account_id": "123456789012", "account_alias": None}
+            
+            release.set()
+            deadline = time.time() + 5
+            while aws_manager._identity_cache["test-profile"][2]["account_alias"] is None and time.time() < deadline:
+                time.sleep(0.005)
+            assert aws_manager.connect("test-profile", "us-east-1")["account_alias"] == "late-alias"
+        
+        assert mock_sts.get_caller_identity.call_count == 1
+    
+    def test_client_is_pooled(self, aws_manager):
+        """Test that manager clients are reused across calls"""
+        mock_session = MagicMock()
+        mock_session.client.side_effect = lambda service, **kwargs: MagicMock()
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            ec2 = aws_manager.client("ec2", profile="dev", region="us-east-1")
+            assert aws_manager.client("ec2", profile="dev", region="us-east-1") is ec2
+        
+        assert mock_session.client.call_count == 1
+        config = mock_session.client.call_args[1]["config"]
+        assert config.max_pool_connections == aws_manager.preferences.max_pool_connections
+    
     def test_connect_no_alias(self, aws_manager):
         """Test connecting to AWS when account alias is not available"""
         mock_session = MagicMock()
@@ -207,6 +471,908 @@ class TestAWSManager:
         assert instances[0]["type"] == "t2.micro"
         assert instances[0]["state"] == "running"
     
+    def test_list_instances_serves_stale_snapshot(self, aws_manager):
+        """Test stale-while-revalidate returns the cached snapshot and refreshes in background"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, mock_ec2 = make_inventory_session([make_raw_instance("i-0000000000000001")])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            aws_manager.list_instances()
+            # Age the snapshot past the active refresh interval
+            aws_manager._instance_cache[("test-profile", "us-east-1")].fetched_at -= 60
+            
+            with patch.object(aws_manager, '_revalidate_async', return_value=True) as mock_revalidate:
+                instances = aws_manager.list_instances()
+        
+        assert [i["id"] for i in instances] == ["i-0000000000000001"]
+        assert instances.meta["stale"] is True
+        assert instances.meta["refreshing"] is True
+        assert instances.meta["age"] >= 60
+        mock_revalidate.assert_called_once_with(("test-profile", "us-east-1"))
+        assert mock_ec2.get_paginator.return_value.paginate.call_count == 1
+    
+    def test_list_instances_force_refetches(self, aws_manager):
+        """Test refresh='force' bypasses a fresh snapshot"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, mock_ec2 = make_inventory_session([make_raw_instance("i-0000000000000001")])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            aws_manager.list_instances()
+            aws_manager.list_instances()
+            aws_manager.list_instances(refresh="force")
+        
+        assert mock_ec2.get_paginator.return_value.paginate.call_count == 2
+    
+    def test_filtered_list_served_from_snapshot(self, aws_manager):
+        """Test state-filtered listings reuse the unfiltered snapshot"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, mock_ec2 = make_inventory_session([
+            make_raw_instance("i-0000000000000001", state="running"),
+            make_raw_instance("i-0000000000000002", state="stopped"),
+        ])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            aws_manager.list_instances()
+            running = aws_manager.list_instances(filter_state="running")
+            stopped = aws_manager.list_instances(filter_state="stopped")
+            pending = aws_manager.list_instances(filter_state="pending")
+        
+        assert [i["id"] for i in running] == ["i-0000000000000001"]
+        assert [i["id"] for i in stopped] == ["i-0000000000000002"]
+        assert pending == []
+        assert mock_ec2.get_paginator.return_value.paginate.call_count == 1
+    
+    def test_filtered_list_fetches_full_snapshot(self, aws_manager):
+        """Test a filtered listing without a snapshot fetches the full inventory once and slices it"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, mock_ec2 = make_inventory_session([
+            make_raw_instance("i-0000000000000001", state="running"),
+            make_raw_instance("i-0000000000000002", state="stopped"),
+        ])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            running = aws_manager.list_instances(filter_state="running")
+            stopped = aws_manager.list_instances(filter_state="stopped")
+        
+        assert [i["id"] for i in running] == ["i-0000000000000001"]
+        assert [i["id"] for i in stopped] == ["i-0000000000000002"]
+        # No Filters pushdown: the one unfiltered fetch serves every state
+        mock_ec2.get_paginator.return_value.paginate.assert_called_once_with()
+    
+    def test_instance_changes(self, aws_manager):
+        """Test ?since= deltas between snapshot generations"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        first, _ = make_inventory_session([
+            make_raw_instance("i-0000000000000001"),
+            make_raw_instance("i-0000000000000002"),
+        ])
+        second, _ = make_inventory_session([
+            make_raw_instance("i-0000000000000001", state="stopped"),
+            make_raw_instance("i-0000000000000003"),
+        ])
+        
+        with patch.object(aws_manager, '_ensure_refresher'):
+            with patch.object(aws_manager, 'session', return_value=first):
+                generation = aws_manager.list_instances().meta["generation"]
+            aws_manager.reset_clients()
+            with patch.object(aws_manager, 'session', return_value=second):
+                aws_manager.list_instances(refresh="force")
+            
+            delta = aws_manager.instance_changes(generation)
+            unchanged = aws_manager.instance_changes(delta["generation"])
+            too_old = aws_manager.instance_changes(generation - 100)
+        
+        assert delta["generation"] > generation
+        assert delta["resync"] is False
+        assert [i["id"] for i in delta["added"]] == ["i-0000000000000003"]
+        assert delta["removed"] == ["i-0000000000000002"]
+        assert [i["id"] for i in delta["changed"]] == ["i-0000000000000001"]
+        assert unchanged["added"] == unchanged["removed"] == unchanged["changed"] == []
+        assert too_old["resync"] is True
+        assert len(too_old["instances"]) == 2
+    
+    def test_unchanged_refresh_keeps_generation(self, aws_manager):
+        """Test a refresh with identical results does not bump the generation"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, _ = make_inventory_session([make_raw_instance("i-0000000000000001")])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            first = aws_manager.list_instances().meta["generation"]
+            second = aws_manager.list_instances(refresh="force").meta["generation"]
+        
+        assert first == second
+    
+    def test_page_instances(self, aws_manager):
+        """Test sorted pages carry the total and the next cursor"""
+        from datetime import datetime, timezone
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, _ = make_inventory_session([
+            make_raw_instance("i-0000000000000001", name="web", LaunchTime=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            make_raw_instance("i-0000000000000002", name="api", LaunchTime=datetime(2024, 2, 1, tzinfo=timezone.utc)),
+            make_raw_instance("i-0000000000000003", name="db", LaunchTime=datetime(2023, 6, 1, tzinfo=timezone.utc)),
+        ])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            first = aws_manager.page_instances(sort="-launch_time", limit=2)
+            rest = aws_manager.page_instances(sort="-launch_time", limit=2, cursor=first.meta["next_cursor"])
+        
+        assert [i["name"] for i in first] == ["api", "web"]
+        assert first[0]["launch_time"] == "2024-02-01T00:00:00+00:00"
+        assert first.meta["total"] == 3
+        assert [i["name"] for i in rest] == ["db"]
+        assert rest.meta["next_cursor"] is None
+    
+    def test_page_instances_invalid_sort(self, aws_manager):
+        with pytest.raises(ValueError, match="Invalid sort key"):
+            aws_manager.page_instances(sort="cost")
+    
+    def test_search_instances(self, aws_manager):
+        """Test search reads name, IP and tags, and follows refreshes incrementally"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        first, _ = make_inventory_session([
+            make_raw_instance("i-0000000000000001", name="payments-api-blue-3", PrivateIpAddress="10.0.1.5"),
+            make_raw_instance("i-0000000000000002", name="payments-worker", state="stopped",
+                              Tags=[{"Key": "Name", "Value": "payments-worker"}, {"Key": "Team", "Value": "ledger"}]),
+        ])
+        second, _ = make_inventory_session([
+            make_raw_instance("i-0000000000000001", name="payments-api-blue-3", PrivateIpAddress="10.0.1.5"),
+            make_raw_instance("i-0000000000000003", name="payments-api-green-1"),
+        ])
+        
+        with patch.object(aws_manager, '_ensure_refresher'):
+            with patch.object(aws_manager, 'session', return_value=first):
+                by_name = aws_manager.search_instances("payments")
+                by_ip = aws_manager.search_instances("10.0.1.5")
+                by_tag = aws_manager.search_instances("ledger")
+                running = aws_manager.search_instances("payments", filter_state="running")
+            index = aws_manager._search_indexes[("test-profile", "us-east-1")][1]
+            aws_manager.reset_clients()
+            with patch.object(aws_manager, 'session', return_value=second):
+                aws_manager.list_instances(refresh="force")
+                after = aws_manager.search_instances("payments-api")
+        
+        assert [i["id"] for i in by_name] == ["i-0000000000000002", "i-0000000000000001"]
+        assert [i["id"] for i in by_ip] == ["i-0000000000000001"]
+        assert [i["id"] for i in by_tag] == ["i-0000000000000002"]
+        assert [i["id"] for i in running] == ["i-0000000000000001"]
+        assert [i["id"] for i in after] == ["i-0000000000000003", "i-0000000000000001"]
+        # The refresh updated the existing index rather than replacing it
+        assert aws_manager._search_indexes[("test-profile", "us-east-1")][1] is index
+    
+    def test_search_index_keeps_newer_generation(self, aws_manager):
+        """Test a slow build for an old snapshot doesn't replace a newer search index"""
+        key = ("test-profile", "us-east-1")
+        old = InventorySnapshot("test-profile", "us-east-1", [{"id": "i-1", "name": "web"}], generation=1)
+        new = InventorySnapshot("test-profile", "us-east-1", [{"id": "i-2", "name": "api"}], generation=2)
+        newer_index = aws_manager._search_index(new)
+
+        stale_index = aws_manager._search_index(old)
+
+        assert stale_index is not newer_index
+        assert aws_manager._search_indexes[key] == (2, newer_index)
+        assert aws_manager._search_index(new) is newer_index
+
+    def test_query_instances_and_facets(self, aws_manager):
+        """Test all tags are kept and queryable, with facets precomputed at refresh"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, _ = make_inventory_session([
+            make_raw_instance("i-0000000000000001", InstanceType="m5.large",
+                              Tags=[{"Key": "Name", "Value": "web"}, {"Key": "env", "Value": "prod"}]),
+            make_raw_instance("i-0000000000000002", state="stopped",
+                              Tags=[{"Key": "Name", "Value": "db"}, {"Key": "env", "Value": "prod"}]),
+            make_raw_instance("i-0000000000000003", Tags=[{"Key": "env", "Value": "dev"}]),
+        ], managed_ids=["i-0000000000000001"])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            aws_manager.list_instances()
+            snapshot = aws_manager._instance_cache[("test-profile", "us-east-1")]
+            assert snapshot._attributes is not None
+            matches = aws_manager.query_instances("tag:env=prod type:m5.* ssm:yes")
+            prod = aws_manager.query_instances("tag:env=prod", limit=1)
+            facets = aws_manager.instance_facets()
+        
+        assert [i["id"] for i in matches] == ["i-0000000000000001"]
+        assert [i["name"] for i in prod] == ["db"]
+        assert prod.meta["total"] == 2
+        assert facets["total"] == 3
+        assert facets["facets"]["tags"]["env"] == {"prod": 2, "dev": 1}
+        assert facets["facets"]["state"] == {"running": 2, "stopped": 1}
+        # Tag strings repeated across instances are shared
+        assert snapshot.by_id["i-0000000000000001"]["tags"]["env"] is snapshot.by_id["i-0000000000000002"]["tags"]["env"]
+    
+    def test_inventory_events(self, aws_manager):
+        """Test refreshes that change the active snapshot are followed as events"""
+        from src.inventory import InstanceRecord
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        web = InstanceRecord("i-1", name="web", state="running", has_ssm=True)
+        
+        with patch.object(aws_manager, '_ensure_refresher'):
+            first = aws_manager._install_snapshot("test-profile", "us-east-1", [web])
+            events = aws_manager.inventory_events(last_event_id=first.generation, keepalive=0.01)
+            # Nothing new yet: keepalive
+            assert next(events) is None
+            
+            # Unchanged refreshes and other regions publish nothing for this subscriber
+            aws_manager._install_snapshot("test-profile", "us-east-1", [web])
+            aws_manager._install_snapshot("test-profile", "eu-west-1", [web])
+            second = aws_manager._install_snapshot("test-profile", "us-east-1", [
+                InstanceRecord("i-1", name="web", state="stopped", has_ssm=False),
+                InstanceRecord("i-2", name="db", state="running"),
+            ])
+            event = next(events)
+        
+        assert event["id"] == second.generation
+        assert event["event"] == "inventory"
+        data = event["data"]
+        assert data["previous_generation"] == first.generation
+        assert [inst["id"] for inst in data["added"]] == ["i-2"]
+        assert [inst["id"] for inst in data["changed"]] == ["i-1"]
+        assert data["state_changed"] == [{"id": "i-1", "from": "running", "to": "stopped"}]
+        assert data["ssm_changed"] == [{"id": "i-1", "has_ssm": False}]
+    
+    def test_inventory_events_resync(self, aws_manager):
+        """Test resuming from an unknown event ID asks the client to resync"""
+        with patch.object(aws_manager, '_ensure_refresher'):
+            events = aws_manager.inventory_events(last_event_id=12345, keepalive=0.01)
+            event = next(events)
+        
+        assert event["event"] == "resync"
+        assert event["id"] == aws_manager._events.latest_id
+    
+    def test_concurrent_refreshes_coalesce(self, aws_manager):
+        """Test concurrent forced listings of one region share a single fetch"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        release = threading.Event()
+        
+        def fetch(profile, region, filter_state=None):
+            release.wait(5)
+            return [InstanceRecord("i-1", state="running")]
+        
+        results = []
+        with patch.object(aws_manager, '_fetch_instances', side_effect=fetch) as mock_fetch:
+            threads = [threading.Thread(target=lambda: results.append(aws_manager.list_instances(refresh="force"))) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            while aws_manager._inflight.coalesced < 3:
+                time.sleep(0.005)
+            # A filtered listing arriving meanwhile joins the full fetch too
+            threads.append(threading.Thread(target=lambda: results.append(aws_manager.list_instances(filter_state="stopped", refresh="blocking"))))
+            threads[-1].start()
+            while aws_manager._inflight.coalesced < 4:
+                time.sleep(0.005)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        
+        assert mock_fetch.call_count == 1
+        assert sorted(len(r) for r in results) == [0, 1, 1, 1, 1]
+    
+    def test_cache_stats(self, aws_manager):
+        """Test cache counters, entry counts, sizes and ages are reported"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, _ = make_inventory_session([make_raw_instance("i-0000000000000001", KeyName="k")])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            aws_manager.list_instances()  # miss
+            aws_manager.list_instances()  # hit
+            aws_manager.instance_details("i-0000000000000001")  # filled by the listing
+            stats = aws_manager.cache_stats()
+        
+        inventory = stats["inventory"]
+        assert (inventory["misses"], inventory["hits"]) == (1, 1)
+        assert inventory["entries"] == 1
+        assert inventory["instances"] == 1
+        assert inventory["bytes"] > 0
+        assert inventory["keys"][0]["region"] == "us-east-1"
+        assert inventory["age"]["max"] is not None
+        assert stats["details"]["hits"] == 1
+        assert stats["details"]["entries"] == 1
+        assert stats["clients"]["entries"] == 2
+    
+    def test_invalidate_cache(self, aws_manager):
+        """Test invalidation drops a key's snapshot with its index, history, error and stored copy"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        for region in ("us-east-1", "eu-west-1"):
+            aws_manager._install_snapshot("test-profile", region, [InstanceRecord("i-1", name="web")])
+        key = ("test-profile", "us-east-1")
+        aws_manager.search_instances("web")
+        aws_manager._refresh_errors[key] = "Throttled"
+        
+        dropped = aws_manager.invalidate_cache(profile="test-profile", region="us-east-1")
+        
+        assert dropped["inventory"] == 1
+        assert key not in aws_manager._instance_cache
+        assert key not in aws_manager._search_indexes
+        assert key not in aws_manager._snapshot_history
+        assert key not in aws_manager._refresh_errors
+        assert aws_manager._store.load(*key) is None
+        assert ("test-profile", "eu-west-1") in aws_manager._instance_cache
+        assert aws_manager.cache_stats()["inventory"]["invalidations"] == 1
+        # Regions and identities are per profile, so a region-scoped invalidation keeps them
+        assert "regions" not in dropped
+    
+    def test_snapshot_eviction_lru(self, aws_manager):
+        """Test the least recently read snapshots are evicted beyond the limit, never the active one"""
+        aws_manager.preferences.cache_max_snapshots = 2
+        aws_manager._profile = "dev"
+        aws_manager._region = "us-east-1"
+        
+        with patch.object(aws_manager, '_ensure_refresher'), patch.object(aws_manager, '_revalidate_async'):
+            aws_manager._install_snapshot("dev", "us-east-1", [InstanceRecord("i-1")])
+            aws_manager._install_snapshot("dev", "eu-west-1", [InstanceRecord("i-2")])
+            aws_manager._cached_snapshot(("dev", "us-east-1"), "swr")
+            aws_manager._install_snapshot("dev", "ap-south-1", [InstanceRecord("i-3")])
+        
+        assert set(aws_manager._instance_cache) == {("dev", "us-east-1"), ("dev", "ap-south-1")}
+        assert aws_manager.cache_stats()["inventory"]["evictions"] == 1
+        # Evicted snapshots remain on disk for a warm start
+        assert aws_manager._store.load("dev", "eu-west-1") is not None
+    
+    def test_snapshot_eviction_lfu_and_memory_budget(self, aws_manager):
+        """Test the LFU policy keeps often-read snapshots, and the memory budget applies too"""
+        aws_manager.preferences.cache_policy = "lfu"
+        aws_manager._profile = "dev"
+        aws_manager._region = "us-east-1"
+        
+        with patch.object(aws_manager, '_ensure_refresher'), patch.object(aws_manager, '_revalidate_async'):
+            for region in ("us-east-1", "eu-west-1", "ap-south-1"):
+                aws_manager._install_snapshot("dev", region, [InstanceRecord(f"i-{region}")])
+            for _ in range(3):
+                aws_manager._cached_snapshot(("dev", "ap-south-1"), "swr")
+            aws_manager._cached_snapshot(("dev", "eu-west-1"), "swr")
+            
+            aws_manager.preferences.cache_max_snapshots = 2
+            aws_manager.apply_cache_limits()
+            assert set(aws_manager._instance_cache) == {("dev", "us-east-1"), ("dev", "ap-south-1")}
+            
+            # A tiny memory budget leaves only the pinned active snapshot
+            aws_manager.preferences.cache_max_memory_mb = 0
+            aws_manager.apply_cache_limits()
+            assert set(aws_manager._instance_cache) == {("dev", "us-east-1")}
+    
+    def test_warm_cache(self, aws_manager):
+        """Test warming fetches a (profile, region) in the background"""
+        with patch.object(aws_manager, '_revalidate_async', return_value=True) as mock_revalidate, \
+             patch.object(aws_manager, '_refresh_regions_async') as mock_regions, \
+             patch.object(aws_manager, '_ensure_refresher'):
+            result = aws_manager.warm_cache("dev", "eu-west-1")
+        
+        assert result == {"profile": "dev", "region": "eu-west-1", "refreshing": True}
+        mock_revalidate.assert_called_once_with(("dev", "eu-west-1"))
+        mock_regions.assert_called_once_with("dev")
+        assert ("dev", "eu-west-1") in aws_manager._instance_cache_access
+    
+    def test_prefetch_on_connect(self, aws_manager):
+        """Test connect() warms the inventory, regions and key paths in the background"""
+        aws_manager.preferences.prefetch = True
+        mock_session, mock_ec2 = make_inventory_session([make_raw_instance("i-0000000000000001")], managed_ids=["i-0000000000000001"])
+        mock_sts = MagicMock()
+        mock_sts.get_caller_identity.return_value = {"Account": "123456789012"}
+        inventory_clients = mock_session.client.side_effect
+        mock_session.client.side_effect = lambda service, **kwargs: mock_sts if service == "sts" else (
+            MagicMock() if service == "iam" else inventory_clients(service))
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, 'describe_regions', return_value=["us-east-1"]) as mock_regions, \
+             patch.object(aws_manager, '_ensure_refresher'):
+            aws_manager.connect("dev", "us-east-1")
+            deadline = time.time() + 5
+            while aws_manager.prefetch_status()[0]["state"] == "running" and time.time() < deadline:
+                time.sleep(0.005)
+        
+        status = aws_manager.prefetch_status()[0]
+        assert status["state"] == "done"
+        assert status["tasks"] == {"inventory": "done", "regions": "done", "key_paths": "done"}
+        assert aws_manager._instance_cache[("dev", "us-east-1")].by_id["i-0000000000000001"]["has_ssm"] is True
+        mock_regions.assert_called_once_with("dev", wait=True)
+        assert ("dev", "us-east-1") not in aws_manager._refreshing
+    
+    def test_listing_joins_prefetch(self, aws_manager):
+        """Test the first listing waits for the prefetch instead of fetching again"""
+        aws_manager._profile, aws_manager._region = "dev", "us-east-1"
+        release = threading.Event()
+        mock_session, mock_ec2 = make_inventory_session([])
+        
+        def pages(**kwargs):
+            release.wait(5)
+            return [{"Reservations": [{"Instances": [make_raw_instance("i-0000000000000001", state="stopped")]}]}]
+        mock_ec2.get_paginator.return_value.paginate.side_effect = pages
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, 'describe_regions', return_value=[]), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            assert aws_manager.prefetch("dev", "us-east-1")["state"] == "running"
+            listed = []
+            listing = threading.Thread(target=lambda: listed.extend(aws_manager.list_instances(filter_state="stopped")))
+            listing.start()
+            deadline = time.time() + 5
+            while aws_manager._inflight.coalesced < 1 and time.time() < deadline:
+                time.sleep(0.005)
+            release.set()
+            listing.join(5)
+        
+        assert [inst["id"] for inst in listed] == ["i-0000000000000001"]
+        assert mock_ec2.get_paginator.return_value.paginate.call_count == 1
+    
+    def test_key_path_index(self, aws_manager, tmp_path):
+        """Test key paths are looked up in a scan of the key folders, rescanned when they change"""
+        first, second = tmp_path / "first", tmp_path / "second"
+        first.mkdir()
+        second.mkdir()
+        for path in (first / "alpha", first / "alpha.pem", first / "beta.pem", second / "beta", second / "gamma.pem"):
+            path.write_text("key")
+        
+        with patch.object(aws_manager, '_get_ssh_key_folders', return_value=[str(first), str(second)]):
+            assert aws_manager._construct_ssh_key_path("alpha") == (first / "alpha").resolve().as_posix()
+            assert aws_manager._construct_ssh_key_path("beta") == (first / "beta.pem").resolve().as_posix()
+            assert aws_manager._construct_ssh_key_path("gamma") == (second / "gamma.pem").resolve().as_posix()
+            
+            with patch('os.scandir', side_effect=AssertionError("rescanned")):
+                aws_manager._construct_ssh_key_path("alpha")
+            
+            (second / "delta").write_text("key")
+            os.utime(second, ns=(0, 0))
+            assert aws_manager._construct_ssh_key_path("delta") == (second / "delta").resolve().as_posix()
+    
+    def test_iter_instance_stream(self, aws_manager):
+        """Test instances are streamed page by page, with SSM status patched in afterwards"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        fetched_pages = []
+        
+        def pages(**kwargs):
+            for n, state in ((1, "running"), (2, "stopped"), (3, "running")):
+                fetched_pages.append(n)
+                yield {"Reservations": [{"Instances": [make_raw_instance(f"i-000000000000000{n}", state=state)]}]}
+        
+        mock_session, mock_ec2 = make_inventory_session([], managed_ids=["i-0000000000000003"])
+        mock_ec2.get_paginator.return_value.paginate.side_effect = pages
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            stream = aws_manager.iter_instance_stream(filter_state="running")
+            first = next(stream)
+            # Emitted before the later pages were requested
+            assert fetched_pages == [1]
+            records = [first] + list(stream)
+            cached = list(aws_manager.iter_instance_stream())
+        
+        assert [r["type"] for r in records] == ["page", "page", "ssm", "done"]
+        assert [i["id"] for i in records[0]["instances"]] == ["i-0000000000000001"]
+        assert records[0]["ssm_pending"] is True
+        assert records[2]["managed"] == ["i-0000000000000003"]
+        assert records[3]["count"] == 2
+        assert records[3]["cached"] is False
+        # The full result became the cached snapshot, SSM status included
+        snapshot = aws_manager._instance_cache[("test-profile", "us-east-1")]
+        assert len(snapshot.instances) == 3
+        assert snapshot.by_id["i-0000000000000003"]["has_ssm"] is True
+        assert [r["type"] for r in cached] == ["page", "done"]
+        assert cached[-1]["cached"] is True
+        assert len(cached[0]["instances"]) == 3
+    
+    def test_iter_instance_stream_leads_fetch(self, aws_manager):
+        """Test fetches starting while a stream is live join it instead of fetching again"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, mock_ec2 = make_inventory_session([make_raw_instance("i-0000000000000001")])
+        joined = []
+
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            stream = aws_manager.iter_instance_stream()
+            assert next(stream)["type"] == "page"
+            follower = threading.Thread(target=lambda: joined.append(aws_manager._refresh_snapshot("test-profile", "us-east-1")))
+            follower.start()
+            while aws_manager._inflight.coalesced < 1:
+                time.sleep(0.005)
+            generation = aws_manager._generation
+            records = list(stream)
+            follower.join(5)
+
+        assert records[-1]["type"] == "done"
+        assert joined == [aws_manager._instance_cache[("test-profile", "us-east-1")]]
+        assert mock_ec2.get_paginator.return_value.paginate.call_count == 1
+        assert aws_manager._generation == generation + 1
+        assert not aws_manager._inflight.in_flight(("snapshot", "test-profile", "us-east-1"))
+
+    def test_iter_instance_stream_closed_early(self, aws_manager):
+        """Test abandoning a live stream finishes its fetch for the callers that joined it"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        release = threading.Event()
+        
+        def pages(**kwargs):
+            yield {"Reservations": [{"Instances": [make_raw_instance("i-0000000000000001")]}]}
+            release.wait(5)
+            yield {"Reservations": [{"Instances": [make_raw_instance("i-0000000000000002")]}]}
+        
+        mock_session, mock_ec2 = make_inventory_session([])
+        mock_ec2.get_paginator.return_value.paginate.side_effect = pages
+        joined = []
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            stream = aws_manager.iter_instance_stream()
+            next(stream)
+            follower = threading.Thread(target=lambda: joined.append(aws_manager._refresh_snapshot("test-profile", "us-east-1")))
+            follower.start()
+            while aws_manager._inflight.coalesced < 1:
+                time.sleep(0.005)
+            stream.close()
+            release.set()
+            follower.join(5)
+        
+        assert [inst["id"] for inst in joined[0].instances] == ["i-0000000000000001", "i-0000000000000002"]
+        assert mock_ec2.get_paginator.return_value.paginate.call_count == 1
+        assert not aws_manager._inflight.in_flight(("snapshot", "test-profile", "us-east-1"))
+    
+    def test_iter_instance_stream_ec2_failure(self, aws_manager):
+        """Test an EC2 failure ends the stream with an error"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, mock_ec2 = make_inventory_session([])
+        mock_ec2.get_paginator.return_value.paginate.side_effect = RuntimeError("Throttled")
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            with pytest.raises(RuntimeError, match="Throttled"):
+                list(aws_manager.iter_instance_stream())
+        
+        assert ("test-profile", "us-east-1") not in aws_manager._instance_cache
+    
+    def test_warm_start_from_stored_snapshot(self, aws_manager):
+        """Test a snapshot persisted by an earlier run is served at once and revalidated"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        old = InventorySnapshot("test-profile", "us-east-1", [{"id": "i-0000000000000001", "state": "running"}],
+                                fetched_at=time.time() - 86400, generation=41)
+        aws_manager._store.save(old)
+        
+        with patch.object(aws_manager, '_ensure_refresher'), \
+             patch.object(aws_manager, '_revalidate_async', return_value=True) as mock_revalidate:
+            instances = aws_manager.list_instances()
+        
+        assert [i["id"] for i in instances] == ["i-0000000000000001"]
+        assert instances.meta["generation"] == 41
+        assert instances.meta["refreshing"] is True
+        mock_revalidate.assert_called_once_with(("test-profile", "us-east-1"))
+    
+    def test_generation_resumes_above_stored(self, aws_manager):
+        """Test new generations keep increasing across restarts and snapshots are persisted"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        aws_manager._store.save(InventorySnapshot("other", "eu-west-1", [], generation=9))
+        mock_session, _ = make_inventory_session([make_raw_instance("i-0000000000000001")])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            instances = aws_manager.list_instances(refresh="force")
+        
+        assert instances.meta["generation"] == 10
+        assert aws_manager._store.load("test-profile", "us-east-1").generation == 10
+    
+    def test_serves_last_known_snapshot_when_offline(self, aws_manager):
+        """Test a failed refresh falls back to the last known snapshot, flagged offline"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, _ = make_inventory_session([make_raw_instance("i-0000000000000001")])
+        
+        with patch.object(aws_manager, '_ensure_refresher'):
+            with patch.object(aws_manager, 'session', return_value=mock_session):
+                aws_manager.list_instances()
+            with patch.object(aws_manager, '_fetch_instances', side_effect=RuntimeError("Could not connect")):
+                instances = aws_manager.list_instances(refresh="force")
+        
+        assert [i["id"] for i in instances] == ["i-0000000000000001"]
+        assert instances.meta["offline"] is True
+        assert "Could not connect" in instances.meta["error"]
+    
+    def test_refresh_failure_without_snapshot_raises(self, aws_manager):
+        """Test a failed refresh still raises when nothing is known for the context"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        
+        with patch.object(aws_manager, '_fetch_instances', side_effect=RuntimeError("Could not connect")):
+            with pytest.raises(RuntimeError, match="Could not connect"):
+                aws_manager.list_instances(refresh="blocking")
+    
+    def test_offline_instances(self, aws_manager):
+        """Test the offline view reads the stored snapshot without calling AWS"""
+        aws_manager._store.save(InventorySnapshot("dev", "us-east-1", [
+            {"id": "i-0000000000000001", "state": "running"},
+            {"id": "i-0000000000000002", "state": "stopped"},
+        ], generation=3))
+        
+        with patch.object(aws_manager, 'session') as mock_session:
+            instances = aws_manager.offline_instances("dev", "us-east-1", filter_state="running")
+            missing = aws_manager.offline_instances("dev", "eu-west-1")
+        
+        assert [i["id"] for i in instances] == ["i-0000000000000001"]
+        assert instances.meta["offline"] is True
+        assert missing is None
+        mock_session.assert_not_called()
+    
+    def test_iter_region_inventories(self, aws_manager):
+        """Test multi-region sweeps report per-region results and errors"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        
+        def fake_refresh(profile, region):
+            if region == "eu-west-1":
+                raise RuntimeError("EC2 API call failed: throttled")
+            from src.inventory import InventorySnapshot
+            return InventorySnapshot(profile, region, [{"id": f"i-{region}", "state": "running"}])
+        
+        with patch.object(aws_manager, '_refresh_snapshot', side_effect=fake_refresh), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            records = list(aws_manager.iter_region_inventories(regions=["us-east-1", "us-west-2", "eu-west-1"]))
+        
+        by_region = {r["region"]: r for r in records if r["type"] == "region"}
+        assert set(by_region) == {"us-east-1", "us-west-2", "eu-west-1"}
+        assert by_region["us-west-2"]["ok"] is True
+        assert list(by_region["us-west-2"]["instances"]) == [{"id": "i-us-west-2", "state": "running"}]
+        assert by_region["eu-west-1"]["ok"] is False
+        assert "throttled" in by_region["eu-west-1"]["error"]
+        assert all("elapsed_ms" in r for r in records)
+        assert records[-1]["type"] == "done"
+        assert records[-1]["failed"] == 1
+        assert records[-1]["instances"] == 2
+    
+    def test_iter_account_inventories(self, aws_manager):
+        """Test multi-account sweeps tag instances with their account"""
+        from src.inventory import InventorySnapshot
+        aws_manager._region = "us-east-1"
+        identities = {
+            "dev": {"account_id": "111111111111", "account_alias": "dev-account"},
+            "ops>arn:aws:iam::222222222222:role/Viewer": {"account_id": "222222222222", "account_alias": None},
+        }
+        
+        def fake_identity(context):
+            if context == "broken":
+                raise RuntimeError("The config profile (broken) could not be found")
+            return identities[context]
+        
+        def fake_refresh(profile, region):
+            return InventorySnapshot(profile, region, [{"id": f"i-{identities[profile]['account_id']}", "state": "running"}])
+        
+        with patch.object(aws_manager, '_account_identity', side_effect=fake_identity), \
+             patch.object(aws_manager, '_refresh_snapshot', side_effect=fake_refresh), \
+             patch.object(aws_manager, '_ensure_refresher'):
+            records = list(aws_manager.iter_account_inventories([
+                {"profile": "dev"},
+                {"profile": "ops", "role_arn": "arn:aws:iam::222222222222:role/Viewer"},
+                {"profile": "broken"},
+            ]))
+        
+        accounts = {r["account_id"]: r for r in records if r["type"] == "account"}
+        assert set(accounts) == {"111111111111", "222222222222"}
+        dev_instance = accounts["111111111111"]["instances"][0]
+        assert dev_instance["account_alias"] == "dev-account"
+        assert dev_instance["profile"] == "dev"
+        assert dev_instance["region"] == "us-east-1"
+        assert accounts["222222222222"]["role_arn"] == "arn:aws:iam::222222222222:role/Viewer"
+        errors = [r for r in records if r["type"] == "error"]
+        assert [e["profile"] for e in errors] == ["broken"]
+        assert records[-1] == {**records[-1], "type": "done", "targets": 3, "failed": 1, "instances": 2}
+    
+    def test_session_shared_across_regions(self, aws_manager):
+        """Test sessions of one profile share its botocore session, whatever the region"""
+        east = aws_manager.session("dev", "us-east-1")
+        west = aws_manager.session("dev", "eu-west-1")
+        
+        assert east.region_name == "us-east-1"
+        assert west.region_name == "eu-west-1"
+        assert east.shared is west.shared
+        assert aws_manager.session("prod", "us-east-1").shared is not east.shared
+        
+        assert aws_manager.invalidate_cache(profile="dev", caches=["sessions"]) == {"sessions": 1}
+        assert aws_manager.session("dev", "us-east-1").shared is not east.shared
+
+    def test_default_profile_ignores_environment(self, aws_manager, tmp_path, monkeypatch):
+        """Test choosing "default" uses the [default] profile even with AWS_PROFILE and env keys set"""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        monkeypatch.delenv("AWS_SHARED_CREDENTIALS_FILE", raising=False)
+        monkeypatch.delenv("AWS_CONFIG_FILE", raising=False)
+        monkeypatch.setenv("AWS_PROFILE", "other")
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAFROMENV")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+        (tmp_path / ".aws").mkdir()
+        (tmp_path / ".aws" / "credentials").write_text(
+            "[default]\naws_access_key_id = AKIADEFAULT\naws_secret_access_key = secret\n"
+            "[other]\naws_access_key_id = AKIAOTHER\naws_secret_access_key = secret\n"
+        )
+
+        credentials = aws_manager.session("default", "us-east-1").get_credentials()
+
+        assert credentials.access_key == "AKIADEFAULT"
+
+    def test_list_regions_read_once(self, aws_manager):
+        """Test the static region list is read through the shared loader once per manager"""
+        regions = aws_manager.list_regions()
+        assert "us-east-1" in regions
+        assert aws_manager._sessions._loader is not None
+
+        with patch('botocore.session.Session', side_effect=AssertionError("rebuilt")):
+            assert aws_manager.list_regions() == regions
+
+    def test_clients_rebuilt_after_key_rotation(self, aws_manager, tmp_path, monkeypatch):
+        """Test pooled clients sign with the new access key once the credentials file changes"""
+        for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN", "AWS_PROFILE",
+                     "AWS_SHARED_CREDENTIALS_FILE", "AWS_CONFIG_FILE"):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv("HOME", str(tmp_path))
+        credentials = tmp_path / ".aws" / "credentials"
+        credentials.parent.mkdir()
+
+        def write_key(access_key, mtime):
+            credentials.write_text(f"[default]\naws_access_key_id = {access_key}\naws_secret_access_key = secret\n")
+            os.utime(credentials, (mtime, mtime))
+
+        def access_key(client):
+            return client._request_signer._credentials.get_frozen_credentials().access_key
+
+        write_key("AKIAOLDKEY", 1_000_000)
+        old = aws_manager.client("sts", profile="default", region="us-east-1")
+        assert aws_manager.client("sts", profile="default", region="us-east-1") is old
+        assert access_key(old) == "AKIAOLDKEY"
+
+        write_key("AKIANEWKEY", 2_000_000)
+        new = aws_manager.client("sts", profile="default", region="us-east-1")
+        assert new is not old
+        assert access_key(new) == "AKIANEWKEY"
+        assert len(aws_manager._clients) == 1
+
+    def test_clients_are_scheduled_per_account(self, aws_manager):
+        """Test pooled clients are attached to the scheduler, keyed by the profile's account once known"""
+        mock_session = MagicMock()
+        with patch.object(aws_manager, 'session', return_value=mock_session), \
+             patch.object(aws_manager._scheduler, 'attach') as mock_attach:
+            aws_manager.client("ec2", profile="dev", region="us-east-1")
+        
+        client, key_of = mock_attach.call_args[0]
+        client.meta.region_name = "us-east-1"
+        assert key_of("DescribeInstances") == ("dev", "us-east-1", "DescribeInstances")
+        aws_manager._identity_cache["dev"] = ((), time.time(), {"account_id": "123456789012", "account_alias": None})
+        assert key_of("DescribeInstances") == ("123456789012", "us-east-1", "DescribeInstances")
+    
+    def test_background_refresh_priority(self, aws_manager):
+        """Test background refreshes make their AWS calls at background priority"""
+        seen = []
+        with patch.object(aws_manager, '_refresh_snapshot', side_effect=lambda *key: seen.append(aws_manager._scheduler.is_background())):
+            aws_manager._revalidate(("dev", "us-east-1"))
+        
+        assert seen == [True]
+        assert aws_manager._scheduler.is_background() is False
+    
+    def test_assumed_role_session(self, aws_manager):
+        """Test assume-role contexts get refreshable STS credentials from the source profile"""
+        from datetime import datetime, timedelta, timezone
+        mock_sts = MagicMock()
+        mock_sts.assume_role.return_value = {"Credentials": {
+            "AccessKeyId": "ASIAEXAMPLE",
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": datetime.now(timezone.utc) + timedelta(hours=1),
+        }}
+        context = aws_manager.assume_role_context("ops", "arn:aws:iam::222222222222:role/Viewer")
+        
+        with patch.object(aws_manager, 'client', return_value=mock_sts) as mock_client:
+            session = aws_manager.session(context, "eu-west-1")
+            credentials = session.get_credentials()
+            aws_manager.session(context, "us-east-1").get_credentials()
+        
+        assert session.region_name == "eu-west-1"
+        assert credentials.access_key == "ASIAEXAMPLE"
+        assert credentials.method == "sts-assume-role"
+        mock_client.assert_called_with("sts", profile="ops")
+        # Credentials are shared by every session of the context
+        mock_sts.assume_role.assert_called_once()
+    
+    def test_connect_keeps_cached_snapshots(self, aws_manager):
+        """Test switching profile/region does not drop cached snapshots"""
+        from src.inventory import InventorySnapshot
+        aws_manager._instance_cache[("test-profile", "eu-west-1")] = InventorySnapshot("test-profile", "eu-west-1", [])
+        mock_session = MagicMock()
+        mock_session.client.return_value.get_caller_identity.return_value = {"Account": "123456789012"}
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            aws_manager.connect("test-profile", "us-east-1")
+        
+        assert ("test-profile", "eu-west-1") in aws_manager._instance_cache
+    
+    def test_revalidate_replaces_snapshot(self, aws_manager):
+        """Test background revalidation stores a fresh snapshot"""
+        mock_session, _ = make_inventory_session([make_raw_instance("i-0000000000000002")])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            aws_manager._revalidate(("dev", "us-east-1"))
+        
+        snapshot = aws_manager._instance_cache[("dev", "us-east-1")]
+        assert snapshot.instances[0]["id"] == "i-0000000000000002"
+        assert ("dev", "us-east-1") not in aws_manager._refreshing
+    
+    def test_keys_due_for_refresh(self, aws_manager):
+        """Test the active context refreshes sooner than inactive ones"""
+        import time
+        from src.inventory import InventorySnapshot
+        aws_manager._profile = "dev"
+        aws_manager._region = "us-east-1"
+        now = time.time()
+        aws_manager._instance_cache = {
+            ("dev", "us-east-1"): InventorySnapshot("dev", "us-east-1", [], fetched_at=now - 30),
+            ("dev", "eu-west-1"): InventorySnapshot("dev", "eu-west-1", [], fetched_at=now - 30),
+            ("prod", "us-east-1"): InventorySnapshot("prod", "us-east-1", [], fetched_at=now - 600),
+        }
+        aws_manager._instance_cache_access[("prod", "us-east-1")] = now
+        
+        assert aws_manager._keys_due_for_refresh() == [("dev", "us-east-1"), ("prod", "us-east-1")]
+    
+    def test_list_profiles_cached_until_files_change(self, aws_manager, tmp_path, monkeypatch):
+        """Test profiles are re-read only when the AWS config files change"""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        aws_dir = tmp_path / ".aws"
+        aws_dir.mkdir()
+        (aws_dir / "credentials").write_text("[default]\n[dev]\n")
+        (aws_dir / "config").write_text("[profile ops]\n")
+        
+        with patch('configparser.ConfigParser.read', autospec=True, side_effect=lambda cfg, path: cfg.read_file(open(path))) as mock_read:
+            assert aws_manager.list_profiles() == ["default", "dev", "ops"]
+            assert aws_manager.list_profiles() == ["default", "dev", "ops"]
+            assert mock_read.call_count == 2
+            
+            (aws_dir / "config").write_text("[profile ops]\n[profile prod]\n")
+            assert aws_manager.list_profiles() == ["default", "dev", "ops", "prod"]
+            assert mock_read.call_count == 4
+    
+    def test_describe_regions_cached_in_memory_and_on_disk(self, aws_manager, mock_preferences):
+        """Test enabled regions are fetched once and survive a restart"""
+        mock_ec2 = MagicMock()
+        mock_ec2.describe_regions.return_value = {"Regions": [{"RegionName": "us-east-1"}, {"RegionName": "eu-west-1"}]}
+        
+        with patch.object(aws_manager, 'client', return_value=mock_ec2):
+            assert aws_manager.describe_regions("dev", wait=True) == ["eu-west-1", "us-east-1"]
+            assert aws_manager.describe_regions("dev") == ["eu-west-1", "us-east-1"]
+        assert mock_ec2.describe_regions.call_count == 1
+        
+        with patch('src.aws_manager.AWSManager._cleanup_orphaned_processes'):
+            restarted = AWSManager(mock_preferences)
+        with patch.object(restarted, '_refresh_regions_async') as mock_refresh:
+            assert restarted.describe_regions("dev") == ["eu-west-1", "us-east-1"]
+            mock_refresh.assert_not_called()
+            # An expired entry is still served, and refreshed in the background
+            with patch('src.aws_manager.time.time', return_value=time.time() + 2 * 86400):
+                assert restarted.describe_regions("dev") == ["eu-west-1", "us-east-1"]
+            mock_refresh.assert_called_once_with("dev")
+    
+    def test_describe_regions_without_cache_does_not_wait(self, aws_manager):
+        """Test a profile seen for the first time gets botocore's region list at once"""
+        with patch.object(aws_manager, '_refresh_regions_async') as mock_refresh, \
+             patch.object(aws_manager, 'client') as mock_client:
+            regions = aws_manager.describe_regions("new-profile")
+        
+        assert "us-east-1" in regions
+        mock_refresh.assert_called_once_with("new-profile")
+        mock_client.assert_not_called()
+    
     def test_instance_details(self, aws_manager):
         """Test getting instance details"""
         aws_manager._profile = "test-profile"
@@ -248,6 +1414,90 @@ class TestAWSManager:
         assert details["iam_role"] == "test-role"
         assert details["security_groups"] == "test-sg (sg-12345678)"
     
+    def test_instance_details_from_listing(self, aws_manager):
+        """Test details seen in an instance listing are served without another API call"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        mock_session, mock_ec2 = make_inventory_session([
+            make_raw_instance("i-0000000000000001", KeyName="deploy-key", PrivateIpAddress="10.0.0.5"),
+        ])
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            aws_manager.list_instances(refresh="force")
+            details = aws_manager.instance_details("i-0000000000000001")
+            details["key_name"] = "edited"
+            again = aws_manager.instance_details("i-0000000000000001")
+        
+        mock_ec2.describe_instances.assert_not_called()
+        assert details["private_ip"] == "10.0.0.5"
+        # Callers get copies
+        assert again["key_name"] == "deploy-key"
+    
+    def test_instance_details_cache_expiry_and_invalidation(self, aws_manager):
+        """Test cached details expire, and terminated instances are dropped on the next listing"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        raw = make_raw_instance("i-0000000000000001", KeyName="deploy-key")
+        mock_session, mock_ec2 = make_inventory_session([raw])
+        mock_ec2.describe_instances.return_value = {"Reservations": [{"Instances": [raw]}]}
+        
+        with patch.object(aws_manager, 'session', return_value=mock_session):
+            aws_manager.list_instances(refresh="force")
+            with patch('src.aws_manager.time.time', return_value=time.time() + 3600):
+                aws_manager.instance_details("i-0000000000000001")
+            assert mock_ec2.describe_instances.call_count == 1
+            
+            mock_ec2.get_paginator.return_value.paginate.return_value = [{"Reservations": []}]
+            aws_manager.list_instances(refresh="force")
+            assert aws_manager._details_cache.get("test-profile", "us-east-1", "i-0000000000000001") is None
+    
+    def test_instance_details_batch(self, aws_manager):
+        """Test a batch lookup uses the cache, chunks the rest and reports unknown IDs per ID"""
+        aws_manager._profile = "test-profile"
+        aws_manager._region = "us-east-1"
+        aws_manager._details_cache.put_many("test-profile", "us-east-1", [{"id": "i-0000000000000000", "name": "cached"}])
+        requested = [f"i-{n:016x}" for n in range(2500)]
+        
+        def describe_instances(InstanceIds):
+            if "i-0000000000000007" in InstanceIds:
+                raise ClientError(
+                    {"Error": {"Code": "InvalidInstanceID.NotFound", "Message": "The instance ID 'i-0000000000000007' does not exist"}},
+                    "DescribeInstances"
+                )
+            # i-...0009 is silently missing from the response
+            return {"Reservations": [{"Instances": [make_raw_instance(iid, SecurityGroups=[{"GroupId": "sg-1"}]) for iid in InstanceIds if iid != "i-0000000000000009"]}]}
+        
+        mock_ec2 = MagicMock()
+        mock_ec2.describe_instances.side_effect = describe_instances
+        
+        with patch.object(aws_manager, 'client', return_value=mock_ec2):
+            result = aws_manager.instance_details_batch(requested + ["i-0000000000000001"])
+        
+        assert result["instances"]["i-0000000000000000"]["name"] == "cached"
+        assert result["instances"]["i-0000000000000001"]["security_groups"] == "sg-1"
+        assert len(result["instances"]) == 2498
+        assert result["errors"] == {
+            "i-0000000000000007": "Instance i-0000000000000007 not found",
+            "i-0000000000000009": "Instance i-0000000000000009 not found",
+        }
+        # 2499 uncached IDs: three chunks, plus one retry for the chunk with the unknown ID
+        assert mock_ec2.describe_instances.call_count == 4
+        assert max(len(c.kwargs["InstanceIds"]) for c in mock_ec2.describe_instances.call_args_list) == 1000
+        # Results are cached for later single lookups
+        assert aws_manager.instance_details("i-0000000000000002")["id"] == "i-0000000000000002"
+        assert mock_ec2.describe_instances.call_count == 4
+    
+    def test_instance_details_batch_chunk_failure(self, aws_manager):
+        """Test a failed chunk is reported as errors for its IDs"""
+        mock_ec2 = MagicMock()
+        mock_ec2.describe_instances.side_effect = ClientError({"Error": {"Code": "UnauthorizedOperation"}}, "DescribeInstances")
+        
+        with patch.object(aws_manager, 'client', return_value=mock_ec2):
+            result = aws_manager.instance_details_batch(["i-0000000000000001"])
+        
+        assert result["instances"] == {}
+        assert "UnauthorizedOperation" in result["errors"]["i-0000000000000001"]
+    
     def test_get_ssh_key_folders_default(self, aws_manager):
         """Test getting default SSH key folders"""
         with patch('os.path.exists', return_value=True), \
@@ -446,7 +1696,71 @@ class TestAWSManager:
             aws_manager.terminate_all()
         
         assert mock_terminate.call_count == 2
-    
+
+    def test_port_reservation_lifecycle(self, mocker, aws_manager):
+        """Test concurrent starts get distinct ports, which are released on exit and reused per target"""
+        mocker.patch('src.aws_manager._require')
+        mocker.patch('src.aws_manager.time.sleep')
+        mocker.patch.object(aws_manager, 'instance_details', return_value={})
+        aws_manager._ports = PortAllocator(probe=lambda port: True, scan=lambda: 0)
+        procs = []
+
+        def spawn(cmd):
+            proc = MagicMock()
+            proc.poll.return_value = None
+            procs.append(proc)
+            return proc
+
+        mocker.patch.object(aws_manager, '_spawn_background_process', side_effect=spawn)
+        ports = {}
+
+        def start(instance_id):
+            ports[instance_id] = aws_manager.start_ssh(instance_id)
+
+        threads = [threading.Thread(target=start, args=(f"i-{n}",)) for n in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(r["local_port"] for r in ports.values()) == list(range(60000, 60005))
+
+        with patch('src.utils.kill_process_tree', return_value=True):
+            aws_manager.terminate(ports["i-0"]["connection_id"])
+        assert not aws_manager._ports.is_reserved(ports["i-0"]["local_port"])
+
+        for proc in procs:
+            proc.poll.return_value = 1
+        aws_manager.active_connections()
+        assert aws_manager._ports.stats()["reserved"] == []
+
+        # The same instance gets its previous port back
+        assert aws_manager.start_ssh("i-3")["local_port"] == ports["i-3"]["local_port"]
+
+    def test_reserve_from_range(self, aws_manager):
+        """Test the manager's allocator hands out a free port from a range"""
+        # Use a wide range to ensure we find a free port
+        port = aws_manager._ports.reserve(50000, 50100)
+        assert 50000 <= port <= 50100
+        assert _is_port_free(port) is True
+
+    def test_reserve_from_range_no_available(self, aws_manager):
+        """Test error when no ports are available"""
+        # Every bind check fails, as if the range were taken
+        with patch('src.aws_manager._is_port_free', return_value=False):
+            with pytest.raises(RuntimeError, match="No free port available"):
+                aws_manager._ports.reserve(50000, 50001)
+
+    def test_port_released_when_start_fails(self, mocker, aws_manager):
+        """Test the reserved port is given back if the forwarding process can't be started"""
+        mocker.patch('src.aws_manager._require')
+        mocker.patch.object(aws_manager, '_spawn_background_process', return_value=None)
+        aws_manager._ports = PortAllocator(probe=lambda port: True, scan=lambda: 0)
+
+        with pytest.raises(RuntimeError, match="Failed to start"):
+            aws_manager.start_ssh("i-123")
+
+        assert aws_manager._ports.stats()["reserved"] == []
+
     def test_get_windows_password_data(self, aws_manager):
         """Test getting Windows password data"""
         from datetime import datetime
@@ -0,0 +1,148 @@
+"""Tests for the AWS call scheduler in src/aws_scheduler.py"""
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import botocore.session
+from botocore.config import Config
+
+from src.aws_scheduler import AWSCallScheduler
+
+KEY = ("111111111111", "us-east-1", "DescribeInstances")
+
+
+class TestAWSCallScheduler:
+    """Tests for AWSCallScheduler"""
+
+    def test_bucket_limits_bursts(self):
+        """Test calls beyond the bucket capacity wait for tokens"""
+        scheduler = AWSCallScheduler(capacity=2, rate=20.0, background_reserve=0)
+
+        started = time.monotonic()
+        for _ in range(3):
+            scheduler.acquire(KEY)
+
+        assert time.monotonic() - started >= 0.04
+        bucket = scheduler.stats()["buckets"][0]
+        assert bucket["calls"] == 3
+        assert bucket["waits"] == 1
+
+    def test_throttle_halves_rate_then_recovers(self):
+        """Test a throttled response slows the bucket down until calls succeed again"""
+        scheduler = AWSCallScheduler(capacity=10, rate=8.0, min_rate=1.0)
+
+        scheduler.throttled(KEY)
+        scheduler.throttled(KEY)
+        stats = scheduler.stats()
+        assert stats["throttled"] == 2
+        assert stats["buckets"][0]["rate"] == 2.0
+
+        for _ in range(20):
+            scheduler.succeeded(KEY)
+        assert scheduler.stats()["buckets"][0]["rate"] == 8.0
+
+    def test_interactive_calls_go_first(self):
+        """Test a queued interactive call is served before an earlier background one"""
+        scheduler = AWSCallScheduler(capacity=1, rate=10.0, background_reserve=0)
+        scheduler.acquire(KEY)
+        order = []
+
+        def background():
+            with scheduler.background():
+                scheduler.acquire(KEY)
+            order.append("background")
+
+        def interactive():
+            scheduler.acquire(KEY)
+            order.append("interactive")
+
+        threads = [threading.Thread(target=background), threading.Thread(target=interactive)]
+        threads[0].start()
+        time.sleep(0.02)
+        threads[1].start()
+        for thread in threads:
+            thread.join(5)
+
+        assert order == ["interactive", "background"]
+
+    def test_background_priority_is_per_thread(self):
+        """Test background() only applies to the calling thread and is restored afterwards"""
+        scheduler = AWSCallScheduler()
+        seen = []
+
+        with scheduler.background():
+            thread = threading.Thread(target=lambda: seen.append(scheduler.is_background()))
+            thread.start()
+            thread.join()
+            seen.append(scheduler.is_background())
+
+        assert seen == [False, True]
+        assert scheduler.is_background() is False
+
+    def test_promoted_background_call_stops_waiting(self):
+        """Test a background call waiting for its reserve proceeds once promoted"""
+        scheduler = AWSCallScheduler(capacity=1, rate=1.0, background_reserve=0.5)
+        priorities = []
+
+        def background():
+            with scheduler.background():
+                priorities.append(scheduler.current())
+                scheduler.acquire(KEY)
+
+        thread = threading.Thread(target=background)
+        thread.start()
+        time.sleep(0.05)
+        assert thread.is_alive()
+        scheduler.promote(priorities[0])
+        thread.join(1)
+
+        assert not thread.is_alive()
+        assert scheduler.stats()["buckets"][0]["calls"] == 1
+
+    def test_retries_take_tokens(self, monkeypatch):
+        """Test each retry of a throttled call takes a token of its own"""
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAEXAMPLE")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+        client = botocore.session.Session().create_client(
+            "ec2", region_name="us-east-1", config=Config(retries={"mode": "standard", "max_attempts": 3})
+        )
+        scheduler = AWSCallScheduler()
+        scheduler.attach(client, lambda api: ("111111111111", client.meta.region_name, api))
+
+        throttled = (Mock(status_code=400, headers={}), {"Error": {"Code": "RequestLimitExceeded"}, "ResponseMetadata": {}})
+        ok = (Mock(status_code=200, headers={}), {"Reservations": [], "ResponseMetadata": {}})
+        with patch.object(client._endpoint, "_get_response", side_effect=[(throttled, None), (throttled, None), (ok, None)]), \
+             patch("botocore.endpoint.time.sleep"):
+            client.describe_instances()
+
+        bucket = scheduler.stats()["buckets"][0]
+        assert bucket["calls"] == 3
+        assert bucket["throttled"] == 2
+
+    def test_attach_routes_client_calls(self, monkeypatch):
+        """Test calls of an attached client are counted, and throttled attempts recorded"""
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAEXAMPLE")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+        client = botocore.session.Session().create_client("ec2", region_name="us-east-1")
+        scheduler = AWSCallScheduler()
+        scheduler.attach(client, lambda api: ("111111111111", client.meta.region_name, api))
+
+        response = (Mock(status_code=200, headers={}), {"Reservations": []})
+        with patch.object(client._endpoint, "make_request", return_value=response):
+            client.describe_instances()
+
+        operation = client.meta.service_model.operation_model("DescribeInstances")
+        client.meta.events.emit(
+            "needs-retry.ec2.DescribeInstances",
+            response=(Mock(status_code=400, headers={}), {"Error": {"Code": "RequestLimitExceeded"}}),
+            endpoint=None,
+            operation=operation,
+            attempts=1,
+            caught_exception=None,
+            request_dict={"context": {}},
+        )
+
+        bucket = scheduler.stats()["buckets"][0]
+        assert (bucket["account"], bucket["region"], bucket["api"]) == KEY
+        assert bucket["calls"] == 1
+        assert bucket["throttled"] == 1
@@ -0,0 +1,45 @@
+"""Tests for cache statistics helpers in src/cache_stats.py"""
+from src.cache_stats import CacheStats, approx_size, age_summary, deep_sizeof
+from src.inventory import InstanceRecord
+
+
+class TestCacheStats:
+    """Tests for CacheStats"""
+    
+    def test_counters_and_hit_ratio(self):
+        """Test recorded events are counted and the hit ratio covers every lookup"""
+        stats = CacheStats()
+        assert stats.snapshot()["hit_ratio"] is None
+        
+        stats.record("hits", 3)
+        stats.record("misses")
+        stats.record("stale_hits")
+        
+        snapshot = stats.snapshot()
+        assert snapshot["hits"] == 3
+        assert snapshot["stale_hits"] == 1
+        assert snapshot["evictions"] == 0
+        assert snapshot["hit_ratio"] == 0.75
+
+
+class TestSizeEstimates:
+    """Tests for size and age estimates"""
+    
+    def test_deep_sizeof_counts_contents(self):
+        """Test nested containers and slotted records include what they hold"""
+        record = InstanceRecord("i-1", name="web" * 100, tags={"Team": "x" * 500})
+        
+        assert deep_sizeof({"a": "x" * 1000}) > 1000
+        assert deep_sizeof(record) > 800
+    
+    def test_approx_size_scales_with_count(self):
+        """Test the sampled estimate scales with the number of items"""
+        items = [{"id": f"i-{n:016x}"} for n in range(1000)]
+        
+        assert approx_size([]) == 0
+        assert approx_size(items) == deep_sizeof(items[0]) * 1000
+    
+    def test_age_summary(self):
+        """Test age percentiles"""
+        assert age_summary([]) == {"min": None, "p50": None, "p90": None, "max": None}
+        assert age_summary(range(100)) == {"min": 0, "p50": 50, "p90": 90, "max": 99}
@@ -61,7 +61,7 @@ class TestCheckHealth:
     """Tests for check_health function"""
     
     @patch('src.health.shutil.which')
-    @patch('src.health.boto3.session.Session')
+    @patch('boto3.session.Session')
     def test_check_health_all_ok(self, mock_session_class, mock_which):
         """Test health check when all dependencies are available"""
         mock_which.side_effect = lambda cmd: "/usr/bin/aws" if cmd == "aws" else "/usr/bin/session-manager-plugin"
@@ -78,7 +78,7 @@ class TestCheckHealth:
         assert report.os == platform.system()
     
     @patch('src.health.shutil.which')
-    @patch('src.health.boto3.session.Session')
+    @patch('boto3.session.Session')
     def test_check_health_missing_cli(self, mock_session_class, mock_which):
         """Test health check when AWS CLI is missing"""
         mock_which.side_effect = lambda cmd: None if cmd == "aws" else "/usr/bin/session-manager-plugin"
@@ -94,7 +94,7 @@ class TestCheckHealth:
         assert report.aws_credentials is True
     
     @patch('src.health.shutil.which')
-    @patch('src.health.boto3.session.Session')
+    @patch('boto3.session.Session')
     def test_check_health_missing_plugin(self, mock_session_class, mock_which):
         """Test health check when Session Manager Plugin is missing"""
         mock_which.side_effect = lambda cmd: "/usr/bin/aws" if cmd == "aws" else None
@@ -110,7 +110,7 @@ class TestCheckHealth:
         assert report.aws_credentials is True
     
     @patch('src.health.shutil.which')
-    @patch('src.health.boto3.session.Session')
+    @patch('boto3.session.Session')
     def test_check_health_no_credentials(self, mock_session_class, mock_which):
         """Test health check when AWS credentials are missing"""
         mock_which.side_effect = lambda cmd: "/usr/bin/aws" if cmd == "aws" else "/usr/bin/session-manager-plugin"
@@ -126,7 +126,7 @@ class TestCheckHealth:
         assert report.aws_credentials is False
     
     @patch('src.health.shutil.which')
-    @patch('src.health.boto3.session.Session')
+    @patch('boto3.session.Session')
     def test_check_health_credentials_exception(self, mock_session_class, mock_which):
         """Test health check when getting credentials raises an exception"""
         mock_which.side_effect = lambda cmd: "/usr/bin/aws" if cmd == "aws" else "/usr/bin/session-manager-plugin"
@@ -142,7 +142,7 @@ class TestCheckHealth:
         assert report.aws_credentials is False
     
     @patch('src.health.shutil.which')
-    @patch('src.health.boto3.session.Session')
+    @patch('boto3.session.Session')
     def test_check_health_all_missing(self, mock_session_class, mock_which):
         """Test health check when all dependencies are missing"""
         mock_which.return_value = None
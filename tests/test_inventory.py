@@ -0,0 +1,203 @@
+"""Tests for inventory snapshots in src/inventory.py"""
+import pytest
+import json
+from src.inventory import InventorySnapshot, InstanceList, InstanceRecord, diff_instances, encode_cursor, to_json_value
+
+
+def make_instance(iid, state="running", **extra):
+    """Build an instance dict as produced by AWSManager.list_instances"""
+    instance = {"id": iid, "name": iid, "type": "t3.micro", "state": state, "os": "Linux", "has_ssm": False}
+    instance.update(extra)
+    return instance
+
+
+class TestInventorySnapshot:
+    """Tests for InventorySnapshot"""
+    
+    def test_state_index(self):
+        """Test instances are indexed by state"""
+        snapshot = InventorySnapshot("dev", "us-east-1", [
+            make_instance("i-1"), make_instance("i-2", state="stopped"), make_instance("i-3"),
+        ])
+        
+        assert [i["id"] for i in snapshot.select("running")] == ["i-1", "i-3"]
+        assert [i["id"] for i in snapshot.select("stopped")] == ["i-2"]
+        assert snapshot.select("pending") == ()
+        assert len(snapshot.select()) == 3
+        assert snapshot.by_id["i-2"]["state"] == "stopped"
+    
+    def test_instance_list_meta(self):
+        """Test InstanceList behaves like a list with metadata"""
+        instances = InstanceList([make_instance("i-1")], {"age": 1.0})
+        
+        assert instances == [make_instance("i-1")]
+        assert instances.meta["age"] == 1.0
+
+    def test_instance_list_shares_items(self):
+        """Test InstanceList wraps the snapshot's tuple without copying it"""
+        snapshot = InventorySnapshot("dev", "us-east-1", [make_instance("i-1"), make_instance("i-2")])
+        instances = InstanceList(snapshot.select(), {"age": 0.0})
+
+        assert instances.items is snapshot.instances
+        assert [inst["id"] for inst in instances] == ["i-1", "i-2"]
+        assert json.loads(json.dumps({"instances": instances}, default=to_json_value))["instances"][1]["id"] == "i-2"
+
+    def test_carry_from_reuses_indexes(self):
+        """Test an unchanged refresh reuses the sorted and attribute indexes of the previous snapshot"""
+        previous = InventorySnapshot("dev", "us-east-1", [make_instance("i-1")])
+        previous.sorted_index("name")
+        previous.attributes
+        snapshot = InventorySnapshot("dev", "us-east-1", previous.instances)
+
+        snapshot.carry_from(previous)
+
+        assert snapshot.attributes is previous.attributes
+        assert snapshot.sorted_index("name") is previous.sorted_index("name")
+
+
+class TestInstanceRecord:
+    """Tests for InstanceRecord"""
+    
+    def make_record(self, **overrides):
+        data = {"id": "i-1", "name": "web", "type": "m5.large", "state": "running", "os": "Linux", "has_ssm": True,
+                "launch_time": "2024-01-01T00:00:00+00:00", "private_ip": "10.0.0.1", "tags": {"env": "prod"}}
+        data.update(overrides)
+        return InstanceRecord.from_dict(data)
+    
+    def test_reads_like_a_dict(self):
+        record = self.make_record()
+        
+        assert record["state"] == "running"
+        assert record.get("tags") == {"env": "prod"}
+        assert record.get("missing", "x") == "x"
+        assert "name" in record
+        assert dict(record) == record.to_dict()
+        assert record == record.to_dict()
+    
+    def test_immutable_and_slotted(self):
+        record = self.make_record()
+        
+        with pytest.raises(AttributeError):
+            record.state = "stopped"
+        with pytest.raises(TypeError):
+            record["state"] = "stopped"
+        assert not hasattr(record, "__dict__")
+    
+    def test_equality_and_hash(self):
+        assert self.make_record() == self.make_record()
+        assert hash(self.make_record()) == hash(self.make_record())
+        assert self.make_record() != self.make_record(state="stopped")
+        assert self.make_record() != self.make_record(tags={"env": "dev"})
+    
+    def test_interns_repeated_strings(self):
+        first = self.make_record(type="".join(["m5.", "large"]), tags={"".join(["e", "nv"]): "".join(["pr", "od"])})
+        second = self.make_record()
+        
+        assert first.type is second.type
+        assert first._tags[0][0] is second._tags[0][0]
+        assert first._tags[0][1] is second._tags[0][1]
+    
+    def test_serialized_at_the_edge(self):
+        """Test records only become dicts when dumped to JSON"""
+        record = self.make_record()
+        
+        assert json.loads(json.dumps([record], default=to_json_value)) == [record.to_dict()]
+        assert InstanceRecord.from_dict(record.to_dict()) == record
+
+
+class TestSnapshotPaging:
+    """Tests for sorted, cursor-paged snapshot access"""
+    
+    @pytest.fixture
+    def snapshot(self):
+        return InventorySnapshot("dev", "us-east-1", [
+            make_instance("i-4", name="delta", launch_time="2024-03-01T00:00:00+00:00"),
+            make_instance("i-1", name="Alpha", state="stopped", launch_time="2024-01-01T00:00:00+00:00"),
+            make_instance("i-3", name="charlie", has_ssm=True, launch_time="2024-04-01T00:00:00+00:00"),
+            make_instance("i-2", name="bravo", launch_time="2024-02-01T00:00:00+00:00"),
+            make_instance("i-5", name="bravo", has_ssm=True, launch_time="2024-05-01T00:00:00+00:00"),
+        ])
+    
+    def walk(self, snapshot, **kwargs):
+        """Collect every page, following cursors"""
+        ids, cursor = [], None
+        while True:
+            page, cursor, total = snapshot.page(cursor=cursor, **kwargs)
+            ids.append([i["id"] for i in page])
+            if cursor is None:
+                return ids, total
+    
+    def test_pages_in_name_order(self, snapshot):
+        """Test pages follow case-insensitive name order with ID tie-breaks"""
+        pages, total = self.walk(snapshot, sort="name", limit=2)
+        
+        assert pages == [["i-1", "i-2"], ["i-5", "i-3"], ["i-4"]]
+        assert total == 5
+    
+    def test_descending(self, snapshot):
+        """Test descending pages walk the same index backwards"""
+        pages, _ = self.walk(snapshot, sort="launch_time", descending=True, limit=2)
+        
+        assert pages == [["i-5", "i-3"], ["i-4", "i-2"], ["i-1"]]
+    
+    def test_filtered_sort(self, snapshot):
+        """Test sorting within a state filter"""
+        page, cursor, total = snapshot.page(sort="ssm", filter_state="running")
+        
+        assert [i["id"] for i in page] == ["i-2", "i-4", "i-3", "i-5"]
+        assert cursor is None
+        assert total == 4
+    
+    def test_index_built_once(self, snapshot):
+        """Test the sorted index is reused across pages"""
+        first = snapshot.sorted_index("type")
+        snapshot.page(sort="type", limit=1)
+        
+        assert snapshot.sorted_index("type") is first
+    
+    def test_cursor_survives_refresh(self, snapshot):
+        """Test a cursor continues after its instance is gone from a newer snapshot"""
+        _, cursor, _ = snapshot.page(sort="name", limit=2)
+        newer = InventorySnapshot("dev", "us-east-1", [i for i in snapshot.instances if i["id"] != "i-2"])
+        
+        page, _, _ = newer.page(sort="name", cursor=cursor)
+        
+        assert [i["id"] for i in page] == ["i-5", "i-3", "i-4"]
+    
+    def test_rejects_foreign_cursor(self, snapshot):
+        """Test cursors are tied to their sort order"""
+        _, cursor, _ = snapshot.page(sort="name", limit=1)
+        
+        with pytest.raises(ValueError):
+            snapshot.page(sort="ssm", cursor=cursor)
+        with pytest.raises(ValueError):
+            snapshot.page(sort="name", descending=True, cursor=cursor)
+        with pytest.raises(ValueError):
+            snapshot.page(sort="name", cursor="not-a-cursor")
+        with pytest.raises(ValueError):
+            snapshot.page(sort="ssm", cursor=encode_cursor("ssm", False, ("x", "i-1")))
+
+
+class TestDiffInstances:
+    """Tests for diff_instances"""
+    
+    def test_diff(self):
+        """Test added, removed and changed instances are detected"""
+        old = {"i-1": make_instance("i-1"), "i-2": make_instance("i-2"), "i-3": make_instance("i-3")}
+        new = {
+            "i-1": make_instance("i-1"),
+            "i-2": make_instance("i-2", state="stopped"),
+            "i-4": make_instance("i-4"),
+        }
+        
+        delta = diff_instances(old, new)
+        
+        assert [i["id"] for i in delta["added"]] == ["i-4"]
+        assert delta["removed"] == ["i-3"]
+        assert [i["id"] for i in delta["changed"]] == ["i-2"]
+    
+    def test_diff_no_changes(self):
+        """Test identical maps produce an empty delta"""
+        old = {"i-1": make_instance("i-1")}
+        
+        assert diff_instances(old, dict(old)) == {"added": [], "removed": [], "changed": []}
@@ -0,0 +1,74 @@
+"""Tests for the inventory change journal in src/inventory_events.py"""
+import threading
+from src.inventory import diff_instances
+from src.inventory_events import InventoryEventLog, describe_changes
+
+
+def make_event(event_id):
+    return {"id": event_id, "event": "inventory", "data": {}}
+
+
+class TestInventoryEventLog:
+    """Tests for InventoryEventLog"""
+    
+    def test_since(self):
+        """Test events after an ID are returned in order"""
+        log = InventoryEventLog()
+        for event_id in (3, 5, 8):
+            log.publish(make_event(event_id))
+        
+        assert [e["id"] for e in log.since(3)] == [5, 8]
+        assert log.since(8) == []
+        assert log.latest_id == 8
+    
+    def test_resume_beyond_journal(self):
+        """Test IDs whose following events were dropped, or that are unknown, can't be resumed"""
+        log = InventoryEventLog(size=2)
+        for event_id in (1, 2, 3):
+            log.publish(make_event(event_id))
+        
+        assert log.since(0) is None
+        assert [e["id"] for e in log.since(1)] == [2, 3]
+        assert log.since(4) is None
+    
+    def test_raise_floor(self):
+        """Test IDs from before the floor need a resync, while the floor itself is current"""
+        log = InventoryEventLog()
+        log.raise_floor(10)
+        
+        assert log.since(9) is None
+        assert log.since(10) == []
+        assert log.latest_id == 10
+    
+    def test_wait(self):
+        """Test wait blocks until an event is published, and times out empty"""
+        log = InventoryEventLog()
+        log.publish(make_event(1))
+        
+        assert log.wait(1, timeout=0.01) == []
+        timer = threading.Timer(0.05, log.publish, args=(make_event(2),))
+        timer.start()
+        try:
+            assert [e["id"] for e in log.wait(1, timeout=5)] == [2]
+        finally:
+            timer.cancel()
+
+
+class TestDescribeChanges:
+    """Tests for describe_changes"""
+    
+    def test_state_and_ssm_transitions(self):
+        """Test state and SSM transitions are reported, other changes aren't"""
+        old = {
+            "i-1": {"id": "i-1", "state": "running", "has_ssm": True},
+            "i-2": {"id": "i-2", "state": "running", "has_ssm": False, "name": "a"},
+        }
+        new = {
+            "i-1": {"id": "i-1", "state": "stopped", "has_ssm": False},
+            "i-2": {"id": "i-2", "state": "running", "has_ssm": False, "name": "b"},
+        }
+        
+        summary = describe_changes(old, diff_instances(old, new))
+        
+        assert summary["state_changed"] == [{"id": "i-1", "from": "running", "to": "stopped"}]
+        assert summary["ssm_changed"] == [{"id": "i-1", "has_ssm": False}]
@@ -0,0 +1,66 @@
+"""Tests for the inventory query language in src/inventory_query.py"""
+import pytest
+from src.inventory_query import AttributeIndex, QueryTerm, parse_query
+
+
+def make_instance(iid, name, state="running", type="t3.micro", has_ssm=False, os="Linux", **tags):
+    return {"id": iid, "name": name, "state": state, "type": type, "has_ssm": has_ssm, "os": os, "tags": tags}
+
+
+@pytest.fixture
+def index():
+    return AttributeIndex([
+        make_instance("i-1", "web-1", type="m5.large", has_ssm=True, env="prod", team="web"),
+        make_instance("i-2", "web-2", type="m5.xlarge", state="stopped", env="prod"),
+        make_instance("i-3", "db-1", type="r6g.large", has_ssm=True, env="staging", os="Windows"),
+        make_instance("i-4", "bastion", type="t3.micro"),
+    ])
+
+
+def run(index, query):
+    return sorted(index.evaluate(parse_query(query)))
+
+
+class TestParseQuery:
+    """Tests for parse_query"""
+    
+    def test_terms(self):
+        assert parse_query('tag:env=prod -state:stopped web "tag:Cost Center"') == [
+            QueryTerm("tag", "env", "prod"),
+            QueryTerm("state", "", "stopped", negated=True),
+            QueryTerm("name", "", "*web*"),
+            QueryTerm("tag", "Cost Center", "*"),
+        ]
+    
+    @pytest.mark.parametrize("query", ["color:red", "tag:=prod", "ssm:maybe", "state:", 'name:"unterminated'])
+    def test_invalid(self, query):
+        with pytest.raises(ValueError):
+            parse_query(query)
+
+
+class TestAttributeIndex:
+    """Tests for AttributeIndex"""
+    
+    def test_tag_terms(self, index):
+        assert run(index, "tag:env=prod") == ["i-1", "i-2"]
+        assert run(index, "tag:ENV=Prod") == ["i-1", "i-2"]
+        assert run(index, "tag:team") == ["i-1"]
+        assert run(index, "tag:e*=stag*") == ["i-3"]
+    
+    def test_combined_terms(self, index):
+        """Test all terms must match, and negated terms exclude"""
+        assert run(index, "tag:env=prod type:m5.* state:running ssm:yes") == ["i-1"]
+        assert run(index, "type:m5.*") == ["i-1", "i-2"]
+        assert run(index, "-tag:env") == ["i-4"]
+        assert run(index, "os:windows") == ["i-3"]
+        assert run(index, "web -web-2") == ["i-1"]
+        assert run(index, "") == ["i-1", "i-2", "i-3", "i-4"]
+        assert run(index, "tag:missing=x") == []
+    
+    def test_facets(self, index):
+        """Test facet counts are precomputed per state, type, SSM and tag value"""
+        assert index.facets["state"] == {"running": 3, "stopped": 1}
+        assert index.facets["ssm"] == {"yes": 2, "no": 2}
+        assert index.facets["type"]["m5.large"] == 1
+        assert index.facets["tags"]["env"] == {"prod": 2, "staging": 1}
+        assert "name" not in index.facets
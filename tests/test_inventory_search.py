@@ -0,0 +1,86 @@
+"""Tests for the instance search index in src/inventory_search.py"""
+import time
+import pytest
+from src.inventory import diff_instances
+from src.inventory_search import TrigramIndex, searchable_text
+
+
+def make_instance(iid, name, private_ip="", **tags):
+    return {"id": iid, "name": name, "state": "running", "private_ip": private_ip, "tags": tags}
+
+
+class TestTrigramIndex:
+    """Tests for TrigramIndex"""
+    
+    @pytest.fixture
+    def instances(self):
+        return [
+            make_instance("i-0000000000000001", "payments-api-blue-3", "10.0.1.15", Environment="prod"),
+            make_instance("i-0000000000000002", "payments-worker", "10.0.1.16", Environment="prod"),
+            make_instance("i-0000000000000003", "api", "10.0.2.20", Environment="staging"),
+            make_instance("i-0000000000000004", "bastion", "10.0.9.9", Owner="secops"),
+        ]
+    
+    def test_exact_matches_ranked(self, instances):
+        """Test substring matches rank earlier, then shorter, matches first"""
+        index = TrigramIndex(instances)
+        
+        assert index.search("api") == ["i-0000000000000003", "i-0000000000000001"]
+        assert index.search("PAYMENTS", limit=1) == ["i-0000000000000002"]
+    
+    def test_matches_id_ip_and_tags(self, instances):
+        index = TrigramIndex(instances)
+        
+        assert index.search("0000000000000004") == ["i-0000000000000004"]
+        assert index.search("10.0.2.20") == ["i-0000000000000003"]
+        assert index.search("staging") == ["i-0000000000000003"]
+        assert index.search("secops") == ["i-0000000000000004"]
+    
+    def test_fuzzy_match(self, instances):
+        """Test near misses are found when nothing matches verbatim"""
+        index = TrigramIndex(instances)
+        
+        assert index.search("paymnts-api-blue")[0] == "i-0000000000000001"
+        assert index.search("zzzzzz") == []
+    
+    def test_short_query(self, instances):
+        """Test queries shorter than a trigram fall back to a scan"""
+        index = TrigramIndex(instances)
+        
+        assert index.search("ap") == ["i-0000000000000003", "i-0000000000000001"]
+        assert index.search("  ") == []
+    
+    def test_incremental_update(self, instances):
+        """Test applying a snapshot diff re-indexes only the affected instances"""
+        index = TrigramIndex(instances)
+        old = {i["id"]: i for i in instances}
+        new = dict(old)
+        del new["i-0000000000000004"]
+        new["i-0000000000000003"] = make_instance("i-0000000000000003", "checkout", "10.0.2.20")
+        new["i-0000000000000005"] = make_instance("i-0000000000000005", "bastion-2")
+        
+        index.update(**diff_instances(old, new))
+        
+        assert index.search("bastion") == ["i-0000000000000005"]
+        assert index.search("checkout") == ["i-0000000000000003"]
+        assert "i-0000000000000003" not in index.search("staging")
+        assert len(index) == 4
+        assert index._postings == TrigramIndex(new.values())._postings
+    
+    def test_searchable_text_ignores_unlisted_tags(self):
+        text = searchable_text(make_instance("i-1", "web", CostCenter="cc-123"))
+        assert "cc-123" not in text
+    
+    def test_large_fleet_search_is_fast(self):
+        """Test a selective query on a 50k-instance fleet stays fast"""
+        index = TrigramIndex(
+            make_instance(f"i-{n:017x}", f"svc-{n % 500}-node-{n}", f"10.{n // 65536}.{n // 256 % 256}.{n % 256}")
+            for n in range(50000)
+        )
+        
+        started = time.perf_counter()
+        results = index.search("node-4242", limit=20)
+        elapsed = time.perf_counter() - started
+        
+        assert results[0] == f"i-{4242:017x}"
+        assert elapsed < 0.05
@@ -0,0 +1,89 @@
+"""Tests for the persisted inventory store in src/inventory_store.py"""
+import sqlite3
+import pytest
+from src.inventory import InventorySnapshot
+from src.inventory_store import InventoryStore, SCHEMA_VERSION
+
+
+def make_snapshot(generation=1, region="us-east-1", fetched_at=1000.0):
+    instances = [
+        {"id": "i-0000000000000001", "name": "web", "state": "running", "has_ssm": True},
+        {"id": "i-0000000000000002", "name": "db", "state": "stopped", "has_ssm": False},
+    ]
+    return InventorySnapshot("dev", region, instances, fetched_at=fetched_at, generation=generation)
+
+
+class TestInventoryStore:
+    """Tests for InventoryStore"""
+    
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = InventoryStore(tmp_path / "inventory.db")
+        yield store
+        store.close()
+    
+    def test_save_and_load(self, store):
+        """Test a stored snapshot round-trips with its indexes rebuilt"""
+        store.save(make_snapshot(generation=7))
+        
+        loaded = store.load("dev", "us-east-1")
+        
+        assert loaded.generation == 7
+        assert loaded.fetched_at == 1000.0
+        assert [i["id"] for i in loaded.select("running")] == ["i-0000000000000001"]
+        assert store.load("dev", "eu-west-1") is None
+    
+    def test_save_replaces_previous(self, store):
+        """Test only the latest snapshot per (profile, region) is kept"""
+        store.save(make_snapshot(generation=1))
+        store.save(make_snapshot(generation=2))
+        store.save(make_snapshot(generation=5, region="eu-west-1"))
+        
+        assert store.load("dev", "us-east-1").generation == 2
+        assert store.max_generation() == 5
+    
+    def test_touch_updates_fetched_at(self, store):
+        """Test revalidating an unchanged snapshot only refreshes its timestamp"""
+        store.save(make_snapshot(generation=3))
+        store.touch(make_snapshot(generation=3, fetched_at=2000.0))
+        
+        assert store.load("dev", "us-east-1").fetched_at == 2000.0
+    
+    def test_none_region(self, store):
+        """Test snapshots without a region can be stored"""
+        store.save(make_snapshot(region=None))
+        assert store.load("dev", None).region is None
+    
+    def test_max_generation_empty(self, store):
+        assert store.max_generation() == 0
+    
+    def test_save_and_load_regions(self, store):
+        """Test the enabled regions of a profile are stored with their fetch time"""
+        assert store.load_regions("dev") is None
+        store.save_regions("dev", ["eu-west-1", "us-east-1"], 1234.0)
+        
+        assert store.load_regions("dev") == (1234.0, ["eu-west-1", "us-east-1"])
+    
+    def test_discards_other_schema_version(self, tmp_path):
+        """Test a database written with another schema version is reset"""
+        path = tmp_path / "inventory.db"
+        store = InventoryStore(path)
+        store.save(make_snapshot())
+        store.close()
+        conn = sqlite3.connect(str(path))
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+        conn.commit()
+        conn.close()
+        
+        store = InventoryStore(path)
+        assert store.load("dev", "us-east-1") is None
+        store.close()
+    
+    def test_unreadable_payload_is_dropped(self, store):
+        """Test a corrupt payload is discarded instead of raising"""
+        store.save(make_snapshot())
+        with store._lock:
+            store._connection().execute("UPDATE snapshots SET payload = ?", (b"garbage",))
+        
+        assert store.load("dev", "us-east-1") is None
+        assert store.max_generation() == 0
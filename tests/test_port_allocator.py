@@ -0,0 +1,96 @@
+"""Tests for the local port allocator in src/port_allocator.py"""
+import threading
+
+import pytest
+
+from src.port_allocator import PortAllocator, read_busy_ports
+
+PROC_NET_TCP = """\
+  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 0100007F:EA64 00000000:0000 0A 00000000:00000000 00:00000000 00000000  1000        0 1 1
+   1: 0100007F:EA65 0100007F:1F90 06 00000000:00000000 00:00000000 00000000  1000        0 0 1
+   2: 0100007F:EA66 0100007F:1F90 01 00000000:00000000 00:00000000 00000000  1000        0 2 1
+"""
+
+
+class TestReadBusyPorts:
+    """Tests for read_busy_ports"""
+
+    def test_parses_proc_net_tcp(self, tmp_path):
+        """Test listening and connected sockets are busy, TIME_WAIT ones aren't"""
+        path = tmp_path / "tcp"
+        path.write_text(PROC_NET_TCP)
+
+        busy = read_busy_ports((str(path), str(tmp_path / "missing")))
+
+        assert busy == (1 << 60004) | (1 << 60006)
+
+    def test_unavailable(self, tmp_path):
+        """Test None is returned when /proc can't be read"""
+        assert read_busy_ports((str(tmp_path / "missing"),)) is None
+
+
+class TestPortAllocator:
+    """Tests for PortAllocator"""
+
+    def test_skips_busy_and_reserved_ports(self):
+        """Test ports the OS reports busy are skipped without a bind check, and reservations aren't reused"""
+        probed = []
+        allocator = PortAllocator(probe=lambda port: probed.append(port) or True, scan=lambda: 1 << 60000)
+
+        assert allocator.reserve(60000, 60010) == 60001
+        assert allocator.reserve(60000, 60010) == 60002
+        assert probed == [60001, 60002]
+
+        allocator.release(60001)
+        assert allocator.reserve(60000, 60010) == 60001
+
+    def test_failed_probe_marks_port_busy(self):
+        """Test a port failing its bind check is skipped until the next scan"""
+        allocator = PortAllocator(probe=lambda port: port != 60000, scan=lambda: None)
+
+        assert allocator.reserve(60000, 60010) == 60001
+        allocator.release(60001)
+        assert allocator.reserve(60000, 60010) == 60001
+        assert allocator.probes == 3
+
+    def test_preferred_and_sticky_ports(self):
+        """Test an explicit preference wins, then the key's previous port"""
+        allocator = PortAllocator(probe=lambda port: True, scan=lambda: 0)
+        key = ("i-123", None, 22)
+
+        assert allocator.reserve(60000, 60010, key=key, preferred=8080) == 8080
+        assert allocator.reserve(60000, 60010, key=("i-456", None, 22)) == 60000
+        allocator.release(8080)
+        port = allocator.reserve(60000, 60010, key=key)
+        assert port == 60001
+        allocator.release(port)
+        allocator.reserve(60000, 60010)  # takes 60001
+        allocator.release(60001)
+        assert allocator.reserve(60000, 60010, key=key) == 60001
+
+    def test_full_range_rescans_then_raises(self):
+        """Test a full range triggers one more scan before giving up"""
+        scans = []
+        allocator = PortAllocator(probe=lambda port: True, scan=lambda: scans.append(1) or (1 << 60000))
+
+        with pytest.raises(RuntimeError, match="No free port available"):
+            allocator.reserve(60000, 60000)
+        assert len(scans) == 2
+
+    def test_concurrent_reservations_are_unique(self):
+        """Test concurrent callers never get the same port"""
+        allocator = PortAllocator(probe=lambda port: True, scan=lambda: 0)
+        ports = []
+
+        def reserve():
+            ports.append(allocator.reserve(60000, 60100))
+
+        threads = [threading.Thread(target=reserve) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(ports)) == 50
+        assert allocator.stats()["reserved"] == sorted(ports)
@@ -73,6 +73,35 @@ class TestPreferences:
         assert result["aws"]["region"] == "us-west-2"
         assert result["ssh_key_folder"] == "~/.ssh"
     
+    def test_performance_settings(self):
+        """Test max_pool_connections round-trip and validation"""
+        prefs = Preferences.from_dict({"performance": {"max_pool_connections": 25}})
+        assert prefs.max_pool_connections == 25
+        assert prefs.to_dict()["performance"]["max_pool_connections"] == 25
+        
+        prefs = Preferences.from_dict({"performance": {"max_pool_connections": 0}})
+        assert prefs.max_pool_connections == DEFAULTS["performance"]["max_pool_connections"]
+    
+    def test_cache_limits(self):
+        """Test cache policy and limits round-trip, with invalid values replaced by defaults"""
+        prefs = Preferences.from_dict({"performance": {"cache_policy": "LFU", "cache_max_snapshots": 4, "cache_max_memory_mb": 64}})
+        assert prefs.cache_policy == "lfu"
+        assert prefs.cache_max_snapshots == 4
+        assert prefs.to_dict()["performance"]["cache_max_memory_mb"] == 64
+        assert prefs.cache_max_details == DEFAULTS["performance"]["cache_max_details"]
+        
+        prefs = Preferences.from_dict({"performance": {"cache_policy": "random", "cache_max_clients": -1}})
+        assert prefs.cache_policy == DEFAULTS["performance"]["cache_policy"]
+        assert prefs.cache_max_clients == DEFAULTS["performance"]["cache_max_clients"]
+
+    def test_prefetch_setting(self):
+        """Test prefetch round-trip, with non-boolean values replaced by the default"""
+        prefs = Preferences.from_dict({"performance": {"prefetch": False}})
+        assert prefs.prefetch is False
+        assert prefs.to_dict()["performance"]["prefetch"] is False
+
+        assert Preferences.from_dict({"performance": {"prefetch": "no"}}).prefetch is DEFAULTS["performance"]["prefetch"]
+
     def test_to_dict_no_aws(self):
         """Test to_dict without AWS settings"""
         prefs = Preferences()
@@ -1,6 +1,17 @@
 """Smoke tests to verify basic functionality"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
+ROOT = Path(__file__).resolve().parent.parent
+# Modules too slow to import before the first window shows; loaded on first use
+DEFERRED_MODULES = ("boto3", "botocore", "cryptography", "psutil", "yaml", "webview")
+# Deferred even when create_app() configures production logging (which needs yaml)
+AWS_MODULES = ("boto3", "botocore", "cryptography", "psutil")
+
 
 def test_placeholder():
     """Placeholder test to verify pytest is working"""
@@ -16,3 +27,36 @@ def test_imports():
     assert preferences_handler is not None
     assert utils is not None
     assert health is not None
+
+
+def test_startup_defers_heavy_imports():
+    """Test importing the entry point and building the app leave the heavy modules unloaded"""
+    code = (
+        "import sys\n"
+        "import run\n"
+        "from src.app import create_app\n"
+        "create_app()\n"
+        f"print([m for m in {DEFERRED_MODULES!r} if m in sys.modules])\n"
+    )
+    # A fresh interpreter: this one already imported them through other tests
+    env = dict(os.environ, FLASK_ENV="testing")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_production_startup_builds_no_manager(tmp_path):
+    """Test create_app() outside of tests neither builds the AWS manager nor starts the warm-up"""
+    code = (
+        "import sys, threading\n"
+        "from src.app import create_app\n"
+        "create_app()\n"
+        "from src.api import aws_manager\n"
+        f"print([m for m in {AWS_MODULES!r} if m in sys.modules])\n"
+        "print(aws_manager._instance is None, [t.name for t in threading.enumerate() if t.name == 'startup-prefetch'])\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k not in ("FLASK_ENV", "PYTEST_CURRENT_TEST")}
+    env["HOME"] = str(tmp_path)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    
+    assert result.stdout.splitlines()[-2:] == ["[]", "True []"]
@@ -7,6 +7,8 @@ from src.utils import (
     check_aws_dependencies,
     validate_remote_host,
     validate_port,
+    validate_region,
+    validate_role_arn,
     which,
     require_cmd
 )
@@ -15,7 +17,7 @@ from src.utils import (
 class TestKillProcessTree:
     """Tests for kill_process_tree function"""
     
-    @patch('src.utils.psutil.Process')
+    @patch('psutil.Process')
     def test_kill_process_tree_success(self, mock_process_class):
         """Test successful process tree termination"""
         # Mock parent process
@@ -43,7 +45,7 @@ class TestKillProcessTree:
         mock_child1.terminate.assert_called_once()
         mock_child2.terminate.assert_called_once()
     
-    @patch('src.utils.psutil.Process')
+    @patch('psutil.Process')
     def test_kill_process_tree_timeout(self, mock_process_class):
         """Test process tree termination with timeout"""
         import psutil
@@ -62,7 +64,7 @@ class TestKillProcessTree:
         mock_parent.terminate.assert_called_once()
         mock_parent.kill.assert_called_once()
     
-    @patch('src.utils.psutil.Process')
+    @patch('psutil.Process')
     def test_kill_process_tree_no_such_process(self, mock_process_class):
         """Test handling of non-existent process"""
         import psutil
@@ -181,6 +183,41 @@ class TestValidatePort:
         assert validate_port(None) is False
 
 
+class TestValidateRegion:
+    """Tests for validate_region function"""
+    
+    def test_validate_region_valid(self):
+        """Test valid region names"""
+        assert validate_region("us-east-1") is True
+        assert validate_region("ap-southeast-2") is True
+        assert validate_region("us-gov-west-1") is True
+    
+    def test_validate_region_invalid(self):
+        """Test invalid region names"""
+        assert validate_region("") is False
+        assert validate_region("us-east") is False
+        assert validate_region("US-EAST-1") is False
+        assert validate_region("us-east-1; rm -rf") is False
+        assert validate_region(None) is False
+
+
+class TestValidateRoleArn:
+    """Tests for validate_role_arn function"""
+    
+    def test_validate_role_arn_valid(self):
+        """Test valid role ARNs"""
+        assert validate_role_arn("arn:aws:iam::123456789012:role/ReadOnly") is True
+        assert validate_role_arn("arn:aws:iam::123456789012:role/team/ops-viewer") is True
+        assert validate_role_arn("arn:aws-us-gov:iam::123456789012:role/ReadOnly") is True
+    
+    def test_validate_role_arn_invalid(self):
+        """Test invalid role ARNs"""
+        assert validate_role_arn("") is False
+        assert validate_role_arn("arn:aws:iam::12345:role/ReadOnly") is False
+        assert validate_role_arn("arn:aws:iam::123456789012:user/bob") is False
+        assert validate_role_arn(None) is False
+
+
 class TestWhich:
     """Tests for which function"""
     